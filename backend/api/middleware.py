@@ -0,0 +1,71 @@
+"""
+请求计时中间件 - 记录各路由的延迟、进行中请求数和请求/响应大小
+"""
+import time
+
+from utils.metrics import REGISTRY, SIZE_BUCKETS, Counter, Gauge, Histogram
+
+
+HTTP_REQUESTS = Counter('quant_http_requests_total', 'HTTP请求次数',
+                        ('method', 'route', 'status'), REGISTRY)
+HTTP_SECONDS = Histogram('quant_http_request_seconds', 'HTTP请求处理耗时（秒）',
+                         ('method', 'route'), REGISTRY,
+                         buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+HTTP_IN_FLIGHT = Gauge('quant_http_requests_in_flight', '正在处理的HTTP请求数', registry=REGISTRY)
+HTTP_REQUEST_BYTES = Histogram('quant_http_request_bytes', 'HTTP请求体大小（字节）',
+                               ('method', 'route'), REGISTRY, buckets=SIZE_BUCKETS)
+HTTP_RESPONSE_BYTES = Histogram('quant_http_response_bytes', 'HTTP响应体大小（字节）',
+                                ('method', 'route'), REGISTRY, buckets=SIZE_BUCKETS)
+
+
+def _route_template(scope) -> str:
+    """匹配到的路由模板；include_router 的前缀只记录在FastAPI的路由上下文中，优先取完整路径"""
+    context = (scope.get('fastapi') or {}).get('effective_route_context')
+    path = getattr(context, 'path', None) or getattr(scope.get('route'), 'path', None)
+    return path or 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    ASGI请求计时中间件
+
+    路由标签使用路由模板（如 /api/v1/backtest/{backtest_id}），避免路径参数导致标签无限增长；
+    未匹配任何路由的请求记为 unmatched。WebSocket连接不计时。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+        response_bytes = [0]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            elif message['type'] == 'http.response.body':
+                response_bytes[0] += len(message.get('body', b''))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            method = scope['method']
+            route = _route_template(scope)
+            HTTP_REQUESTS.labels(method, route, status[0]).inc()
+            HTTP_SECONDS.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_RESPONSE_BYTES.labels(method, route).observe(response_bytes[0])
+            for name, value in scope.get('headers', ()):
+                if name == b'content-length':
+                    try:
+                        HTTP_REQUEST_BYTES.labels(method, route).observe(int(value))
+                    except ValueError:
+                        pass
+                    break
@@ -0,0 +1,139 @@
+"""
+列式数据响应 - 编码（JSON/msgpack/Arrow IPC）、压缩协商（br/gzip）和ETag条件请求
+"""
+import gzip
+import json
+import hashlib
+from typing import Dict, Optional
+
+import numpy as np
+from fastapi import Request, Response
+
+from core.config_manager import ConfigManager
+
+
+# 列式编码格式 -> Content-Type
+MEDIA_TYPES = {
+    'columnar': 'application/json',
+    'msgpack': 'application/x-msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+
+def negotiate_format(accept: Optional[str], default: str) -> str:
+    """未显式指定格式时按Accept头选择编码"""
+    accept = (accept or '').lower()
+    for fmt in ('arrow', 'msgpack'):
+        if MEDIA_TYPES[fmt] in accept:
+            return fmt
+    return default
+
+
+def encode_columns(stock_code: str, columns: Dict[str, np.ndarray], fmt: str) -> bytes:
+    """将 {字段名: 数组} 编码为指定格式"""
+    count = len(next(iter(columns.values()))) if columns else 0
+    if fmt == 'arrow':
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("arrow格式需要安装pyarrow: pip install pyarrow") from e
+        arrays = {
+            name: pa.array(values.astype('datetime64[D]') if name == 'date' else values)
+            for name, values in columns.items()
+        }
+        table = pa.table(arrays).replace_schema_metadata({'stock_code': stock_code})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    payload = {
+        'stock_code': stock_code,
+        'count': count,
+        'columns': {name: values.tolist() for name, values in columns.items()}
+    }
+    if fmt == 'msgpack':
+        try:
+            import msgpack
+        except ImportError as e:
+            raise ImportError("msgpack格式需要安装msgpack: pip install msgpack") from e
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    按Accept-Encoding选择压缩方式：br（已安装brotli时）优先于gzip，q=0的编码不使用
+    """
+    weights = {}
+    for item in (accept_encoding or '').lower().split(','):
+        name, _, params = item.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    candidates = ('br', 'gzip') if _brotli() is not None else ('gzip',)
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    config = ConfigManager()
+    if encoding == 'br':
+        return _brotli().compress(body, quality=config.get('api.compression.brotli_quality', 5))
+    return gzip.compress(body, compresslevel=config.get('api.compression.gzip_level', 6))
+
+
+def etag(body: bytes) -> str:
+    """弱ETag：同一内容的不同压缩形式视为同一版本"""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _not_modified(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = tag[2:]
+    return any(item.strip().removeprefix('W/') == opaque for item in if_none_match.split(','))
+
+
+def cached_response(request: Request, body: bytes, media_type: str) -> Response:
+    """
+    返回带ETag的响应
+
+    GET/HEAD 请求的 If-None-Match 命中时返回304（不含响应体）；
+    否则按Accept-Encoding压缩（小于 api.compression.minimum_size 的响应不压缩）。
+    Cache-Control: no-cache 让浏览器缓存响应体，但每次使用前用ETag向服务器确认。
+    """
+    tag = etag(body)
+    headers = {'ETag': tag, 'Cache-Control': 'no-cache', 'Vary': 'Accept, Accept-Encoding'}
+    if request.method in ('GET', 'HEAD') and _not_modified(request.headers.get('if-none-match'), tag):
+        return Response(status_code=304, headers=headers)
+
+    minimum_size = ConfigManager().get('api.compression.minimum_size', 1024)
+    encoding = negotiate_encoding(request.headers.get('accept-encoding')) if len(body) >= minimum_size else None
+    if encoding is not None:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return Response(body, media_type=media_type, headers=headers)
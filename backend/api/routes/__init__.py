@@ -1,6 +1,6 @@
 """
 API路由模块
 """
-from . import strategy, backtest, data, websocket, health, strategy_types
+from . import strategy, backtest, data, websocket, health, strategy_types, metrics
 
-__all__ = ['strategy', 'backtest', 'data', 'websocket', 'health', 'strategy_types']
+__all__ = ['strategy', 'backtest', 'data', 'websocket', 'health', 'strategy_types', 'metrics']
@@ -1,9 +1,13 @@
 """
 回测相关API路由（Controller层）
 """
-from fastapi import APIRouter, HTTPException, status
-from backend.models.schemas import BacktestRequest, BacktestResponse
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, status
+from backend.models.schemas import (
+    BacktestRequest, BacktestResponse, BacktestListResponse, SweepRequest, SweepResponse, JobResponse
+)
 from backend.services.backtest_service import BacktestService
+from backend.services.job_service import JobService
 
 router = APIRouter()
 
@@ -13,11 +17,12 @@ def get_backtest_service():
     return BacktestService()
 
 backtest_service = get_backtest_service()
+job_service = JobService()
 
 
 @router.post("/backtest/run", response_model=BacktestResponse, status_code=status.HTTP_201_CREATED)
-async def run_backtest(request: BacktestRequest):
-    """运行回测"""
+def run_backtest(request: BacktestRequest):
+    """运行回测（同步函数，由FastAPI在线程池中执行，不阻塞事件循环）"""
     try:
         return backtest_service.run_backtest(request)
     except ValueError as e:
@@ -32,8 +37,72 @@ async def run_backtest(request: BacktestRequest):
         )
 
 
+@router.post("/backtest/sweep", response_model=SweepResponse)
+def run_sweep(request: SweepRequest):
+    """参数扫描（同步函数，由FastAPI在线程池中执行，不阻塞事件循环）"""
+    try:
+        return backtest_service.run_sweep(request)
+    except (ValueError, ImportError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"参数扫描失败: {str(e)}"
+        )
+
+
+@router.post("/backtest/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_backtest_job(request: BacktestRequest):
+    """提交回测任务（立即返回任务ID，回测在后台进程池中执行）"""
+    try:
+        return job_service.submit(request)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+
+
+@router.get("/backtest/jobs", response_model=List[JobResponse])
+async def list_backtest_jobs():
+    """列出回测任务"""
+    return job_service.list_jobs()
+
+
+@router.get("/backtest/jobs/{job_id}", response_model=JobResponse)
+async def get_backtest_job(job_id: str):
+    """查询回测任务状态（完成后通过 backtest_id 获取回测结果）"""
+    job = job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"回测任务不存在: {job_id}"
+        )
+    return job
+
+
+@router.post("/backtest/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_backtest_job(job_id: str):
+    """取消回测任务"""
+    job = job_service.cancel(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"回测任务不存在: {job_id}"
+        )
+    return job
+
+
 @router.get("/backtest/{backtest_id}", response_model=BacktestResponse)
-async def get_backtest(backtest_id: str):
+def get_backtest(backtest_id: str):
     """获取回测结果"""
     backtest = backtest_service.get_backtest(backtest_id)
     if not backtest:
@@ -43,3 +112,29 @@ async def get_backtest(backtest_id: str):
         )
     return backtest
 
+
+@router.get("/backtests", response_model=BacktestListResponse)
+def list_backtests(
+    strategy_name: Optional[str] = None,
+    stock_code: Optional[str] = None,
+    start_date: Optional[str] = Query(None, description="回测开始日期不早于 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="回测结束日期不晚于 YYYY-MM-DD"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=200)
+):
+    """分页查询回测结果（按创建时间倒序）"""
+    return backtest_service.list_backtests(
+        strategy_name=strategy_name, stock_code=stock_code,
+        start_date=start_date, end_date=end_date,
+        page=page, page_size=page_size
+    )
+
+
+@router.delete("/backtests/{backtest_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_backtest(backtest_id: str):
+    """删除回测结果"""
+    if not backtest_service.delete_backtest(backtest_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"回测结果不存在: {backtest_id}"
+        )
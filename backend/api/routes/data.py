@@ -1,9 +1,10 @@
 """
 数据相关API路由（Controller层）
 """
-from fastapi import APIRouter, HTTPException, status
-from typing import List
-from backend.models.schemas import StockDataRequest, StockDataResponse
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from typing import List, Optional
+from backend.models.schemas import DataFormat, StockDataColumns, StockDataRequest, StockDataResponse
+from backend.api.responses import MEDIA_TYPES, cached_response, encode_columns, negotiate_format
 from backend.services.data_service import DataService
 
 router = APIRouter()
@@ -16,36 +17,83 @@ def get_data_service():
     return get_data_service._instance
 
 
+def _error_detail(e: Exception) -> str:
+    """错误信息（数据源配置问题附带提示）"""
+    error_msg = str(e)
+    # 提供更友好的错误信息
+    if "token" in error_msg.lower() or "tushare" in error_msg.lower():
+        error_msg = f"数据源配置错误: {error_msg}。请检查config/config.yaml中的data_source配置，或切换到akshare数据源。"
+    return error_msg
+
+
 @router.get("/data/stocks", response_model=List[str])
-async def get_stock_list():
-    """获取股票列表"""
+def get_stock_list():
+    """获取股票列表（同步函数，由FastAPI在线程池中执行，不阻塞事件循环）"""
     try:
         service = get_data_service()
         return service.get_stock_list()
     except Exception as e:
-        error_msg = str(e)
-        # 提供更友好的错误信息
-        if "token" in error_msg.lower() or "tushare" in error_msg.lower():
-            error_msg = f"数据源配置错误: {error_msg}。请检查config/config.yaml中的data_source配置，或切换到akshare数据源。"
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=error_msg
+            detail=_error_detail(e)
         )
 
 
-@router.post("/data/daily", response_model=StockDataResponse)
-async def get_daily_data(request: StockDataRequest):
-    """获取日线数据"""
+def _columns_response(http_request: Request, stock_code: str, start_date: str, end_date: str, fmt: str) -> Response:
+    """列式格式的日线数据（带ETag，按Accept-Encoding压缩）"""
+    columns = get_data_service().get_daily_columns(stock_code, start_date, end_date)
+    try:
+        body = encode_columns(stock_code, columns, fmt)
+    except ImportError as e:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=str(e))
+    return cached_response(http_request, body, MEDIA_TYPES[fmt])
+
+
+@router.post("/data/daily", response_model=StockDataResponse,
+             responses={200: {"description": "format为columnar/msgpack/arrow时返回列式数据（StockDataColumns）"}})
+def get_daily_data(request: StockDataRequest, http_request: Request):
+    """获取日线数据（同步函数，由FastAPI在线程池中执行，不阻塞事件循环）"""
+    fmt = request.format.value if request.format else negotiate_format(
+        http_request.headers.get('accept'), DataFormat.ROWS.value)
     try:
+        if fmt != DataFormat.ROWS.value:
+            return _columns_response(http_request, request.stock_code, request.start_date, request.end_date, fmt)
         service = get_data_service()
         return service.get_daily_data(request)
+    except HTTPException:
+        raise
     except Exception as e:
-        error_msg = str(e)
-        # 提供更友好的错误信息
-        if "token" in error_msg.lower() or "tushare" in error_msg.lower():
-            error_msg = f"数据源配置错误: {error_msg}。请检查config/config.yaml中的data_source配置，或切换到akshare数据源。"
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=error_msg
+            detail=_error_detail(e)
         )
 
+
+@router.get("/data/daily/{stock_code}", response_model=StockDataColumns)
+def get_daily_columns(
+    stock_code: str,
+    http_request: Request,
+    start_date: str = Query(..., description="开始日期 YYYY-MM-DD"),
+    end_date: str = Query(..., description="结束日期 YYYY-MM-DD"),
+    format: Optional[DataFormat] = Query(None, description="响应格式，留空则按Accept头协商，默认columnar")
+):
+    """
+    获取日线数据（列式，支持条件请求）
+
+    响应带ETag，浏览器再次请求时携带If-None-Match，数据未变化返回304；
+    支持gzip/br压缩，适合前端图表加载长历史行情。
+    同步函数，由FastAPI在线程池中执行，不阻塞事件循环。
+    """
+    fmt = format.value if format else negotiate_format(
+        http_request.headers.get('accept'), DataFormat.COLUMNAR.value)
+    if fmt == DataFormat.ROWS.value:
+        fmt = DataFormat.COLUMNAR.value
+    try:
+        return _columns_response(http_request, stock_code, start_date, end_date, fmt)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=_error_detail(e)
+        )
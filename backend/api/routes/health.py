@@ -32,6 +32,7 @@ async def check_data_source():
     """检查数据源状态"""
     try:
         from backend.services.data_service import DataService
+        from core.factory.data_factory import DataFactory
         service = DataService()
         
         if service.data_adapter is None:
@@ -42,7 +43,7 @@ async def check_data_source():
             }
         
         # 检查适配器类型和状态
-        adapter_type = type(service.data_adapter).__name__
+        adapter_type = DataFactory.adapter_class(service.data_adapter).__name__
         adapter_status = "ok"
         error_msg = None
         
@@ -51,11 +52,14 @@ async def check_data_source():
             if hasattr(service.data_adapter, 'error_message'):
                 error_msg = service.data_adapter.error_message
         
+        stats = DataFactory.router_stats()
         return {
             "status": adapter_status,
             "adapter_type": adapter_type,
             "message": error_msg or "数据源正常",
-            "suggestion": error_msg and "请检查配置或切换到akshare数据源" or None
+            "suggestion": error_msg and "请检查配置或切换到akshare数据源" or None,
+            "router": stats['router'],
+            "pools": stats['pools']
         }
     except Exception as e:
         return {
@@ -0,0 +1,73 @@
+"""
+性能指标API
+"""
+from typing import Dict, Any, List
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.strategy.profiler import phase_metrics
+from utils.metrics import REGISTRY, Gauge, Metric
+
+router = APIRouter()
+
+# Prometheus文本格式
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _collect_runtime() -> List[Metric]:
+    """导出时读取数据源路由、连接池、请求合并和回测任务队列的现有统计"""
+    from core.factory.data_factory import DataFactory
+    from core.data.singleflight import _default_group
+    from backend.services.job_service import JobService
+
+    metrics = []
+    stats = DataFactory.router_stats()
+
+    pool_sessions = Gauge('quant_data_pool_sessions', '数据源连接池会话数', ('source', 'state'))
+    pool_events = Gauge('quant_data_pool_session_events', '数据源连接池累计会话事件', ('source', 'event'))
+    for source, pool in stats['pools'].items():
+        pool_sessions.labels(source, 'open').set(pool['open'])
+        pool_sessions.labels(source, 'idle').set(pool['idle'])
+        for event in ('created', 'reused', 'discarded'):
+            pool_events.labels(source, event).set(pool[event])
+    metrics += [pool_sessions, pool_events]
+
+    if stats['router'] is not None:
+        circuit = Gauge('quant_data_source_circuit_open', '数据源熔断器是否打开（半开为0.5）', ('source',))
+        latency = Gauge('quant_data_source_latency_seconds', '数据源最近调用的延迟分位数（秒）',
+                        ('source', 'quantile'))
+        for source, item in stats['router']['sources'].items():
+            circuit.labels(source).set({'open': 1, 'half_open': 0.5}.get(item['circuit'], 0))
+            for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                if item[key] is not None:
+                    latency.labels(source, quantile).set(item[key] / 1000)
+        metrics += [circuit, latency]
+
+    coalesce = Gauge('quant_data_coalesce_requests', '日线请求合并统计', ('kind',))
+    for kind, value in _default_group.stats().items():
+        coalesce.labels(kind).set(value)
+    metrics.append(coalesce)
+
+    jobs = Gauge('quant_backtest_jobs', '回测任务队列中的任务数', ('status',))
+    for job in JobService().list_jobs():
+        jobs.labels(job.status.value).inc()
+    metrics.append(jobs)
+    return metrics
+
+
+REGISTRY.register_collector(_collect_runtime)
+
+
+def render_metrics() -> PlainTextResponse:
+    """全部指标（Prometheus文本格式）"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@router.get("/metrics/strategies", response_model=Dict[str, Any])
+def get_strategy_metrics():
+    """
+    策略各运行阶段的聚合耗时直方图（需开启 profiling.enabled）
+    
+    按策略类和阶段汇总本进程内的回测；任务队列中的回测在子进程运行，只记录在各自结果的 data_info 中
+    """
+    return phase_metrics.snapshot()
@@ -3,6 +3,7 @@ FastAPI应用主入口
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import sys
 from pathlib import Path
 
@@ -10,8 +11,14 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from backend.api.routes import strategy, backtest, data, websocket, health, strategy_types
+from backend.api.routes import strategy, backtest, data, websocket, health, strategy_types, metrics
+from backend.api.middleware import MetricsMiddleware
 from core.config_manager import ConfigManager
+from core.calendar.trading_calendar import get_calendar
+from utils.logger import setup_logging
+
+# 日志输出只在入口配置，库代码中的 get_logger 只绑定组件名
+setup_logging()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -31,12 +38,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（已自行压缩的响应，如列式日线数据，不会重复压缩）
+app.add_middleware(GZipMiddleware,
+                   minimum_size=ConfigManager().get('api.compression.minimum_size', 1024),
+                   compresslevel=ConfigManager().get('api.compression.gzip_level', 6))
+
+# 请求计时（延迟、进行中请求数、请求/响应大小）
+app.add_middleware(MetricsMiddleware)
+
 # 注册路由
 app.include_router(strategy.router, prefix="/api/v1", tags=["策略"])
 app.include_router(strategy_types.router, prefix="/api/v1", tags=["策略类型"])
 app.include_router(backtest.router, prefix="/api/v1", tags=["回测"])
 app.include_router(data.router, prefix="/api/v1", tags=["数据"])
 app.include_router(health.router, prefix="/api/v1", tags=["健康检查"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["性能指标"])
 app.include_router(websocket.router, prefix="/ws", tags=["WebSocket"])
 
 
@@ -47,6 +63,10 @@ async def startup_event():
     print("✓ API服务器启动完成")
     print(f"✓ 文档地址: http://localhost:8000/api/docs")
     
+    # 交易日历在启动时加载一次（可能需要联网），回测任务进程从主进程继承，不再各自获取
+    calendar = get_calendar()
+    print(f"✓ 交易日历: {calendar.first.date()} ~ {calendar.last.date()}")
+    
     # 检查数据源配置（不阻止启动）
     try:
         from backend.services.data_service import DataService
@@ -60,6 +80,15 @@ async def startup_event():
         print("提示：可以在config/config.yaml中配置数据源，或使用默认的akshare")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止回测任务进程池，关闭数据源连接"""
+    from backend.services.job_service import JobService
+    from core.factory.data_factory import DataFactory
+    JobService().shutdown()
+    DataFactory.close_pools()
+
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -76,6 +105,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus指标（文本格式）"""
+    return metrics.render_metrics()
+
+
 if __name__ == "__main__":
     import uvicorn
     # 直接传递app对象，而不是字符串路径
@@ -8,10 +8,18 @@ from .schemas import (
     BacktestRequest,
     BacktestResponse,
     BacktestMetrics,
+    BacktestSummary,
+    BacktestListResponse,
     TradeRecord,
+    JobStatus,
+    JobResponse,
+    SweepRequest,
+    SweepResponse,
     StockDataRequest,
     StockDataResponse,
     StockDataPoint,
+    StockDataColumns,
+    DataFormat,
     ErrorResponse,
     StrategyType
 )
@@ -23,10 +31,18 @@ __all__ = [
     'BacktestRequest',
     'BacktestResponse',
     'BacktestMetrics',
+    'BacktestSummary',
+    'BacktestListResponse',
     'TradeRecord',
+    'JobStatus',
+    'JobResponse',
+    'SweepRequest',
+    'SweepResponse',
     'StockDataRequest',
     'StockDataResponse',
     'StockDataPoint',
+    'StockDataColumns',
+    'DataFormat',
     'ErrorResponse',
     'StrategyType'
 ]
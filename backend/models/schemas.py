@@ -1,7 +1,7 @@
 """
 Pydantic数据模型（Model层）
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -69,6 +69,9 @@ class BacktestMetrics(BaseModel):
     buy_hold_return: float = Field(..., description="买入持有收益率")
     excess_return: float = Field(..., description="超额收益")
     max_drawdown: float = Field(..., description="最大回撤")
+    annual_return: float = Field(0.0, description="年化收益率")
+    volatility: float = Field(0.0, description="年化波动率")
+    sharpe_ratio: float = Field(0.0, description="夏普比率")
     total_trades: int = Field(..., description="总交易次数")
     win_rate: float = Field(..., description="胜率")
 
@@ -93,11 +96,99 @@ class BacktestResponse(BaseModel):
     data_info: Optional[Dict] = None  # 数据获取信息
 
 
+class BacktestSummary(BaseModel):
+    """回测结果摘要模型（不含交易明细和日志）"""
+    id: str
+    strategy_name: str
+    stock_code: str
+    stock_name: Optional[str] = None
+    start_date: str
+    end_date: str
+    initial_capital: float
+    final_cash: float
+    final_value: Optional[float] = None
+    total_trades: int
+    metrics: BacktestMetrics
+    created_at: datetime
+
+
+class BacktestListResponse(BaseModel):
+    """回测结果分页列表模型"""
+    total: int
+    page: int
+    page_size: int
+    items: List[BacktestSummary]
+
+
+class JobStatus(str, Enum):
+    """回测任务状态"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobResponse(BaseModel):
+    """回测任务响应模型"""
+    id: str
+    status: JobStatus
+    strategy_id: str
+    stock_code: str
+    backtest_id: Optional[str] = None  # 完成后的回测结果ID
+    error: Optional[str] = None  # 失败原因
+    submitted_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class SweepRequest(BaseModel):
+    """参数扫描请求模型"""
+    strategy_type: StrategyType = Field(..., description="策略类型")
+    param_space: Dict[str, List[Any]] = Field(..., description="参数空间 {参数名: [候选值...]}")
+    method: str = Field("grid", description="采样方式 grid/random/bayesian")
+    n_samples: int = Field(50, description="random/bayesian 采样次数")
+    stock_codes: List[str] = Field(..., description="股票代码列表")
+    start_date: str = Field(..., description="开始日期 YYYY-MM-DD")
+    end_date: str = Field(..., description="结束日期 YYYY-MM-DD")
+    initial_capital: float = Field(1000000, description="初始资金")
+    metric: str = Field("sharpe_ratio", description="排序指标（回测指标字段或 final_value）")
+    max_workers: Optional[int] = Field(None, description="进程数，默认使用全部CPU核心")
+    top_n: Optional[int] = Field(None, description="只返回排名前N的结果")
+
+    @field_validator('metric')
+    @classmethod
+    def check_metric(cls, value: str) -> str:
+        """在加载数据前拒绝不支持的排序指标"""
+        metrics = list(BacktestMetrics.model_fields) + ['final_value']
+        if value not in metrics:
+            raise ValueError(f"不支持的排序指标: {value}，可选: {', '.join(metrics)}")
+        return value
+
+
+class SweepResponse(BaseModel):
+    """参数扫描响应模型"""
+    strategy_type: str
+    metric: str
+    total: int  # 评估的参数组合数
+    stock_codes: List[str]
+    elapsed: float  # 耗时（秒）
+    results: List[Dict[str, Any]]  # 按指标由优到劣排列（最大回撤、波动率、交易次数升序）
+
+
+class DataFormat(str, Enum):
+    """日线数据响应格式"""
+    ROWS = "rows"          # 逐行对象数组（StockDataResponse）
+    COLUMNAR = "columnar"  # 列式JSON（各字段的并列数组）
+    MSGPACK = "msgpack"    # 列式msgpack（需要安装msgpack）
+    ARROW = "arrow"        # Arrow IPC流（需要安装pyarrow）
+
+
 class StockDataRequest(BaseModel):
     """股票数据请求模型"""
     stock_code: str = Field(..., description="股票代码")
     start_date: str = Field(..., description="开始日期 YYYY-MM-DD")
     end_date: str = Field(..., description="结束日期 YYYY-MM-DD")
+    format: Optional[DataFormat] = Field(None, description="响应格式，留空则按Accept头协商，默认rows")
 
 
 class StockDataPoint(BaseModel):
@@ -116,6 +207,13 @@ class StockDataResponse(BaseModel):
     data: List[StockDataPoint]
 
 
+class StockDataColumns(BaseModel):
+    """股票数据列式响应模型（columnar格式）"""
+    stock_code: str
+    count: int  # 行数
+    columns: Dict[str, List[Any]]  # {字段名: 并列数组}，字段为 date/open/high/low/close/volume
+
+
 class ErrorResponse(BaseModel):
     """错误响应模型"""
     error: str
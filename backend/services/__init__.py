@@ -4,6 +4,7 @@
 from .strategy_service import StrategyService
 from .backtest_service import BacktestService
 from .data_service import DataService
+from .job_service import JobService
 
-__all__ = ['StrategyService', 'BacktestService', 'DataService']
+__all__ = ['StrategyService', 'BacktestService', 'DataService', 'JobService']
 
@@ -3,7 +3,9 @@
 """
 from typing import Optional, Dict, List
 from datetime import datetime
+from contextlib import contextmanager
 import uuid
+import time
 import pandas as pd
 import sys
 from pathlib import Path
@@ -14,34 +16,68 @@ sys.path.insert(0, str(project_root))
 
 from core.factory.data_factory import DataFactory
 from backtest.backtest_engine import BacktestEngine
-from backend.models.schemas import BacktestRequest, BacktestResponse, BacktestMetrics, TradeRecord
+from backtest.optimizer import ParameterSweep
+from backend.models.schemas import (
+    BacktestRequest, BacktestResponse, BacktestMetrics, TradeRecord, SweepRequest, SweepResponse,
+    BacktestSummary, BacktestListResponse
+)
 from backend.services.strategy_service import StrategyService
+from backend.services.result_store import ResultStore, create_result_store
+from core.strategy.base_strategy import BaseStrategy
+from utils.logger import get_logger, capture_run_logs
+from utils.metrics import REGISTRY, Counter, Histogram
+
+service_logger = get_logger('回测服务')
+
+# 回测耗时：kind=run/sweep/job（job为从提交到完成的时间），outcome=ok/error/cancelled
+BACKTEST_SECONDS = Histogram(
+    'quant_backtest_seconds', '回测耗时（秒）', ('kind', 'outcome'), REGISTRY,
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+)
+BACKTEST_BARS = Counter('quant_backtest_bars_total', '回测处理的K线数量', ('kind',), REGISTRY)
 
 
 class LogCollector:
     """日志收集器（用于收集回测过程中的日志）"""
     def __init__(self):
         self.logs = []
+        self._buffer = None
+    
+    @contextmanager
+    def collect(self):
+        """在代码块内收集本次回测的日志（包括回测引擎和策略产生的日志）"""
+        with capture_run_logs() as buffer:
+            self._buffer = buffer
+            yield self
     
     def add(self, message: str, level: str = "INFO"):
         """添加日志"""
+        if self._buffer is not None:
+            level = "WARNING" if level == "WARN" else level
+            service_logger.bind(run_id=self._buffer.run_id, pinned=True).log(level, message)
+            return
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         self.logs.append(f"[{timestamp}] [{level}] {message}")
     
     def get_logs(self) -> List[str]:
         """获取所有日志"""
+        if self._buffer is not None:
+            return self.logs + self._buffer.get_logs()
         return self.logs.copy()
     
     def clear(self):
         """清空日志"""
         self.logs = []
+        if self._buffer is not None:
+            self._buffer.records.clear()
+            self._buffer.pinned.clear()
 
 
 class BacktestService:
     """回测服务"""
     
     _instance = None
-    _backtests: Dict[str, Dict] = {}
+    _store: ResultStore = None
     _initialized = False
     
     def __new__(cls):
@@ -52,21 +88,53 @@ class BacktestService:
     def __init__(self):
         # 只初始化一次
         if not BacktestService._initialized:
-            BacktestService._backtests = {}
+            BacktestService._store = create_result_store()
             BacktestService._initialized = True
-        # 使用类变量，确保所有实例共享数据
-        self._backtests = BacktestService._backtests
+        # 使用类变量，确保所有实例共享同一个结果存储
+        self.store = BacktestService._store
         # 使用单例的 StrategyService
         self.strategy_service = StrategyService()
     
     def run_backtest(self, request: BacktestRequest) -> BacktestResponse:
         """运行回测"""
-        # 创建日志收集器
+        # 创建日志收集器，收集本次回测全过程的日志
         log_collector = LogCollector()
+        with BacktestService.timed('run'):
+            with log_collector.collect():
+                backtest_response = self._run_backtest(request, log_collector)
+        BACKTEST_BARS.labels('run').inc((backtest_response.data_info or {}).get('data_count', 0))
+        self.save_result(backtest_response.dict())
+        return backtest_response
+    
+    @staticmethod
+    @contextmanager
+    def timed(kind: str):
+        """记录回测耗时指标（区分成功和失败）"""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            BACKTEST_SECONDS.labels(kind, outcome).observe(time.perf_counter() - start)
+    
+    def save_result(self, backtest_dict: Dict):
+        """保存回测结果"""
+        self.store.save(backtest_dict)
+    
+    def _run_backtest(self, request: BacktestRequest, log_collector: LogCollector,
+                      strategy: BaseStrategy = None) -> BacktestResponse:
+        """
+        运行回测（在日志收集上下文中执行，不保存结果）
+        
+        Args:
+            strategy: 策略实例，为None时按 request.strategy_id 从策略服务获取
+        """
         log_collector.add(f"开始回测: 策略ID={request.strategy_id}, 股票={request.stock_code}, 日期范围={request.start_date} 至 {request.end_date}")
         
         # 获取策略实例
-        strategy = self.strategy_service.get_strategy_instance(request.strategy_id)
+        if strategy is None:
+            strategy = self.strategy_service.get_strategy_instance(request.strategy_id)
         if not strategy:
             error_msg = f"策略不存在: {request.strategy_id}"
             log_collector.add(error_msg, "ERROR")
@@ -78,7 +146,7 @@ class BacktestService:
         try:
             log_collector.add("正在连接数据源...")
             data_adapter = DataFactory.create_adapter()
-            data_source_type = type(data_adapter).__name__
+            data_source_type = DataFactory.adapter_class(data_adapter).__name__
             log_collector.add(f"数据源: {data_source_type}")
             
             log_collector.add(f"正在获取股票数据: {request.stock_code} ({request.start_date} 至 {request.end_date})")
@@ -137,6 +205,9 @@ class BacktestService:
         log_collector.add(f"开始运行回测引擎，初始资金: ¥{request.initial_capital:,.2f}")
         backtest_engine = BacktestEngine(strategy, request.initial_capital)
         result = backtest_engine.run(data, request.stock_code)
+        if strategy.profiler is not None:
+            data_info['profile'] = strategy.profiler.summary()
+            log_collector.add(f"阶段耗时: {data_info['profile']['total_ms']:.1f}ms")
         
         # 收集回测结果信息
         final_value = result.get('final_value', result['final_cash'])
@@ -166,6 +237,9 @@ class BacktestService:
             buy_hold_return=result['metrics'].get('buy_hold_return', 0),
             excess_return=result['metrics'].get('excess_return', 0),
             max_drawdown=result['metrics'].get('max_drawdown', 0),
+            annual_return=result['metrics'].get('annual_return', 0),
+            volatility=result['metrics'].get('volatility', 0),
+            sharpe_ratio=result['metrics'].get('sharpe_ratio', 0),
             total_trades=result['total_trades'],
             win_rate=result['metrics'].get('win_rate', 0)
         )
@@ -189,21 +263,77 @@ class BacktestService:
             data_info=data_info  # 添加数据信息
         )
         
-        # 保存到内存（生产环境应保存到数据库）
-        backtest_dict = backtest_response.dict()
-        self._backtests[backtest_id] = backtest_dict
-        
         return backtest_response
     
+    def run_sweep(self, request: SweepRequest) -> SweepResponse:
+        """运行参数扫描（行情数据只加载一次，由所有工作进程共享）"""
+        with BacktestService.timed('sweep'):
+            return self._run_sweep(request)
+    
+    def _run_sweep(self, request: SweepRequest) -> SweepResponse:
+        strategy_type = request.strategy_type.value
+        if not request.stock_codes:
+            raise ValueError("股票代码列表不能为空")
+        
+        data_adapter = DataFactory.create_adapter()
+        data = {}
+        for stock_code in request.stock_codes:
+            frame = data_adapter.get_daily_data(stock_code, request.start_date, request.end_date)
+            if frame.empty:
+                service_logger.warning("参数扫描跳过无数据的股票: {}", stock_code)
+                continue
+            data[stock_code] = frame
+        if not data:
+            raise ValueError("所有股票均无法获取数据，无法进行参数扫描")
+        
+        BACKTEST_BARS.labels('sweep').inc(sum(len(frame) for frame in data.values()))
+        sweep = ParameterSweep(
+            strategy_type,
+            request.param_space,
+            method=request.method,
+            n_samples=request.n_samples,
+            metric=request.metric,
+            initial_capital=request.initial_capital,
+            max_workers=request.max_workers
+        )
+        results = sweep.run(data)
+        total = len(results)
+        if request.top_n:
+            results = results.head(request.top_n)
+        
+        return SweepResponse(
+            strategy_type=strategy_type,
+            metric=request.metric,
+            total=total,
+            stock_codes=list(data.keys()),
+            elapsed=results.attrs.get('elapsed', 0.0),
+            results=results.to_dict(orient='records')
+        )
+    
     def get_backtest(self, backtest_id: str) -> Optional[BacktestResponse]:
         """获取回测结果"""
-        if backtest_id not in self._backtests:
+        data = self.store.get(backtest_id)
+        if data is None:
             return None
-        
-        data = self._backtests[backtest_id]
-        # 调试：打印读取的数据
-        print(f"[回测服务] 读取数据 - stock_name字段: {data.get('stock_name')}")
-        response = BacktestResponse(**data)
-        print(f"[回测服务] 返回响应 - stock_name: {response.stock_name}")
-        return response
-
+        service_logger.debug("读取回测结果 - stock_name字段: {}", data.get('stock_name'))
+        return BacktestResponse(**data)
+    
+    def list_backtests(self, strategy_name: str = None, stock_code: str = None,
+                       start_date: str = None, end_date: str = None,
+                       page: int = 1, page_size: int = 20) -> BacktestListResponse:
+        """分页查询回测结果摘要（按创建时间倒序）"""
+        total, items = self.store.query(
+            strategy_name=strategy_name, stock_code=stock_code,
+            start_date=start_date, end_date=end_date,
+            page=page, page_size=page_size
+        )
+        return BacktestListResponse(
+            total=total,
+            page=page,
+            page_size=page_size,
+            items=[BacktestSummary(**item) for item in items]
+        )
+    
+    def delete_backtest(self, backtest_id: str) -> bool:
+        """删除回测结果"""
+        return self.store.delete(backtest_id)
@@ -1,7 +1,7 @@
 """
 数据服务层（Service层）
 """
-from typing import List
+from typing import Dict, List
 import sys
 from pathlib import Path
 
@@ -10,10 +10,17 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from core.factory.data_factory import DataFactory
-from backend.models.schemas import StockDataRequest, StockDataResponse, StockDataPoint
+from core.calendar.trading_calendar import normalize_date
+from backend.models.schemas import StockDataRequest, StockDataResponse
+import numpy as np
 import pandas as pd
 
 
+# 日线响应包含的字段（按顺序）
+DAILY_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+DAILY_DTYPES = {'date': object, 'open': float, 'high': float, 'low': float, 'close': float, 'volume': np.int64}
+
+
 class DataService:
     """数据服务"""
     
@@ -47,35 +54,30 @@ class DataService:
         return self.data_adapter.get_stock_list()
     
     def get_daily_data(self, request: StockDataRequest) -> StockDataResponse:
-        """获取日线数据"""
-        self._ensure_adapter()
-        data = self.data_adapter.get_daily_data(
-            request.stock_code,
-            request.start_date.replace('-', ''),
-            request.end_date.replace('-', '')
-        )
-        
-        if data.empty:
-            return StockDataResponse(
-                stock_code=request.stock_code,
-                data=[]
-            )
-        
-        # 转换为响应格式
+        """获取日线数据（逐行格式）"""
+        columns = self.get_daily_columns(request.stock_code, request.start_date, request.end_date)
         data_points = [
-            StockDataPoint(
-                date=row['date'].strftime('%Y-%m-%d'),
-                open=float(row['open']),
-                high=float(row['high']),
-                low=float(row['low']),
-                close=float(row['close']),
-                volume=int(row['volume'])
-            )
-            for _, row in data.iterrows()
+            dict(zip(DAILY_COLUMNS, row))
+            for row in zip(*(columns[name].tolist() for name in DAILY_COLUMNS))
         ]
-        
         return StockDataResponse(
             stock_code=request.stock_code,
             data=data_points
         )
 
+    def get_daily_columns(self, stock_code: str, start_date: str, end_date: str) -> Dict[str, np.ndarray]:
+        """获取日线数据（列式格式）：{字段名: 数组}，日期为 YYYY-MM-DD 字符串"""
+        self._ensure_adapter()
+        data = self.data_adapter.get_daily_data(
+            stock_code,
+            normalize_date(start_date, compact=True) or start_date,
+            normalize_date(end_date, compact=True) or end_date
+        )
+        if data.empty:
+            return {name: np.array([], dtype=DAILY_DTYPES[name]) for name in DAILY_COLUMNS}
+
+        # 整列转换，避免逐行构造对象
+        columns = {'date': pd.to_datetime(data['date']).dt.strftime('%Y-%m-%d').to_numpy(dtype=object)}
+        for name in DAILY_COLUMNS[1:]:
+            columns[name] = data[name].to_numpy(dtype=DAILY_DTYPES[name])
+        return columns
@@ -0,0 +1,205 @@
+"""
+回测任务服务层（Service层）- 异步任务队列
+"""
+import os
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Optional
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.config_manager import ConfigManager
+from core.calendar.trading_calendar import TradingCalendar, get_calendar, set_calendar
+from core.factory.strategy_factory import StrategyFactory
+from backend.models.schemas import BacktestRequest, JobResponse, JobStatus
+from backend.services.backtest_service import BacktestService, LogCollector, BACKTEST_SECONDS, BACKTEST_BARS
+from backend.services.strategy_service import StrategyService
+from utils.logger import get_logger, setup_logging
+
+job_logger = get_logger('回测任务')
+
+
+def _init_worker(calendar: TradingCalendar):
+    """工作进程初始化：日志只输出到控制台，避免多进程同时轮转日志文件；沿用主进程的交易日历"""
+    setup_logging(enqueue=False, log_file='', force=True)
+    set_calendar(calendar)
+
+
+def _run_job(request_data: Dict, strategy_type: str, strategy_class: type, params: Dict) -> Dict:
+    """在工作进程中按策略类型和参数重建策略并运行回测，返回可序列化的结果"""
+    StrategyFactory.register_strategy(strategy_type, strategy_class)
+    strategy = StrategyFactory.create_strategy(strategy_type, dict(params or {}))
+    request = BacktestRequest(**request_data)
+    log_collector = LogCollector()
+    with log_collector.collect():
+        response = BacktestService()._run_backtest(request, log_collector, strategy)
+    return response.dict()
+
+
+class JobService:
+    """
+    回测任务服务（单例模式）
+
+    提交后立即返回任务ID，回测在有界进程池中执行，完成后结果写入 BacktestService 的结果存储。
+    进程池无法中断正在运行的任务：取消排队中的任务会直接移出队列，
+    取消运行中的任务只会丢弃其结果。
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(JobService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if JobService._initialized:
+            return
+        config = ConfigManager()
+        self.max_workers = config.get('jobs.max_workers') or os.cpu_count() or 1
+        self.max_pending = config.get('jobs.max_pending', 100)
+        self.max_history = config.get('jobs.max_history', 1000)
+        self._jobs: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.backtest_service = BacktestService()
+        self.strategy_service = StrategyService()
+        JobService._initialized = True
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                 initargs=(get_calendar(),))
+        return self._executor
+
+    def submit(self, request: BacktestRequest) -> JobResponse:
+        """提交回测任务"""
+        info = self.strategy_service._strategies.get(request.strategy_id)
+        if info is None:
+            raise ValueError(f"策略不存在: {request.strategy_id}")
+        strategy_type = info['strategy_type']
+        strategy_class = StrategyFactory._strategies[strategy_type]
+
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job['future'].done())
+            if pending >= self.max_pending:
+                raise RuntimeError(f"任务队列已满（{self.max_pending}），请稍后再试")
+
+            job_id = str(uuid.uuid4())
+            args = (request.dict(), strategy_type, strategy_class, info['params'])
+            try:
+                future = self._get_executor().submit(_run_job, *args)
+            except BrokenProcessPool:
+                # 工作进程异常退出后进程池不可用，重建后重试一次
+                job_logger.warning("回测进程池已损坏，重新创建")
+                self._executor = None
+                future = self._get_executor().submit(_run_job, *args)
+
+            self._jobs[job_id] = {
+                'id': job_id,
+                'future': future,
+                'request': request,
+                'cancelled': False,
+                'backtest_id': None,
+                'error': None,
+                'submitted_at': datetime.now(),
+                'finished_at': None
+            }
+            self._trim_history()
+
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+        job_logger.info("提交回测任务 {}: 策略ID={}, 股票={}", job_id, request.strategy_id, request.stock_code)
+        return self.get_job(job_id)
+
+    def _on_done(self, job_id: str, future: Future):
+        """任务结束回调（在进程池的管理线程中执行）"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job['finished_at'] = datetime.now()
+        elapsed = (job['finished_at'] - job['submitted_at']).total_seconds()
+        if future.cancelled() or job['cancelled']:
+            BACKTEST_SECONDS.labels('job', 'cancelled').observe(elapsed)
+            return
+        try:
+            backtest_dict = future.result()
+        except Exception as e:
+            job['error'] = str(e)
+            BACKTEST_SECONDS.labels('job', 'error').observe(elapsed)
+            job_logger.warning("回测任务 {} 失败: {}", job_id, e)
+            return
+        BACKTEST_SECONDS.labels('job', 'ok').observe(elapsed)
+        BACKTEST_BARS.labels('job').inc((backtest_dict.get('data_info') or {}).get('data_count', 0))
+        self.backtest_service.save_result(backtest_dict)
+        job['backtest_id'] = backtest_dict['id']
+        job_logger.info("回测任务 {} 完成，结果ID={}", job_id, backtest_dict['id'])
+
+    def _trim_history(self):
+        """只保留最近 max_history 个已结束的任务记录"""
+        finished = [job_id for job_id, job in self._jobs.items() if job['future'].done()]
+        for job_id in finished[:max(len(finished) - self.max_history, 0)]:
+            del self._jobs[job_id]
+
+    def get_job(self, job_id: str) -> Optional[JobResponse]:
+        """查询任务状态"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return JobResponse(
+            id=job['id'],
+            status=self._status(job),
+            strategy_id=job['request'].strategy_id,
+            stock_code=job['request'].stock_code,
+            backtest_id=job['backtest_id'],
+            error=job['error'],
+            submitted_at=job['submitted_at'],
+            finished_at=job['finished_at']
+        )
+
+    def list_jobs(self) -> List[JobResponse]:
+        """列出所有任务（按提交时间倒序）"""
+        with self._lock:
+            job_ids = list(self._jobs.keys())
+        return [job for job in map(self.get_job, reversed(job_ids)) if job is not None]
+
+    def cancel(self, job_id: str) -> Optional[JobResponse]:
+        """取消任务"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        future = job['future']
+        if not future.done() and not future.cancel():
+            # 已在工作进程中运行，无法中断，结束后丢弃结果
+            job['cancelled'] = True
+        job_logger.info("取消回测任务 {}", job_id)
+        return self.get_job(job_id)
+
+    @staticmethod
+    def _status(job: Dict) -> JobStatus:
+        future = job['future']
+        if job['cancelled'] or future.cancelled():
+            return JobStatus.CANCELLED
+        if not future.done():
+            return JobStatus.RUNNING if future.running() else JobStatus.PENDING
+        if job['backtest_id'] is not None:
+            return JobStatus.COMPLETED
+        if job['error'] is not None:
+            return JobStatus.FAILED
+        # 任务已结束但回调尚未执行
+        return JobStatus.RUNNING
+
+    def shutdown(self):
+        """关闭进程池（取消所有排队中的任务）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
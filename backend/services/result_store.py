@@ -0,0 +1,323 @@
+"""
+回测结果存储 - 持久化、可索引的结果存储（带内存热缓存）
+"""
+import io
+import json
+import zlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config_manager import ConfigManager
+
+
+# 交易记录的列式编码
+_ACTIONS = {'buy': 1, 'sell': -1}
+_ACTION_NAMES = {1: 'buy', -1: 'sell'}
+
+
+def encode_trades(trades: List[Dict]) -> bytes:
+    """交易记录列表 -> 压缩的列式二进制（npz）"""
+    columns = {
+        'time': pd.to_datetime([t['time'] for t in trades], format='mixed').to_numpy(dtype='datetime64[us]')
+        if trades else np.empty(0, dtype='datetime64[us]'),
+        'stock_code': np.array([t['stock_code'] for t in trades], dtype=str),
+        'action': np.array([_ACTIONS.get(t['action'], 0) for t in trades], dtype=np.int8),
+        'price': np.array([t['price'] for t in trades], dtype=np.float64),
+        'shares': np.array([t['shares'] for t in trades], dtype=np.int64),
+        'amount': np.array([t['amount'] for t in trades], dtype=np.float64),
+    }
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    return buffer.getvalue()
+
+
+def decode_trades(blob: bytes) -> List[Dict]:
+    """压缩的列式二进制 -> 交易记录列表"""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as columns:
+        times = columns['time'].astype('datetime64[us]').tolist()
+        codes = columns['stock_code'].tolist()
+        actions = columns['action'].tolist()
+        prices = columns['price'].tolist()
+        shares = columns['shares'].tolist()
+        amounts = columns['amount'].tolist()
+    return [
+        {
+            'time': times[i],
+            'stock_code': codes[i],
+            'action': _ACTION_NAMES.get(actions[i], 'unknown'),
+            'price': prices[i],
+            'shares': shares[i],
+            'amount': amounts[i]
+        }
+        for i in range(len(times))
+    ]
+
+
+def encode_json(value) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def decode_json(blob: Optional[bytes]):
+    if blob is None:
+        return None
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+class ResultStore(ABC):
+    """
+    回测结果存储基类
+
+    结果以 BacktestResponse.dict() 的形式读写；最近访问的结果保存在内存LRU热缓存中。
+    """
+
+    # 列表查询返回的摘要字段（不含交易明细和日志）
+    SUMMARY_FIELDS = (
+        'id', 'strategy_name', 'stock_code', 'stock_name', 'start_date', 'end_date',
+        'initial_capital', 'final_cash', 'final_value', 'total_trades', 'metrics', 'created_at'
+    )
+
+    def __init__(self, hot_size: int = 128):
+        self.hot_size = hot_size
+        self._hot: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._hot_lock = threading.Lock()
+
+    def save(self, result: Dict):
+        """保存回测结果"""
+        self._save(result)
+        self._remember(result['id'], result)
+
+    def get(self, backtest_id: str) -> Optional[Dict]:
+        """按ID获取完整回测结果"""
+        with self._hot_lock:
+            result = self._hot.get(backtest_id)
+            if result is not None:
+                self._hot.move_to_end(backtest_id)
+                return result
+        result = self._load(backtest_id)
+        if result is not None:
+            self._remember(backtest_id, result)
+        return result
+
+    def delete(self, backtest_id: str) -> bool:
+        """删除回测结果"""
+        with self._hot_lock:
+            self._hot.pop(backtest_id, None)
+        return self._delete(backtest_id)
+
+    def _remember(self, backtest_id: str, result: Dict):
+        if self.hot_size <= 0:
+            return
+        with self._hot_lock:
+            self._hot[backtest_id] = result
+            self._hot.move_to_end(backtest_id)
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    @abstractmethod
+    def query(self, strategy_name: str = None, stock_code: str = None,
+              start_date: str = None, end_date: str = None,
+              page: int = 1, page_size: int = 20) -> Tuple[int, List[Dict]]:
+        """
+        按条件分页查询结果摘要（按创建时间倒序）
+
+        start_date/end_date 为区间过滤：只返回回测区间落在 [start_date, end_date] 内的结果
+
+        Returns:
+            (总数, 当前页摘要列表)
+        """
+
+    @abstractmethod
+    def _save(self, result: Dict):
+        pass
+
+    @abstractmethod
+    def _load(self, backtest_id: str) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    def _delete(self, backtest_id: str) -> bool:
+        pass
+
+
+class MemoryResultStore(ResultStore):
+    """内存结果存储（进程内，重启后丢失），超过容量时淘汰最早的结果"""
+
+    def __init__(self, max_size: int = 1000):
+        # 数据本身就在内存中，不需要额外的热缓存
+        super().__init__(hot_size=0)
+        self.max_size = max_size
+        self._items: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _save(self, result: Dict):
+        with self._lock:
+            self._items[result['id']] = result
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def _load(self, backtest_id: str) -> Optional[Dict]:
+        return self._items.get(backtest_id)
+
+    def _delete(self, backtest_id: str) -> bool:
+        with self._lock:
+            return self._items.pop(backtest_id, None) is not None
+
+    def query(self, strategy_name: str = None, stock_code: str = None,
+              start_date: str = None, end_date: str = None,
+              page: int = 1, page_size: int = 20) -> Tuple[int, List[Dict]]:
+        with self._lock:
+            items = list(self._items.values())
+        matched = [
+            item for item in reversed(items)
+            if (strategy_name is None or item['strategy_name'] == strategy_name)
+            and (stock_code is None or item['stock_code'] == stock_code)
+            and (start_date is None or item['start_date'] >= start_date)
+            and (end_date is None or item['end_date'] <= end_date)
+        ]
+        offset = (max(page, 1) - 1) * page_size
+        return len(matched), [
+            {field: item.get(field) for field in self.SUMMARY_FIELDS}
+            for item in matched[offset:offset + page_size]
+        ]
+
+
+class SQLiteResultStore(ResultStore):
+    """
+    SQLite结果存储
+
+    摘要字段存为带索引的普通列，交易明细按列压缩为二进制，日志和数据信息压缩为JSON。
+    每次操作使用独立连接并开启WAL，多个线程和uvicorn工作进程可共享同一数据库文件。
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS backtests (
+            id TEXT PRIMARY KEY,
+            strategy_name TEXT NOT NULL,
+            stock_code TEXT NOT NULL,
+            stock_name TEXT,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            initial_capital REAL,
+            final_cash REAL,
+            final_value REAL,
+            total_trades INTEGER,
+            metrics TEXT,
+            final_positions TEXT,
+            created_at TEXT NOT NULL,
+            trades BLOB,
+            logs BLOB,
+            data_info BLOB
+        );
+        CREATE INDEX IF NOT EXISTS idx_backtests_strategy ON backtests (strategy_name, created_at);
+        CREATE INDEX IF NOT EXISTS idx_backtests_stock ON backtests (stock_code, created_at);
+        CREATE INDEX IF NOT EXISTS idx_backtests_range ON backtests (start_date, end_date);
+        CREATE INDEX IF NOT EXISTS idx_backtests_created ON backtests (created_at);
+    """
+
+    def __init__(self, path: str, hot_size: int = 128, retention_days: int = 0):
+        super().__init__(hot_size)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention_days = retention_days
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _save(self, result: Dict):
+        created_at = result['created_at']
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+        row = (
+            result['id'], result['strategy_name'], result['stock_code'], result.get('stock_name'),
+            result['start_date'], result['end_date'], result.get('initial_capital'),
+            result.get('final_cash'), result.get('final_value'), result.get('total_trades'),
+            json.dumps(result.get('metrics') or {}), json.dumps(result.get('final_positions') or {}),
+            created_at, encode_trades(result.get('trades') or []),
+            encode_json(result.get('logs')), encode_json(result.get('data_info'))
+        )
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO backtests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            if self.retention_days:
+                cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+                conn.execute("DELETE FROM backtests WHERE created_at < ?", (cutoff,))
+
+    def _load(self, backtest_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM backtests WHERE id = ?", (backtest_id,)).fetchone()
+        if row is None:
+            return None
+        result = self._summary(row)
+        result['final_positions'] = json.loads(row['final_positions'] or '{}')
+        result['trades'] = decode_trades(row['trades']) if row['trades'] else []
+        result['logs'] = decode_json(row['logs'])
+        result['data_info'] = decode_json(row['data_info'])
+        return result
+
+    def _delete(self, backtest_id: str) -> bool:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("DELETE FROM backtests WHERE id = ?", (backtest_id,)).rowcount > 0
+
+    def query(self, strategy_name: str = None, stock_code: str = None,
+              start_date: str = None, end_date: str = None,
+              page: int = 1, page_size: int = 20) -> Tuple[int, List[Dict]]:
+        conditions, params = [], []
+        if strategy_name is not None:
+            conditions.append("strategy_name = ?")
+            params.append(strategy_name)
+        if stock_code is not None:
+            conditions.append("stock_code = ?")
+            params.append(stock_code)
+        if start_date is not None:
+            conditions.append("start_date >= ?")
+            params.append(start_date)
+        if end_date is not None:
+            conditions.append("end_date <= ?")
+            params.append(end_date)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = ', '.join(self.SUMMARY_FIELDS)
+        offset = (max(page, 1) - 1) * page_size
+        with closing(self._connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM backtests {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {columns} FROM backtests {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + [page_size, offset]
+            ).fetchall()
+        return total, [self._summary(row) for row in rows]
+
+    @staticmethod
+    def _summary(row: sqlite3.Row) -> Dict:
+        result = {field: row[field] for field in ResultStore.SUMMARY_FIELDS}
+        result['metrics'] = json.loads(result['metrics'] or '{}')
+        result['created_at'] = datetime.fromisoformat(result['created_at'])
+        return result
+
+
+def create_result_store() -> ResultStore:
+    """按配置创建结果存储（result_store.backend: sqlite / memory）"""
+    config = ConfigManager()
+    backend = config.get('result_store.backend', 'sqlite')
+    if backend == 'memory':
+        return MemoryResultStore(max_size=config.get('result_store.max_size', 1000))
+    if backend == 'sqlite':
+        return SQLiteResultStore(
+            config.get('result_store.path', 'data/backtests.db'),
+            hot_size=config.get('result_store.hot_size', 128),
+            retention_days=config.get('result_store.retention_days', 0)
+        )
+    raise ValueError(f"不支持的结果存储类型: {backend}")
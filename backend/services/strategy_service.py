@@ -113,10 +113,10 @@ class StrategyService:
         )
     
     def get_strategy_instance(self, strategy_id: str) -> Optional[BaseStrategy]:
-        """获取策略实例"""
+        """获取策略实例（每次返回拥有独立运行状态的派生实例，并发回测互不干扰）"""
         if strategy_id not in self._strategies:
             return None
-        return self._strategies[strategy_id]['strategy_instance']
+        return self._strategies[strategy_id]['strategy_instance'].spawn()
     
     def list_strategies(self) -> List[StrategyResponse]:
         """列出所有策略"""
@@ -1,34 +1,59 @@
 """
 回测引擎
 """
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Union
 from core.strategy.base_strategy import BaseStrategy
 from core.config_manager import ConfigManager
+from core.calendar.trading_calendar import ensure_datetime
+from core.data.shared_panel import SharedPanel, PanelHandle
+from backtest.vectorized import simulate_signals, align_signals, to_day_ordinals
+from backtest.metrics import EquityAccumulator
+from backtest.portfolio import simulate_portfolio, pivot_panel
+from utils.logger import get_logger
+
+logger = get_logger('回测引擎')
 
 
 class BacktestEngine:
     """回测引擎"""
     
-    def __init__(self, strategy: BaseStrategy, initial_capital: float = None):
+    MODES = ('event', 'vectorized')
+    
+    def __init__(self, strategy: BaseStrategy, initial_capital: float = None, mode: str = None):
+        """
+        Args:
+            strategy: 策略实例
+            initial_capital: 初始资金
+            mode: 撮合模式，'event'=逐笔调用策略execute_trades，'vectorized'=基于数组批量撮合
+        """
         self.strategy = strategy
         config = ConfigManager()
         self.initial_capital = initial_capital or config.get('trading.initial_capital', 1000000)
         self.commission_rate = config.get('trading.commission_rate', 0.0003)
         self.slippage = config.get('trading.slippage', 0.001)
+        self.periods_per_year = config.get('backtest.periods_per_year', 252)
+        self.risk_free_rate = config.get('backtest.risk_free_rate', 0.0)
+        self.mode = mode or config.get('backtest.mode', 'event')
+        if self.mode not in self.MODES:
+            raise ValueError(f"不支持的回测模式: {self.mode}")
         
         # 回测结果
         self.equity_curve = []  # 净值曲线
         self.trades = []  # 交易记录
         self.returns = []  # 收益率
+        self.accumulator = None  # 净值累加器（逐日盯市）
     
-    def run(self, data: pd.DataFrame, stock_code: str = None) -> Dict:
+    def run(self, data: pd.DataFrame, stock_code: str = None,
+            processed_data: pd.DataFrame = None) -> Dict:
         """
         运行回测
         
         Args:
             data: 历史数据DataFrame
             stock_code: 股票代码
+            processed_data: 已预处理的数据（指标复用），提供时跳过策略预处理
         
         Returns:
             回测结果字典
@@ -37,26 +62,49 @@ class BacktestEngine:
         if data.empty:
             raise ValueError("数据为空，无法运行回测")
         
-        print(f"[回测引擎] 数据量: {len(data)} 条")
-        print(f"[回测引擎] 日期范围: {data['date'].min()} 至 {data['date'].max()}")
+        logger.opt(lazy=True).info(
+            "数据量: {} 条，日期范围: {} 至 {}",
+            lambda: len(data), lambda: data['date'].min(), lambda: data['date'].max()
+        )
+        
+        # 日期列在入口统一转换为datetime64，后续撮合和盯市不再逐行解析；
+        # 转换和添加股票代码都在浅拷贝上进行，不修改调用方的DataFrame
+        data = ensure_datetime(data.copy(deep=False))
+        if processed_data is not None:
+            processed_data = ensure_datetime(processed_data.copy(deep=False))
         
-        # 初始化策略资金
-        self.strategy.set_cash(self.initial_capital)
+        # 初始化本次运行状态（资金、清空上次的持仓和成交记录）
+        self.strategy.reset_state(self.initial_capital)
         
         # 添加股票代码到数据
         if stock_code:
             data['stock_code'] = stock_code
+            if processed_data is not None:
+                processed_data['stock_code'] = stock_code
         
         # 运行策略
-        result = self.strategy.run(data)
+        self.equity_curve = []
+        self.returns = []
+        if self.mode == 'vectorized':
+            result = self._run_vectorized(data, stock_code, processed_data)
+        else:
+            result = self.strategy.run(data, processed_data)
+            self.equity_curve = self._mark_to_market(
+                data, result.get('trades') or [], getattr(self.strategy, 'fills', None)
+            ).tolist()
+        self.trades = result.get('trades') or []
+        
+        # 逐日盯市的净值曲线依次送入累加器，增量计算净值指标
+        self._update_metrics()
         
         # 检查是否有交易
         if len(self.strategy.trade_history) == 0:
-            print("[回测引擎] 警告: 策略没有产生任何交易")
-            print("[回测引擎] 可能原因:")
-            print("  1. 数据量不足（移动平均策略需要至少20天数据）")
-            print("  2. 策略参数设置不当")
-            print("  3. 没有满足交易条件的信号")
+            logger.warning(
+                "策略没有产生任何交易。可能原因: "
+                "1. 数据量不足（移动平均策略需要至少20天数据） "
+                "2. 策略参数设置不当 "
+                "3. 没有满足交易条件的信号"
+            )
         
         # 计算回测指标
         metrics = self._calculate_metrics(data, result)
@@ -79,6 +127,198 @@ class BacktestEngine:
             'metrics': metrics
         }
     
+    def run_shared(self, panel: Union[SharedPanel, PanelHandle], stock_code: str,
+                   start_date=None, end_date=None, processed_data: pd.DataFrame = None) -> Dict:
+        """
+        从共享行情面板读取单只股票的数据运行回测
+        
+        数据列直接引用共享内存（零拷贝、只读），工作进程只需传入 panel.handle。
+        
+        Args:
+            panel: SharedPanel 或其 handle（工作进程中按句柄挂载）
+            stock_code: 股票代码
+            start_date / end_date: 日期区间（两端包含），默认全部
+        """
+        data = SharedPanel.attach(panel).frame(stock_code, start_date, end_date)
+        return self.run(data, stock_code, processed_data)
+    
+    def run_portfolio(self, panel: pd.DataFrame) -> Dict:
+        """
+        组合回测：多只股票在同一交易日历上对齐，共享一个现金账户
+        
+        Args:
+            panel: 长表格式的历史数据，至少包含 date, stock_code, close 列
+        
+        Returns:
+            回测结果字典（字段与run()一致，另含各股票最终价格）
+        """
+        if panel.empty:
+            raise ValueError("数据为空，无法运行回测")
+        for column in ('date', 'stock_code', 'close'):
+            if column not in panel.columns:
+                raise ValueError(f"组合回测数据缺少列: {column}")
+        
+        logger.opt(lazy=True).info(
+            "组合回测: {} 只股票, {} 条数据", lambda: panel['stock_code'].nunique(), lambda: len(panel)
+        )
+        
+        ensure_datetime(panel)
+        strategy = self.strategy
+        strategy.reset_state(self.initial_capital)
+        strategy._phase('on_init', strategy.on_init)
+        
+        close = pivot_panel(panel, 'close')
+        calendar = close.index
+        codes = list(close.columns)
+        code_pos = {code: j for j, code in enumerate(codes)}
+        
+        # 逐股票生成信号（策略指标按单只股票的时间序列计算），写入 日期×股票 矩阵
+        signal = np.zeros(close.shape, dtype=np.int8)
+        for code, group in panel.groupby('stock_code', sort=False):
+            group = group.sort_values('date')
+            signals = strategy._phase('generate_signals', strategy.generate_signals,
+                                      strategy._phase('preprocess_data', strategy.preprocess_data, group))
+            rows = calendar.get_indexer(group['date'])
+            signal[rows, code_pos[code]] = align_signals(group, signals)
+        
+        sim = strategy._phase('simulate', simulate_portfolio,
+                              signal, close.to_numpy(), list(calendar), codes, strategy.cash)
+        
+        # 写回策略状态
+        strategy.cash = sim['final_cash']
+        for j in np.flatnonzero(sim['final_holdings']):
+            strategy.positions[codes[j]] = int(sim['final_holdings'][j])
+        strategy.trade_history.extend(sim['trades'])
+        strategy._phase('risk_control', strategy.risk_control)
+        strategy._phase('on_finish', strategy.on_finish)
+        
+        self.trades = sim['trades']
+        self.equity_curve = sim['equity'].tolist()
+        self._update_metrics()
+        
+        final_prices = {code: float(sim['final_prices'][j]) for j, code in enumerate(codes)}
+        final_value = strategy.cash + sum(
+            final_prices[code] * shares for code, shares in strategy.positions.items() if shares > 0
+        )
+        
+        # 基准：等权买入持有
+        first_close = close.bfill().iloc[0]
+        last_close = close.ffill().iloc[-1]
+        buy_hold_return = float(((last_close - first_close) / first_close).mean())
+        strategy_return = (final_value - self.initial_capital) / self.initial_capital
+        metrics = {
+            'strategy_return': strategy_return,
+            'buy_hold_return': buy_hold_return,
+            'excess_return': strategy_return - buy_hold_return,
+            'max_drawdown': self.accumulator.max_drawdown,
+            'annual_return': self.accumulator.annual_return,
+            'volatility': self.accumulator.volatility,
+            'sharpe_ratio': self.accumulator.sharpe_ratio,
+            'total_trades': len(sim['trades']),
+            'win_rate': 0.0
+        }
+        
+        return {
+            'strategy_name': strategy.name,
+            'initial_capital': self.initial_capital,
+            'final_cash': strategy.cash,
+            'final_value': final_value,
+            'final_positions': strategy.positions,
+            'final_prices': final_prices,
+            'total_trades': len(sim['trades']),
+            'trades': sim['trades'],
+            'metrics': metrics
+        }
+    
+    def _run_vectorized(self, data: pd.DataFrame, stock_code: str = None,
+                        processed_data: pd.DataFrame = None) -> Dict:
+        """
+        向量化模式：沿用策略的预处理和信号生成，
+        撮合改为对信号数组和OHLC列的批量计算，结果写回策略状态
+        """
+        strategy = self.strategy
+        strategy._phase('on_init', strategy.on_init)
+        if processed_data is None:
+            processed_data = strategy._phase('preprocess_data', strategy.preprocess_data, data)
+        signals = strategy._phase('generate_signals', strategy.generate_signals, processed_data)
+        
+        signal = align_signals(data, signals)
+        if stock_code is None and 'stock_code' in data.columns and len(data) > 0:
+            stock_code = data['stock_code'].iloc[0]
+        
+        sim = strategy._phase(
+            'simulate', simulate_signals,
+            signal,
+            data['close'].to_numpy(),
+            strategy.cash,
+            dates=data['date'] if 'date' in data.columns else None,
+            open_=data['open'].to_numpy() if 'open' in data.columns else None,
+            high=data['high'].to_numpy() if 'high' in data.columns else None,
+            low=data['low'].to_numpy() if 'low' in data.columns else None,
+            stock_code=stock_code
+        )
+        
+        # 写回策略状态，保证结果字典与逐笔模式一致
+        strategy.cash = sim['final_cash']
+        if sim['final_position'] > 0:
+            strategy.positions[stock_code] = sim['final_position']
+        strategy.trade_history.extend(sim['trades'])
+        self.equity_curve = sim['equity'].tolist()
+        
+        strategy._phase('risk_control', strategy.risk_control)
+        return {
+            'signals': signals,
+            'trades': sim['trades'],
+            'result': strategy._phase('on_finish', strategy.on_finish)
+        }
+    
+    def _update_metrics(self):
+        """
+        把净值曲线逐根送入净值累加器，得到逐日收益率和回撤、波动率、夏普等指标
+
+        增量化的只是指标计算（每根K线O(1)，不构造中间DataFrame）：盯市按整列数组计算，
+        净值曲线和收益率序列仍随K线数O(n)保存，供结果展示使用。
+        """
+        self.accumulator = EquityAccumulator(self.initial_capital, self.periods_per_year, self.risk_free_rate)
+        self.returns = [self.accumulator.update(value) for value in self.equity_curve]
+    
+    def _mark_to_market(self, data: pd.DataFrame, trades: List[Dict], fills=None) -> np.ndarray:
+        """
+        根据本次回测的成交记录重建逐日持仓与现金，按收盘价盯市得到每根K线的总资产
+        
+        Args:
+            data: 历史数据
+            trades: 本次回测的成交记录
+            fills: 策略的列式成交缓冲区（与trades一一对应时直接使用，免去逐笔解析）
+        """
+        close = data['close'].to_numpy(dtype=np.float64)
+        n = len(close)
+        cash_delta = np.zeros(n, dtype=np.float64)
+        share_delta = np.zeros(n, dtype=np.int64)
+        
+        if trades and 'date' in data.columns:
+            bar_days = to_day_ordinals(data['date'])
+            if fills is not None and len(fills) == len(trades):
+                columns = fills.columns()
+                trade_days = columns['day'].astype(np.int64)
+                sign = columns['side'].astype(np.int64)
+                amount = columns['amount']
+                shares = columns['shares']
+            else:
+                trade_days = to_day_ordinals([trade['time'] for trade in trades])
+                sign = np.array([1 if trade['action'] == 'buy' else -1 for trade in trades], dtype=np.int64)
+                amount = np.array([trade['amount'] for trade in trades], dtype=np.float64)
+                shares = np.array([trade['shares'] for trade in trades], dtype=np.int64)
+            # 成交日对应的K线位置（日期升序）
+            bars = np.searchsorted(bar_days, trade_days, side='left')
+            bars = np.clip(bars, 0, n - 1)
+            np.add.at(cash_delta, bars, -sign * amount)
+            np.add.at(share_delta, bars, sign * shares)
+        
+        cash = self.initial_capital + np.cumsum(cash_delta)
+        holdings = np.cumsum(share_delta)
+        return cash + holdings * close
+    
     def _calculate_metrics(self, data: pd.DataFrame, result: Dict) -> Dict:
         """计算回测指标"""
         if data.empty:
@@ -87,6 +327,9 @@ class BacktestEngine:
                 'buy_hold_return': 0.0,
                 'excess_return': 0.0,
                 'max_drawdown': 0.0,
+                'annual_return': 0.0,
+                'volatility': 0.0,
+                'sharpe_ratio': 0.0,
                 'total_trades': 0,
                 'win_rate': 0.0
             }
@@ -112,27 +355,16 @@ class BacktestEngine:
             
             strategy_return = (final_value - self.initial_capital) / self.initial_capital
         
-        # 计算最大回撤（简化版本）
+        # 净值指标（逐日盯市，包含交易之间的价格波动）
         max_drawdown = 0.0
-        if len(self.strategy.trade_history) > 0:
-            # 如果有交易，计算最大回撤
-            equity_values = [self.initial_capital]
-            current_value = self.initial_capital
-            for trade in self.strategy.trade_history:
-                if trade['action'] == 'buy':
-                    current_value -= trade['amount']
-                else:
-                    current_value += trade['amount']
-                equity_values.append(current_value)
-            
-            if len(equity_values) > 1:
-                peak = equity_values[0]
-                for value in equity_values:
-                    if value > peak:
-                        peak = value
-                    drawdown = (peak - value) / peak if peak > 0 else 0
-                    if drawdown > max_drawdown:
-                        max_drawdown = drawdown
+        annual_return = 0.0
+        volatility = 0.0
+        sharpe_ratio = 0.0
+        if self.accumulator is not None and self.accumulator.count > 0:
+            max_drawdown = self.accumulator.max_drawdown
+            annual_return = self.accumulator.annual_return
+            volatility = self.accumulator.volatility
+            sharpe_ratio = self.accumulator.sharpe_ratio
         
         # 计算胜率（盈利交易数 / 总交易数）
         win_rate = 0.0
@@ -155,6 +387,9 @@ class BacktestEngine:
             'buy_hold_return': buy_hold_return,
             'excess_return': excess_return,
             'max_drawdown': max_drawdown,
+            'annual_return': annual_return,
+            'volatility': volatility,
+            'sharpe_ratio': sharpe_ratio,
             'total_trades': len(self.strategy.trade_history),
             'win_rate': win_rate
         }
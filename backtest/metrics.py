@@ -0,0 +1,105 @@
+"""
+回测指标 - 逐日盯市的净值累加器
+"""
+import math
+from typing import Dict, Iterable
+
+
+class EquityAccumulator:
+    """
+    净值累加器
+
+    每根K线传入盯市后的总资产，O(1) 更新运行峰值、回撤、
+    收益率均值与方差（Welford算法），无需保存中间DataFrame。
+    累加器本身只保存常数个状态；回测引擎是在盯市得到完整净值曲线后再逐根传入，
+    实盘等逐根到达的场景可在每根K线收盘后直接调用 update。
+    """
+
+    def __init__(self, initial_value: float, periods_per_year: int = 252, risk_free_rate: float = 0.0):
+        self.initial_value = initial_value
+        self.periods_per_year = periods_per_year
+        self.risk_free_rate = risk_free_rate
+        self.reset()
+
+    def reset(self):
+        """重置状态"""
+        self.count = 0  # 已处理的K线数
+        self.last_value = self.initial_value
+        self.peak = self.initial_value
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self._ret_count = 0
+        self._ret_mean = 0.0
+        self._ret_m2 = 0.0
+
+    def update(self, value: float) -> float:
+        """
+        传入一根K线的总资产，返回当期收益率
+        """
+        prev = self.last_value
+        ret = (value - prev) / prev if prev > 0 else 0.0
+        self.count += 1
+        self.last_value = value
+
+        # 回撤
+        if value > self.peak:
+            self.peak = value
+        self.drawdown = (self.peak - value) / self.peak if self.peak > 0 else 0.0
+        if self.drawdown > self.max_drawdown:
+            self.max_drawdown = self.drawdown
+
+        # 收益率均值/方差（Welford）
+        self._ret_count += 1
+        delta = ret - self._ret_mean
+        self._ret_mean += delta / self._ret_count
+        self._ret_m2 += delta * (ret - self._ret_mean)
+        return ret
+
+    def update_many(self, values: Iterable[float]):
+        """批量传入总资产序列"""
+        for value in values:
+            self.update(value)
+
+    @property
+    def total_return(self) -> float:
+        """累计收益率"""
+        if self.initial_value <= 0:
+            return 0.0
+        return (self.last_value - self.initial_value) / self.initial_value
+
+    @property
+    def volatility(self) -> float:
+        """年化波动率"""
+        if self._ret_count < 2:
+            return 0.0
+        variance = self._ret_m2 / (self._ret_count - 1)
+        return math.sqrt(variance) * math.sqrt(self.periods_per_year)
+
+    @property
+    def annual_return(self) -> float:
+        """年化收益率（按K线数折算）"""
+        if self.count == 0 or self.initial_value <= 0 or self.last_value <= 0:
+            return 0.0
+        growth = self.last_value / self.initial_value
+        return growth ** (self.periods_per_year / self.count) - 1
+
+    @property
+    def sharpe_ratio(self) -> float:
+        """年化夏普比率"""
+        if self._ret_count < 2:
+            return 0.0
+        std = math.sqrt(self._ret_m2 / (self._ret_count - 1))
+        if std == 0:
+            return 0.0
+        excess = self._ret_mean - self.risk_free_rate / self.periods_per_year
+        return excess / std * math.sqrt(self.periods_per_year)
+
+    def snapshot(self) -> Dict:
+        """当前指标快照"""
+        return {
+            'total_return': self.total_return,
+            'annual_return': self.annual_return,
+            'max_drawdown': self.max_drawdown,
+            'volatility': self.volatility,
+            'sharpe_ratio': self.sharpe_ratio
+        }
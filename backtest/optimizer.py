@@ -0,0 +1,281 @@
+"""
+参数寻优 - 基于进程池的并行参数扫描
+"""
+import os
+import random
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Callable, Any, Union
+import pandas as pd
+
+from core.factory.strategy_factory import StrategyFactory
+from core.data.shared_panel import PanelHandle, SharedPanel, share_frames
+from core.calendar.trading_calendar import TradingCalendar, get_calendar, set_calendar
+from backtest.backtest_engine import BacktestEngine
+from utils.logger import setup_logging
+
+
+# 工作进程内的共享状态（由initializer设置，每个进程只加载一次数据）
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(strategy_name: str, strategy_class: type, data: Union[Dict[str, pd.DataFrame], PanelHandle],
+                 initial_capital: float, mode: str, calendar: TradingCalendar):
+    """工作进程初始化：注册策略，沿用主进程的交易日历，挂载共享行情面板（或缓存pickle传入的行情数据）"""
+    StrategyFactory.register_strategy(strategy_name, strategy_class)
+    set_calendar(calendar)
+    # 扫描时只保留警告以上日志，低级别日志在记录前即被丢弃
+    setup_logging(level='WARNING', enqueue=False, log_file='', force=True)
+    _worker_state['strategy_name'] = strategy_name
+    if isinstance(data, PanelHandle):
+        _worker_state['panel'] = SharedPanel.attach(data)
+        _worker_state['data'] = None
+    else:
+        _worker_state['panel'] = None
+        _worker_state['data'] = data
+    _worker_state['initial_capital'] = initial_capital
+    _worker_state['mode'] = mode
+
+
+def _frames():
+    """工作进程中逐只股票的行情：共享面板上的零拷贝视图，或pickle传入数据的副本"""
+    panel = _worker_state['panel']
+    if panel is not None:
+        return ((stock_code, panel.frame(stock_code)) for stock_code in panel.codes)
+    return ((stock_code, frame.copy()) for stock_code, frame in _worker_state['data'].items())
+
+
+def _evaluate(params: Dict) -> Dict:
+    """在工作进程中评估一组参数（遍历所有股票，指标取平均）"""
+    metrics_sum: Dict[str, float] = {}
+    total_trades = 0
+    final_value = 0.0
+    count = 0
+    for stock_code, frame in _frames():
+        count += 1
+        strategy = StrategyFactory.create_strategy(_worker_state['strategy_name'], dict(params))
+        engine = BacktestEngine(strategy, _worker_state['initial_capital'], mode=_worker_state['mode'])
+        result = engine.run(frame, stock_code)
+        total_trades += result['total_trades']
+        final_value += result['final_value']
+        for key, value in result['metrics'].items():
+            if key != 'total_trades':
+                metrics_sum[key] = metrics_sum.get(key, 0.0) + float(value)
+    n = max(count, 1)
+    row = dict(params)
+    row.update({key: value / n for key, value in metrics_sum.items()})
+    row['total_trades'] = total_trades
+    row['final_value'] = final_value / n
+    return row
+
+
+class ParameterSweep:
+    """
+    参数扫描器
+
+    支持三种采样方式：
+    - grid: 参数网格全组合
+    - random: 从参数空间随机采样 n_samples 组
+    - bayesian: 基于optuna的贝叶斯优化（需要安装optuna）
+
+    参数空间格式：{参数名: [候选值...]}，random/bayesian 还支持 (最小值, 最大值) 区间
+    """
+
+    METHODS = ('grid', 'random', 'bayesian')
+    # 可用于排序的指标及优化方向：回测指标字段（与 BacktestMetrics 一致）及平均期末资产
+    # max 为越大越好；最大回撤、波动率、交易次数（交易成本）越小越好
+    METRICS = {
+        'strategy_return': 'max', 'buy_hold_return': 'max', 'excess_return': 'max', 'max_drawdown': 'min',
+        'annual_return': 'max', 'volatility': 'min', 'sharpe_ratio': 'max', 'total_trades': 'min',
+        'win_rate': 'max', 'final_value': 'max'
+    }
+
+    def __init__(self,
+                 strategy_name: str,
+                 param_space: Dict[str, Union[List, tuple]],
+                 method: str = 'grid',
+                 n_samples: int = 50,
+                 metric: str = 'sharpe_ratio',
+                 initial_capital: float = None,
+                 max_workers: int = None,
+                 mode: str = 'vectorized',
+                 constraint: Optional[Callable[[Dict], bool]] = None,
+                 seed: int = None):
+        """
+        Args:
+            strategy_name: 已注册的策略名称
+            param_space: 参数空间
+            method: 采样方式（grid/random/bayesian）
+            n_samples: random/bayesian 的采样次数
+            metric: 排序指标（回测指标字段，优化方向见 METRICS）
+            initial_capital: 初始资金
+            max_workers: 进程数，默认使用全部CPU核心
+            mode: 回测引擎撮合模式
+            constraint: 参数约束（返回False的组合将被跳过）
+            seed: 随机种子
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"不支持的采样方式: {method}")
+        if metric not in self.METRICS:
+            raise ValueError(f"不支持的排序指标: {metric}，可选: {', '.join(self.METRICS)}")
+        if strategy_name not in StrategyFactory.list_strategies():
+            raise ValueError(f"未注册的策略: {strategy_name}")
+        if not param_space:
+            raise ValueError("参数空间不能为空")
+        self.strategy_name = strategy_name
+        self.param_space = param_space
+        self.method = method
+        self.n_samples = n_samples
+        self.metric = metric
+        self.direction = self.METRICS[metric]
+        self.initial_capital = initial_capital
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.mode = mode
+        self.constraint = constraint
+        self._random = random.Random(seed)
+        self.seed = seed
+
+    def _grid(self) -> List[Dict]:
+        """生成参数网格"""
+        names = list(self.param_space.keys())
+        values = []
+        for name in names:
+            space = self.param_space[name]
+            if isinstance(space, tuple):
+                raise ValueError(f"网格扫描需要候选值列表: {name}")
+            values.append(list(space))
+        return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+    def _sample(self) -> Dict:
+        """随机采样一组参数"""
+        params = {}
+        for name, space in self.param_space.items():
+            if isinstance(space, tuple):
+                low, high = space
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = self._random.randint(low, high)
+                else:
+                    params[name] = self._random.uniform(low, high)
+            else:
+                params[name] = self._random.choice(list(space))
+        return params
+
+    def candidates(self) -> List[Dict]:
+        """生成待评估的参数组合（已去重并应用约束）"""
+        if self.method == 'grid':
+            candidates = self._grid()
+        else:
+            candidates = []
+            seen = set()
+            attempts = 0
+            while len(candidates) < self.n_samples and attempts < self.n_samples * 20:
+                attempts += 1
+                params = self._sample()
+                key = tuple(sorted(params.items()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                candidates.append(params)
+        if self.constraint:
+            candidates = [params for params in candidates if self.constraint(params)]
+        return candidates
+
+    def _executor(self, data: Union[Dict[str, pd.DataFrame], PanelHandle]) -> ProcessPoolExecutor:
+        strategy_class = StrategyFactory._strategies[self.strategy_name]
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.strategy_name, strategy_class, data, self.initial_capital, self.mode, get_calendar())
+        )
+
+    def run(self, data: Union[pd.DataFrame, Dict[str, pd.DataFrame]], stock_code: str = None) -> pd.DataFrame:
+        """
+        执行参数扫描
+
+        Args:
+            data: 单只股票的DataFrame，或 {股票代码: DataFrame}
+            stock_code: data为单个DataFrame时的股票代码
+
+        Returns:
+            按 metric 由优到劣排列的结果表（每行一组参数及其平均指标）
+        """
+        if isinstance(data, pd.DataFrame):
+            data = {stock_code or '': data}
+        if not data:
+            raise ValueError("数据为空，无法进行参数扫描")
+
+        start = time.perf_counter()
+        candidates = None
+        if self.method != 'bayesian':
+            candidates = self.candidates()
+            if not candidates:
+                raise ValueError("没有满足约束的参数组合")
+
+        # 行情只写入共享内存一次，工作进程按句柄挂载，不再各自pickle一份完整数据
+        panel = share_frames(data)
+        shared = panel.handle if panel is not None else data
+        try:
+            if self.method == 'bayesian':
+                rows = self._run_bayesian(shared)
+            else:
+                with self._executor(shared) as executor:
+                    chunksize = max(1, len(candidates) // (self.max_workers * 4))
+                    rows = list(executor.map(_evaluate, candidates, chunksize=chunksize))
+        finally:
+            if panel is not None:
+                panel.close()
+
+        if not rows:
+            # 贝叶斯优化的所有试验都被约束剪枝
+            raise ValueError("没有满足约束的参数组合")
+        results = pd.DataFrame(rows)
+        results = results.sort_values(self.metric, ascending=self.direction == 'min', kind='stable').reset_index(drop=True)
+        results.insert(0, 'rank', range(1, len(results) + 1))
+        results.attrs['elapsed'] = time.perf_counter() - start
+        return results
+
+    def _run_bayesian(self, data: Union[Dict[str, pd.DataFrame], PanelHandle]) -> List[Dict]:
+        """贝叶斯优化：每轮并行评估 max_workers 组参数"""
+        try:
+            import optuna
+        except ImportError as e:
+            raise ImportError("贝叶斯优化需要安装optuna: pip install optuna") from e
+
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        study = optuna.create_study(direction='minimize' if self.direction == 'min' else 'maximize',
+                                    sampler=optuna.samplers.TPESampler(seed=self.seed))
+
+        def suggest(trial) -> Dict:
+            params = {}
+            for name, space in self.param_space.items():
+                if isinstance(space, tuple):
+                    low, high = space
+                    if isinstance(low, int) and isinstance(high, int):
+                        params[name] = trial.suggest_int(name, low, high)
+                    else:
+                        params[name] = trial.suggest_float(name, low, high)
+                else:
+                    params[name] = trial.suggest_categorical(name, list(space))
+            return params
+
+        rows = []
+        with self._executor(data) as executor:
+            remaining = self.n_samples
+            while remaining > 0:
+                batch = min(self.max_workers, remaining)
+                remaining -= batch
+                trials = []
+                for _ in range(batch):
+                    trial = study.ask()
+                    params = suggest(trial)
+                    if self.constraint and not self.constraint(params):
+                        study.tell(trial, state=optuna.trial.TrialState.PRUNED)
+                        continue
+                    trials.append((trial, params))
+                futures = [(trial, executor.submit(_evaluate, params)) for trial, params in trials]
+                for trial, future in futures:
+                    row = future.result()
+                    study.tell(trial, float(row.get(self.metric, 0.0)))
+                    rows.append(row)
+        return rows
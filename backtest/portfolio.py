@@ -0,0 +1,135 @@
+"""
+组合回测 - 多股票共享资金账户的批量撮合
+"""
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+from backtest.vectorized import LOT_SIZE
+
+
+def pivot_panel(panel: pd.DataFrame, column: str) -> pd.DataFrame:
+    """将长表（date, stock_code, ...）转换为 日期×股票 矩阵"""
+    return panel.pivot(index='date', columns='stock_code', values=column).sort_index()
+
+
+def simulate_portfolio(signal: np.ndarray,
+                       price: np.ndarray,
+                       dates: List,
+                       codes: List[str],
+                       initial_cash: float,
+                       lot_size: int = LOT_SIZE) -> Dict:
+    """
+    按 日期×股票 信号矩阵逐日撮合，所有股票共享一个现金账户
+
+    每个交易日内对全部股票做向量化处理：
+    1. 先卖出：卖出信号且有持仓的股票全部卖出。持仓均为之前交易日买入，
+       当日买入在卖出之后处理，因此天然满足T+1限制
+    2. 再买入：把可用现金平均分配给当日所有买入信号的股票，按手取整
+
+    只在有信号的交易日撮合，逐日持仓和现金通过前向填充得到。
+
+    Args:
+        signal: 信号矩阵 (T, N)，1=买入，-1=卖出，0=持有
+        price: 成交价矩阵 (T, N)，停牌/无数据为NaN
+        dates: 长度为T的交易日序列
+        codes: 长度为N的股票代码
+        initial_cash: 初始资金
+        lot_size: 每手股数
+
+    Returns:
+        包含逐日现金、持仓矩阵和成交记录的字典
+    """
+    signal = np.asarray(signal)
+    price = np.asarray(price, dtype=np.float64)
+    n_dates, n_codes = price.shape
+    if signal.shape != price.shape:
+        raise ValueError(f"信号矩阵形状{signal.shape}与价格矩阵形状{price.shape}不一致")
+
+    tradable = np.isfinite(price) & (price > 0)
+    safe_price = np.where(tradable, price, 1.0)
+    active = signal.astype(bool) & tradable
+    event_dates = np.flatnonzero(active.any(axis=1))
+
+    cash = float(initial_cash)
+    holdings = np.zeros(n_codes, dtype=np.int64)
+    event_cash = np.empty(len(event_dates), dtype=np.float64)
+    event_holdings = np.empty((len(event_dates), n_codes), dtype=np.int64)
+    trades = []
+
+    for k, t in enumerate(event_dates):
+        row_price = safe_price[t]
+        row_active = active[t]
+        trade_time = dates[t]
+
+        # 1. 卖出
+        sell = row_active & (signal[t] < 0) & (holdings > 0)
+        if sell.any():
+            sell_idx = np.flatnonzero(sell)
+            sell_shares = holdings[sell_idx]
+            amounts = row_price[sell_idx] * sell_shares
+            cash += float(amounts.sum())
+            holdings[sell_idx] = 0
+            for j, shares, amount in zip(sell_idx, sell_shares, amounts):
+                trades.append({
+                    'time': trade_time,
+                    'stock_code': codes[j],
+                    'action': 'sell',
+                    'price': float(row_price[j]),
+                    'shares': int(shares),
+                    'amount': float(amount)
+                })
+
+        # 2. 买入（等额分配可用现金）
+        buy = row_active & (signal[t] > 0)
+        n_buy = int(buy.sum())
+        if n_buy:
+            buy_idx = np.flatnonzero(buy)
+            budget = cash / n_buy
+            buy_shares = (np.floor(budget / row_price[buy_idx] / lot_size) * lot_size).astype(np.int64)
+            filled = buy_shares >= lot_size
+            buy_idx = buy_idx[filled]
+            buy_shares = buy_shares[filled]
+            costs = row_price[buy_idx] * buy_shares
+            cash -= float(costs.sum())
+            holdings[buy_idx] += buy_shares
+            for j, shares, cost in zip(buy_idx, buy_shares, costs):
+                trades.append({
+                    'time': trade_time,
+                    'stock_code': codes[j],
+                    'action': 'buy',
+                    'price': float(row_price[j]),
+                    'shares': int(shares),
+                    'amount': float(cost)
+                })
+
+        event_cash[k] = cash
+        event_holdings[k] = holdings
+
+    # 前向填充逐日状态
+    last_event = np.full(n_dates, -1, dtype=np.int64)
+    if len(event_dates):
+        last_event[event_dates] = np.arange(len(event_dates))
+        last_event = np.maximum.accumulate(last_event)
+    has_event = last_event >= 0
+    if len(event_dates):
+        safe = np.where(has_event, last_event, 0)
+        cash_series = np.where(has_event, event_cash[safe], float(initial_cash))
+        holdings_matrix = np.where(has_event[:, None], event_holdings[safe], 0)
+    else:
+        cash_series = np.full(n_dates, float(initial_cash))
+        holdings_matrix = np.zeros((n_dates, n_codes), dtype=np.int64)
+
+    # 停牌日按最近一次有效价格盯市
+    mark_price = pd.DataFrame(np.where(tradable, price, np.nan)).ffill().fillna(0.0).to_numpy()
+    equity = cash_series + (holdings_matrix * mark_price).sum(axis=1)
+
+    return {
+        'cash': cash_series,
+        'holdings': holdings_matrix,
+        'equity': equity,
+        'trades': trades,
+        'final_cash': cash,
+        'final_holdings': holdings.copy(),
+        'final_prices': mark_price[-1] if n_dates else np.zeros(n_codes)
+    }
@@ -0,0 +1,200 @@
+"""
+向量化回测 - 基于NumPy数组的批量撮合
+"""
+from typing import Dict, Optional
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from core.strategy.lot_ledger import LotLedger
+from core.calendar.trading_calendar import get_calendar, to_date, to_days
+
+
+LOT_SIZE = 100  # A股按手交易（100股为1手）
+
+
+def to_day_ordinals(dates) -> Optional[np.ndarray]:
+    """
+    将日期序列一次性转换为整数自然日序号（自1970-01-01起的天数，用于按日期定位K线）
+
+    Args:
+        dates: 日期序列（Timestamp / datetime / date / 字符串均可）
+
+    Returns:
+        int64数组，无法解析的日期为 -1；dates为None时返回None
+    """
+    if dates is None:
+        return None
+    days = to_days(dates)
+    ordinals = days.astype(np.int64)
+    ordinals[np.isnat(days)] = -1
+    return ordinals
+
+
+def _trade_time(raw_date, normalize: bool):
+    """与 BaseStrategy._buy/_sell 保持一致的交易时间字段"""
+    if raw_date is None:
+        return datetime.now()
+    if normalize:
+        if isinstance(raw_date, pd.Timestamp):
+            return raw_date.date()
+        if isinstance(raw_date, str):
+            return to_date(raw_date) or raw_date
+    return raw_date
+
+
+def simulate_signals(signal: np.ndarray,
+                     close: np.ndarray,
+                     initial_cash: float,
+                     dates=None,
+                     open_: np.ndarray = None,
+                     high: np.ndarray = None,
+                     low: np.ndarray = None,
+                     stock_code: str = None,
+                     fill_price: str = 'close',
+                     lot_size: int = LOT_SIZE) -> Dict:
+    """
+    按信号数组批量计算持仓、现金、成交和逐日净值
+
+    撮合规则与 BaseStrategy.execute_trades 一致：
+    - 买入信号全仓买入，按手取整，不足1手则放弃
+    - 卖出信号卖出全部满足T+1（买入日期 < 卖出日期）的持仓
+
+    只在有信号的K线上逐笔撮合（仓位只在这些位置变化），
+    逐日的持仓、现金与净值序列通过前向填充一次性生成。
+
+    Args:
+        signal: 信号数组（1=买入，-1=卖出，0=持有），与K线一一对应
+        close: 收盘价数组
+        initial_cash: 初始资金
+        dates: 日期序列（按交易日历换算为交易日序号检查T+1，并作为交易时间），为None时不检查T+1
+        open_/high/low: 其余OHLC列（fill_price选择成交价时使用）
+        stock_code: 股票代码
+        fill_price: 成交价所用列（'open'/'high'/'low'/'close'）
+        lot_size: 每手股数
+
+    Returns:
+        包含 cash / positions / equity 逐日数组和成交记录的字典
+    """
+    signal = np.asarray(signal)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    if len(signal) != n:
+        raise ValueError(f"信号长度({len(signal)})与价格长度({n})不一致")
+
+    columns = {'open': open_, 'high': high, 'low': low, 'close': close}
+    if fill_price not in columns:
+        raise ValueError(f"不支持的成交价列: {fill_price}")
+    if columns[fill_price] is None:
+        raise ValueError(f"缺少成交价列: {fill_price}")
+    price = np.asarray(columns[fill_price], dtype=np.float64)
+
+    raw_dates = None
+    ordinals = None
+    if dates is not None:
+        raw_dates = list(dates)
+        ordinals = get_calendar().ordinals(dates if isinstance(dates, (pd.Series, np.ndarray)) else raw_dates)
+
+    event_idx = np.flatnonzero((signal != 0) & (price > 0))
+
+    cash = float(initial_cash)
+    position = 0
+    lots = LotLedger()  # FIFO批次（按交易日序号）
+
+    fill_bar = []
+    fill_side = []
+    fill_price_list = []
+    fill_shares = []
+    fill_amount = []
+    trades = []
+
+    # 每个事件后的现金与持仓（用于生成逐日序列）
+    event_cash = np.empty(len(event_idx), dtype=np.float64)
+    event_position = np.empty(len(event_idx), dtype=np.int64)
+
+    for k, i in enumerate(event_idx):
+        p = float(price[i])
+        day = ordinals[i] if ordinals is not None else None
+        if signal[i] > 0:
+            shares = int(cash / p / lot_size) * lot_size
+            if shares >= lot_size:
+                cost = p * shares
+                cash -= cost
+                position += shares
+                lots.add(day, shares)
+                fill_bar.append(i)
+                fill_side.append(1)
+                fill_price_list.append(p)
+                fill_shares.append(shares)
+                fill_amount.append(cost)
+                trades.append({
+                    'time': _trade_time(raw_dates[i] if raw_dates is not None else None, True),
+                    'stock_code': stock_code,
+                    'action': 'buy',
+                    'price': p,
+                    'shares': shares,
+                    'amount': cost
+                })
+        elif position > 0:
+            shares = min(position, lots.sellable(day))
+            if shares > 0:
+                lots.consume(shares)
+                amount = p * shares
+                cash += amount
+                position -= shares
+                fill_bar.append(i)
+                fill_side.append(-1)
+                fill_price_list.append(p)
+                fill_shares.append(shares)
+                fill_amount.append(amount)
+                trades.append({
+                    'time': _trade_time(raw_dates[i] if raw_dates is not None else None, False),
+                    'stock_code': stock_code,
+                    'action': 'sell',
+                    'price': p,
+                    'shares': shares,
+                    'amount': amount
+                })
+        event_cash[k] = cash
+        event_position[k] = position
+
+    # 前向填充：每根K线取最近一次事件后的状态
+    last_event = np.full(n, -1, dtype=np.int64)
+    if len(event_idx):
+        last_event[event_idx] = np.arange(len(event_idx))
+        last_event = np.maximum.accumulate(last_event)
+    has_event = last_event >= 0
+    safe = np.where(has_event, last_event, 0)
+    cash_series = np.where(has_event, event_cash[safe] if len(event_idx) else 0.0, float(initial_cash))
+    position_series = np.where(has_event, event_position[safe] if len(event_idx) else 0, 0)
+    equity = cash_series + position_series * close
+
+    return {
+        'cash': cash_series,
+        'positions': position_series,
+        'equity': equity,
+        'fills': {
+            'bar': np.asarray(fill_bar, dtype=np.int64),
+            'side': np.asarray(fill_side, dtype=np.int8),
+            'price': np.asarray(fill_price_list, dtype=np.float64),
+            'shares': np.asarray(fill_shares, dtype=np.int64),
+            'amount': np.asarray(fill_amount, dtype=np.float64)
+        },
+        'trades': trades,
+        'final_cash': cash,
+        'final_position': position,
+        'open_lots': lots.lots()
+    }
+
+
+def align_signals(data: pd.DataFrame, signals: pd.DataFrame) -> np.ndarray:
+    """
+    将策略返回的信号行（generate_signals只返回有信号的记录）对齐为逐K线的信号数组
+    """
+    signal = np.zeros(len(data), dtype=np.int8)
+    if signals is None or signals.empty or 'signal' not in signals.columns:
+        return signal
+    positions = data.index.get_indexer(signals.index)
+    valid = positions >= 0
+    signal[positions[valid]] = np.sign(signals['signal'].to_numpy()[valid]).astype(np.int8)
+    return signal
@@ -0,0 +1,244 @@
+"""
+滚动窗口优化（Walk-Forward）
+"""
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Union, Optional, Callable
+import pandas as pd
+
+from core.factory.strategy_factory import StrategyFactory
+from core.data.shared_panel import PanelHandle, SharedPanel, share_frames
+from core.calendar.trading_calendar import TradingCalendar, get_calendar, set_calendar
+from backtest.backtest_engine import BacktestEngine
+from backtest.optimizer import ParameterSweep
+from utils.logger import setup_logging
+
+
+# 工作进程内的共享状态（由initializer设置）
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(strategy_name: str, strategy_class: type, data: Union[pd.DataFrame, PanelHandle], stock_code: str,
+                 initial_capital: float, mode: str, metric: str, cache_size: int, calendar: TradingCalendar):
+    """工作进程初始化：注册策略，沿用主进程的交易日历，挂载共享行情面板（或缓存pickle传入的完整历史数据）"""
+    StrategyFactory.register_strategy(strategy_name, strategy_class)
+    set_calendar(calendar)
+    # 扫描时只保留警告以上日志，低级别日志在记录前即被丢弃
+    setup_logging(level='WARNING', enqueue=False, log_file='', force=True)
+    if isinstance(data, PanelHandle):
+        data = SharedPanel.attach(data).frame(stock_code or '')
+    _worker_state.update({
+        'strategy_name': strategy_name,
+        'data': data,
+        'stock_code': stock_code,
+        'initial_capital': initial_capital,
+        'mode': mode,
+        'metric': metric,
+        'cache': IndicatorCache(cache_size)
+    })
+
+
+class IndicatorCache:
+    """
+    指标缓存：按参数缓存策略对完整历史的预处理结果
+
+    预处理（如移动平均）只依赖当前及之前的数据，因此对完整历史计算一次后，
+    各窗口直接按位置切片即可，重叠窗口无需重复计算，窗口开头也不会因预热而出现NaN。
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._items: 'OrderedDict[tuple, pd.DataFrame]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, strategy, params: Dict, data: pd.DataFrame) -> pd.DataFrame:
+        key = tuple(sorted(params.items()))
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        processed = strategy.preprocess_data(data)
+        self._items[key] = processed
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return processed
+
+
+def _backtest_slice(params: Dict, start: int, end: int) -> Dict:
+    """在[start, end)区间上运行一次回测，复用缓存的指标"""
+    state = _worker_state
+    strategy = StrategyFactory.create_strategy(state['strategy_name'], dict(params))
+    processed = state['cache'].get(strategy, params, state['data'])
+    engine = BacktestEngine(strategy, state['initial_capital'], mode=state['mode'])
+    result = engine.run(
+        state['data'].iloc[start:end].copy(),
+        state['stock_code'],
+        processed_data=processed.iloc[start:end].copy()
+    )
+    metrics = dict(result['metrics'])
+    metrics['final_value'] = result['final_value']
+    return metrics
+
+
+def _run_window(window: Dict, candidates: List[Dict]) -> Dict:
+    """在工作进程中处理一个窗口：样本内寻优，样本外验证"""
+    metric = _worker_state['metric']
+    minimize = ParameterSweep.METRICS[metric] == 'min'
+    best_params = None
+    best_score = None
+    for params in candidates:
+        score = _backtest_slice(params, window['train_start'], window['train_end'])[metric]
+        if best_score is None or (score < best_score if minimize else score > best_score):
+            best_params, best_score = params, score
+    test_metrics = _backtest_slice(best_params, window['test_start'], window['test_end'])
+
+    row = dict(window)
+    row['params'] = best_params
+    row['in_sample_' + metric] = best_score
+    row.update({'out_of_sample_' + key: value for key, value in test_metrics.items()})
+    return row
+
+
+class WalkForwardOptimizer:
+    """
+    滚动窗口优化器
+
+    把历史按K线数切分为滚动的 样本内(train) / 样本外(test) 窗口，
+    在每个样本内窗口上做参数寻优，再用最优参数在紧随其后的样本外窗口上验证。
+    各窗口在进程池中并行执行。
+    """
+
+    def __init__(self,
+                 strategy_name: str,
+                 param_space: Dict[str, Union[List, tuple]],
+                 train_size: int,
+                 test_size: int,
+                 step: int = None,
+                 method: str = 'grid',
+                 n_samples: int = 50,
+                 metric: str = 'sharpe_ratio',
+                 initial_capital: float = None,
+                 max_workers: int = None,
+                 mode: str = 'vectorized',
+                 constraint: Optional[Callable[[Dict], bool]] = None,
+                 cache_size: int = 256,
+                 seed: int = None):
+        """
+        Args:
+            strategy_name: 已注册的策略名称
+            param_space: 参数空间（格式同 ParameterSweep）
+            train_size: 样本内窗口长度（K线数）
+            test_size: 样本外窗口长度（K线数）
+            step: 窗口滚动步长，默认等于 test_size
+            method: 样本内采样方式（grid/random）
+            n_samples: random 采样次数
+            metric: 寻优指标（优化方向见 ParameterSweep.METRICS）
+            initial_capital: 初始资金
+            max_workers: 进程数，默认使用全部CPU核心
+            mode: 回测引擎撮合模式
+            constraint: 参数约束
+            cache_size: 每个工作进程缓存的预处理结果数量
+            seed: 随机种子
+        """
+        if method == 'bayesian':
+            raise ValueError("滚动窗口优化暂不支持贝叶斯采样")
+        if train_size <= 0 or test_size <= 0:
+            raise ValueError("窗口长度必须大于0")
+        self.sweep = ParameterSweep(
+            strategy_name, param_space, method=method, n_samples=n_samples, metric=metric,
+            initial_capital=initial_capital, max_workers=max_workers, mode=mode,
+            constraint=constraint, seed=seed
+        )
+        self.strategy_name = strategy_name
+        self.train_size = train_size
+        self.test_size = test_size
+        self.step = step or test_size
+        self.metric = metric
+        self.initial_capital = initial_capital
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.mode = mode
+        self.cache_size = cache_size
+
+    def split(self, n_bars: int) -> List[Dict]:
+        """生成滚动窗口（半开区间的K线位置）"""
+        windows = []
+        start = 0
+        while start + self.train_size + self.test_size <= n_bars:
+            train_end = start + self.train_size
+            windows.append({
+                'window': len(windows),
+                'train_start': start,
+                'train_end': train_end,
+                'test_start': train_end,
+                'test_end': train_end + self.test_size
+            })
+            start += self.step
+        return windows
+
+    def run(self, data: pd.DataFrame, stock_code: str = None) -> pd.DataFrame:
+        """
+        执行滚动窗口优化
+
+        Args:
+            data: 单只股票的完整历史数据（按日期升序）
+            stock_code: 股票代码
+
+        Returns:
+            每个窗口一行：窗口区间、最优参数、样本内得分和样本外指标
+        """
+        if data.empty:
+            raise ValueError("数据为空，无法进行滚动窗口优化")
+        data = data.reset_index(drop=True)
+        windows = self.split(len(data))
+        if not windows:
+            raise ValueError(
+                f"数据量不足：只有 {len(data)} 条数据，至少需要 {self.train_size + self.test_size} 条"
+            )
+        candidates = self.sweep.candidates()
+        if not candidates:
+            raise ValueError("没有满足约束的参数组合")
+
+        start = time.perf_counter()
+        strategy_class = StrategyFactory._strategies[self.strategy_name]
+        # 完整历史只写入共享内存一次，工作进程按句柄挂载
+        panel = share_frames({stock_code or '': data})
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(self.max_workers, len(windows)),
+                initializer=_init_worker,
+                initargs=(self.strategy_name, strategy_class, panel.handle if panel is not None else data,
+                          stock_code, self.initial_capital, self.mode, self.metric, self.cache_size, get_calendar())
+            ) as executor:
+                futures = [executor.submit(_run_window, window, candidates) for window in windows]
+                rows = [future.result() for future in futures]
+        finally:
+            if panel is not None:
+                panel.close()
+
+        results = pd.DataFrame(rows)
+        if 'date' in data.columns:
+            dates = data['date']
+            results['train_from'] = dates.iloc[results['train_start']].to_numpy()
+            results['test_from'] = dates.iloc[results['test_start']].to_numpy()
+            results['test_to'] = dates.iloc[results['test_end'] - 1].to_numpy()
+        results.attrs['elapsed'] = time.perf_counter() - start
+        results.attrs['candidates'] = len(candidates)
+        return results
+
+    @staticmethod
+    def summarize(results: pd.DataFrame) -> Dict:
+        """汇总样本外表现（各窗口收益率复利串联）"""
+        column = 'out_of_sample_strategy_return'
+        if results.empty or column not in results.columns:
+            return {'windows': 0, 'compounded_return': 0.0, 'mean_return': 0.0}
+        returns = results[column].astype(float)
+        return {
+            'windows': len(results),
+            'compounded_return': float((1 + returns).prod() - 1),
+            'mean_return': float(returns.mean()),
+            'positive_windows': int((returns > 0).sum())
+        }
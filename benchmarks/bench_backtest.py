@@ -0,0 +1,274 @@
+"""
+回测性能基准测试（离线，使用模拟数据源）
+
+通过 DataFactory.register_adapter 注册 SyntheticAdapter，不访问任何真实数据源。
+分别计时：
+- strategy        MovingAverageStrategy 预处理 + 信号生成
+- execute_trades  BaseStrategy.execute_trades 撮合
+- engine          BacktestEngine.run（event / vectorized 模式）
+- portfolio       BacktestEngine.run_portfolio（多股票共享资金）
+- rest            POST /api/v1/backtest/run（FastAPI TestClient，需要安装httpx）
+
+每项记录最短耗时、吞吐量和峰值内存（tracemalloc，单独运行一次测得），
+结果写为JSON基线，可与历史基线对比，吞吐量下降超过容忍度时返回非零退出码。
+
+用法：
+    python benchmarks/bench_backtest.py
+    python benchmarks/bench_backtest.py --bars 1000 10000 100000 --universe 50 --output benchmarks/results/v1.json
+    python benchmarks/bench_backtest.py --baseline benchmarks/results/v1.json --tolerance 0.2
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.config_manager import ConfigManager
+from core.data.synthetic_adapter import SyntheticAdapter
+from core.factory.data_factory import DataFactory
+from backtest.backtest_engine import BacktestEngine
+from strategies.moving_average_strategy import MovingAverageStrategy
+from utils.logger import setup_logging
+
+
+END_DATE = pd.Timestamp('2024-12-31')
+PARAMS = {'short_window': 5, 'long_window': 20}
+
+
+def configure(max_bars: int, universe: int, seed: int):
+    """切换到模拟数据源，关闭磁盘缓存并使用内存结果存储，避免基准测试读写本地文件"""
+    config = ConfigManager()
+    epoch = END_DATE - pd.offsets.BDay(max_bars + 10)
+    config.set('data_source.default', 'synthetic')
+    config.set('data_source.synthetic.seed', seed)
+    config.set('data_source.synthetic.universe', universe)
+    config.set('data_source.synthetic.epoch', epoch.strftime('%Y-%m-%d'))
+    config.set('data_router.sources', ['synthetic'])
+    config.set('trading_calendar.source', 'weekday')  # 与模拟行情一致（工作日），不联网获取
+    config.set('trading_calendar.path', '')
+    config.set('data_cache.enabled', False)
+    config.set('result_store.backend', 'memory')
+    DataFactory.register_adapter('synthetic', SyntheticAdapter)
+
+
+def date_range(bars: int) -> tuple:
+    """结束于 END_DATE、包含 bars 个交易日的日期区间"""
+    start = END_DATE - pd.offsets.BDay(bars - 1)
+    return start.strftime('%Y-%m-%d'), END_DATE.strftime('%Y-%m-%d')
+
+
+def timed(func, repeat: int) -> tuple:
+    """取多次运行的最短耗时"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def peak_memory(func) -> float:
+    """单独运行一次，返回期间Python分配内存的峰值（MB）"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def record(results: dict, name: str, size: int, func, work: int, unit: str, repeat: int):
+    seconds, _ = timed(func, repeat)
+    results[f"{name}[{size}]"] = {
+        'name': name,
+        'size': size,
+        'seconds': seconds,
+        'throughput': work / seconds if seconds > 0 else float('inf'),
+        'unit': unit,
+        'peak_mb': round(peak_memory(func), 3)
+    }
+    entry = results[f"{name}[{size}]"]
+    print(f"{name:<22} {size:>10} {seconds:>10.4f} {entry['throughput']:>14,.0f} {unit:<10} {entry['peak_mb']:>9.2f}")
+
+
+def bench_single(results: dict, adapter: SyntheticAdapter, bars: int, repeat: int):
+    start, end = date_range(bars)
+    data = adapter.get_daily_data('600000', start, end)
+    data['stock_code'] = '600000'
+    strategy = MovingAverageStrategy('bench', PARAMS)
+
+    record(results, 'strategy', bars,
+           lambda: strategy.generate_signals(strategy.preprocess_data(data)),
+           bars, 'bars/s', repeat)
+
+    signals = strategy.generate_signals(strategy.preprocess_data(data))
+
+    def execute():
+        strategy.reset_state(1_000_000)
+        return strategy.execute_trades(signals)
+
+    record(results, 'execute_trades', bars, execute, max(len(signals), 1), 'signals/s', repeat)
+
+    for mode in BacktestEngine.MODES:
+        engine = BacktestEngine(MovingAverageStrategy('bench', PARAMS), 1_000_000, mode=mode)
+        record(results, f'engine.{mode}', bars, lambda: engine.run(data.copy(), '600000'),
+               bars, 'bars/s', repeat)
+
+
+def bench_portfolio(results: dict, adapter: SyntheticAdapter, bars: int, universe: int, repeat: int):
+    start, end = date_range(bars)
+    frames = []
+    for code in adapter.get_stock_list()[:universe]:
+        frame = adapter.get_daily_data(code, start, end)
+        frame['stock_code'] = code
+        frames.append(frame)
+    panel = pd.concat(frames, ignore_index=True)
+    engine = BacktestEngine(MovingAverageStrategy('bench', PARAMS), 10_000_000)
+    record(results, f'portfolio.x{universe}', bars, lambda: engine.run_portfolio(panel),
+           len(panel), 'bars/s', repeat)
+
+
+def bench_rest(results: dict, bars: int, requests: int):
+    try:
+        from fastapi.testclient import TestClient
+    except (ImportError, RuntimeError) as e:
+        print(f"跳过REST基准测试（需要安装httpx）: {e}")
+        return
+    from backend.main import app
+
+    start, end = date_range(bars)
+    with TestClient(app) as client:
+        response = client.post('/api/v1/strategies', json={
+            'name': 'bench', 'strategy_type': 'moving_average', 'params': PARAMS
+        })
+        response.raise_for_status()
+        payload = {
+            'strategy_id': response.json()['id'],
+            'stock_code': '600000',
+            'start_date': start,
+            'end_date': end
+        }
+
+        def call():
+            response = client.post('/api/v1/backtest/run', json=payload)
+            response.raise_for_status()
+            return response
+
+        call()  # 预热（建立连接池、加载策略）
+        latencies = []
+        for _ in range(requests):
+            begin = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - begin)
+        memory = peak_memory(call)
+
+    latencies = np.array(latencies)
+    total = float(latencies.sum())
+    results[f"rest.backtest_run[{bars}]"] = {
+        'name': 'rest.backtest_run',
+        'size': bars,
+        'seconds': float(latencies.min()),
+        'throughput': requests / total if total > 0 else float('inf'),
+        'unit': 'req/s',
+        'peak_mb': round(memory, 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 2)
+    }
+    entry = results[f"rest.backtest_run[{bars}]"]
+    print(f"{'rest.backtest_run':<22} {bars:>10} {entry['seconds']:>10.4f} {entry['throughput']:>14,.1f} "
+          f"{'req/s':<10} {entry['peak_mb']:>9.2f}  p50={entry['p50_ms']}ms p95={entry['p95_ms']}ms")
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                                capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine()
+    }
+
+
+def compare(results: dict, baseline_path: Path, tolerance: float) -> bool:
+    """与基线对比吞吐量，返回是否存在超出容忍度的退化"""
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8'))['results']
+    regressed = False
+    print(f"\n对比基线: {baseline_path}（容忍度 {tolerance:.0%}）")
+    print(f"{'项目':<32} {'基线':>14} {'当前':>14} {'比值':>8}")
+    for key, entry in results.items():
+        old = baseline.get(key)
+        if old is None:
+            print(f"{key:<32} {'-':>14} {entry['throughput']:>14,.1f} {'新增':>8}")
+            continue
+        ratio = entry['throughput'] / old['throughput'] if old['throughput'] else float('inf')
+        mark = ''
+        if ratio < 1 - tolerance:
+            regressed = True
+            mark = '  ✗ 退化'
+        print(f"{key:<32} {old['throughput']:>14,.1f} {entry['throughput']:>14,.1f} {ratio:>8.2f}{mark}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回测性能基准测试（模拟数据源）")
+    parser.add_argument('--bars', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help="单股票回测的K线数量")
+    parser.add_argument('--universe', type=int, default=50, help="组合回测的股票数量")
+    parser.add_argument('--portfolio-bars', type=int, default=2_500, help="组合回测每只股票的K线数量")
+    parser.add_argument('--rest-bars', type=int, default=2_500, help="REST回测请求的K线数量")
+    parser.add_argument('--rest-requests', type=int, default=20, help="REST回测请求次数（0表示跳过）")
+    parser.add_argument('--repeat', type=int, default=5, help="每项重复次数（取最短耗时）")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=Path, default=None, help="结果JSON输出路径")
+    parser.add_argument('--baseline', type=Path, default=None, help="用于对比的基线JSON")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许的吞吐量下降比例")
+    args = parser.parse_args()
+
+    setup_logging(level='WARNING', enqueue=False, log_file='', force=True)
+    configure(max(args.bars + [args.portfolio_bars, args.rest_bars]), args.universe, args.seed)
+    adapter = SyntheticAdapter()
+
+    results = {}
+    print(f"{'项目':<22} {'规模':>10} {'耗时(s)':>10} {'吞吐量':>14} {'单位':<10} {'峰值(MB)':>9}")
+    for bars in args.bars:
+        bench_single(results, adapter, bars, args.repeat)
+    if args.universe > 0:
+        bench_portfolio(results, adapter, args.portfolio_bars, args.universe, args.repeat)
+    if args.rest_requests > 0:
+        bench_rest(results, args.rest_bars, args.rest_requests)
+
+    report = {'environment': environment(), 'args': {
+        key: value for key, value in vars(args).items() if key not in ('output', 'baseline')
+    }, 'results': results}
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"\n结果已保存: {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
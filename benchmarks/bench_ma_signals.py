@@ -0,0 +1,110 @@
+"""
+移动平均策略信号生成基准测试
+
+对比逐行循环（原实现）与整列向量化实现：
+- 校验两者输出完全一致（含NaN预热区间和1/-1编码）
+- 记录 1万 ~ 100万 行输入下的耗时和加速比（加速比均为实测，逐行实现在100万行约需数分钟）
+
+用法：
+    python benchmarks/bench_ma_signals.py
+    python benchmarks/bench_ma_signals.py --sizes 10000 100000 1000000 --min-speedup 20
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from strategies.moving_average_strategy import MovingAverageStrategy
+
+
+def make_data(n: int, seed: int = 0, nan_ratio: float = 0.001) -> pd.DataFrame:
+    """生成可复现的随机游走行情（少量缺失收盘价，用于覆盖NaN处理）"""
+    rng = np.random.default_rng(seed)
+    close = 10 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    close[rng.random(n) < nan_ratio] = np.nan
+    return pd.DataFrame({
+        'date': pd.date_range('1990-01-01', periods=n, freq='D'),
+        'close': close,
+        'stock_code': '000001'
+    })
+
+
+def legacy_generate_signals(strategy: MovingAverageStrategy, data: pd.DataFrame) -> pd.DataFrame:
+    """原逐行实现（仅用于对比）"""
+    df = data.copy()
+    df['signal'] = 0
+    if len(df) < strategy.long_window:
+        return pd.DataFrame()
+    for i in range(1, len(df)):
+        if pd.isna(df.iloc[i]['ma_short']) or pd.isna(df.iloc[i]['ma_long']):
+            continue
+        if pd.isna(df.iloc[i-1]['ma_short']) or pd.isna(df.iloc[i-1]['ma_long']):
+            continue
+        prev_short = df.iloc[i-1]['ma_short']
+        prev_long = df.iloc[i-1]['ma_long']
+        curr_short = df.iloc[i]['ma_short']
+        curr_long = df.iloc[i]['ma_long']
+        if prev_short <= prev_long and curr_short > curr_long:
+            df.iloc[i, df.columns.get_loc('signal')] = 1
+        elif prev_short >= prev_long and curr_short < curr_long:
+            df.iloc[i, df.columns.get_loc('signal')] = -1
+    signals = df[df['signal'] != 0].copy()
+    if len(signals) > 0 and 'price' not in signals.columns:
+        signals['price'] = signals['close']
+    return signals
+
+
+def timed(func, *args, repeat: int = 3) -> tuple:
+    """取多次运行的最短耗时"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="移动平均信号生成基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-max', type=int, default=None,
+                        help="逐行实现运行的最大行数（默认全部运行），更大的输入只记录向量化耗时，不报告加速比")
+    parser.add_argument('--min-speedup', type=float, default=0.0,
+                        help="最小加速比，低于该值时返回非零退出码")
+    args = parser.parse_args()
+
+    strategy = MovingAverageStrategy('bench', {'short_window': 5, 'long_window': 20})
+    failed = False
+
+    print(f"{'行数':>10} {'向量化(s)':>12} {'逐行(s)':>12} {'加速比':>10}  说明")
+    for n in args.sizes:
+        processed = strategy.preprocess_data(make_data(n))
+        fast_time, fast = timed(strategy.generate_signals, processed)
+
+        if args.legacy_max is not None and n > args.legacy_max:
+            # 未实测的规模不外推加速比，也不参与最小加速比检查
+            print(f"{n:>10} {fast_time:>12.4f} {'-':>12} {'-':>10}  未运行逐行实现")
+            continue
+
+        legacy_time, legacy = timed(legacy_generate_signals, strategy, processed, repeat=1)
+        pd.testing.assert_frame_equal(fast, legacy)
+        speedup = legacy_time / fast_time if fast_time > 0 else float('inf')
+        print(f"{n:>10} {fast_time:>12.4f} {legacy_time:>12.4f} {speedup:>10.1f}  输出一致")
+        if args.min_speedup and not speedup >= args.min_speedup:
+            failed = True
+
+    if failed:
+        print(f"✗ 加速比低于要求: {args.min_speedup}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
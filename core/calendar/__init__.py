@@ -0,0 +1,26 @@
+"""
+交易日历模块
+"""
+from .trading_calendar import (
+    TradingCalendar,
+    MISSING_ORDINAL,
+    get_calendar,
+    set_calendar,
+    to_day,
+    to_date,
+    to_days,
+    normalize_date,
+    ensure_datetime
+)
+
+__all__ = [
+    'TradingCalendar',
+    'MISSING_ORDINAL',
+    'get_calendar',
+    'set_calendar',
+    'to_day',
+    'to_date',
+    'to_days',
+    'normalize_date',
+    'ensure_datetime'
+]
@@ -0,0 +1,353 @@
+"""
+交易日历 - 沪深交易所交易日的整数序号索引和日期规范化
+"""
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.config_manager import ConfigManager
+from utils.logger import get_logger
+
+
+logger = get_logger('交易日历')
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=8192)
+def _parse_text(text: str) -> Optional[int]:
+    """日期字符串（YYYY-MM-DD / YYYY/MM/DD / YYYYMMDD 等）转换为自1970-01-01起的天数"""
+    text = text.strip()
+    try:
+        if len(text) == 8 and text.isdigit():
+            return date(int(text[:4]), int(text[4:6]), int(text[6:])).toordinal() - _EPOCH_ORDINAL
+        if len(text) == 10 and text[4] in '-/' and text[7] == text[4]:
+            return date(int(text[:4]), int(text[5:7]), int(text[8:])).toordinal() - _EPOCH_ORDINAL
+        stamp = pd.Timestamp(text)
+    except ValueError:
+        return None
+    if pd.isna(stamp):
+        return None
+    return stamp.toordinal() - _EPOCH_ORDINAL
+
+
+def to_day(value) -> Optional[int]:
+    """
+    单个日期（Timestamp / datetime / date / datetime64 / 字符串）转换为自1970-01-01起的天数
+
+    无法解析或缺失时返回None。字符串解析结果有缓存，同一日期只解析一次。
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return _parse_text(value)
+    if isinstance(value, np.datetime64):
+        if np.isnat(value):
+            return None
+        return int(value.astype('datetime64[D]').astype(np.int64))
+    if isinstance(value, (datetime, date)):
+        if pd.isna(value):
+            return None
+        return value.toordinal() - _EPOCH_ORDINAL
+    return _parse_text(str(value))
+
+
+def to_date(value) -> Optional[date]:
+    """单个日期转换为date对象，无法解析时返回None"""
+    day = to_day(value)
+    return None if day is None else date.fromordinal(day + _EPOCH_ORDINAL)
+
+
+def to_days(values) -> np.ndarray:
+    """日期序列一次性转换为 datetime64[D] 数组（无法解析的为NaT），已是datetime64的列不重新解析"""
+    if isinstance(values, (pd.Series, pd.Index, np.ndarray)) and pd.api.types.is_datetime64_dtype(values.dtype):
+        return np.asarray(values).astype('datetime64[D]')
+    if isinstance(values, (pd.Series, pd.Index)) and isinstance(values.dtype, pd.DatetimeTZDtype):
+        # 带时区的按本地时间取日期（Series 的 tz_localize 作用于索引，需用 .dt）
+        local = values.dt.tz_localize(None) if isinstance(values, pd.Series) else values.tz_localize(None)
+        return local.to_numpy().astype('datetime64[D]')
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='mixed')
+    return parsed.to_numpy().astype('datetime64[D]')
+
+
+def normalize_date(value, compact: bool = False) -> Optional[str]:
+    """规范化为 YYYY-MM-DD（compact=True 时为 YYYYMMDD，供数据源接口使用）"""
+    day = to_day(value)
+    if day is None:
+        return None
+    text = str(np.datetime64(day, 'D'))
+    return text.replace('-', '') if compact else text
+
+
+def ensure_datetime(frame: pd.DataFrame, column: str = 'date') -> pd.DataFrame:
+    """数据入口处把日期列统一转换为datetime64（已是datetime64时不做任何事），原地修改并返回"""
+    if column in frame.columns and not pd.api.types.is_datetime64_any_dtype(frame[column]):
+        frame[column] = pd.to_datetime(frame[column], errors='coerce', format='mixed')
+    return frame
+
+
+# ordinals 中无法解析的日期（早于任何交易日序号，含义与缺失相同）
+MISSING_ORDINAL = np.iinfo(np.int64).min
+
+
+class _Span:
+    """日历在自然日 [start, end] 内的查找表（扩展日历时整体替换，读取无需加锁）"""
+
+    __slots__ = ('days', 'start', 'offset', 'is_trading', 'before')
+
+    def __init__(self, days: np.ndarray, start: int, end: int, offset: int):
+        self.days = days  # datetime64[D]，升序
+        self.start = start
+        self.offset = offset  # days[offset] 为序号0的交易日
+        is_trading = np.zeros(end - start + 1, dtype=bool)
+        is_trading[days.astype(np.int64) - start] = True
+        self.is_trading = is_trading
+        # before[k]: 自然日 start+k 之前（不含当日）的交易日数减去 offset，即该日（非交易日为其后第一个交易日）的序号
+        self.before = np.concatenate(([0], np.cumsum(is_trading)[:-1])).astype(np.int64) - offset
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.before) - 1
+
+
+class TradingCalendar:
+    """
+    交易日历
+
+    交易日按升序编号为整数序号（构造时的第一个交易日为0）。预先计算每个自然日对应的序号查找表，
+    之后以下查询都是一次数组下标访问，O(1)：
+    - ordinal: 交易日 -> 序号（非交易日取其后第一个交易日的序号）
+    - next_day / prev_day: 之后/之前第n个交易日
+    - days_between: 两个日期之间的交易日数
+    ordinals 对整列日期做同样的向量化换算。
+
+    查询超出已知范围的日期时，按工作日（排除给定休市日）延伸日历后再查，不会把两端之外的日期
+    都归到同一个序号。向前延伸的交易日序号为负，已有日期的序号不变。
+
+    序号可直接作为 LotLedger 的批次日期：卖出日序号大于买入日序号即满足T+1。
+    """
+
+    def __init__(self, trading_days: Iterable, holidays: Iterable = ()):
+        days = np.unique(to_days(list(trading_days)))
+        days = days[~np.isnat(days)]
+        if len(days) == 0:
+            raise ValueError("交易日历为空")
+        self._holidays = list(holidays)  # 延伸日历时排除的休市日
+        self._lock = threading.Lock()
+        self._span = _Span(days, int(days[0].astype(np.int64)), int(days[-1].astype(np.int64)), 0)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def weekdays(cls, start, end, holidays: Iterable = ()) -> 'TradingCalendar':
+        """周一至周五（排除给定休市日）组成的日历"""
+        return cls(_weekdays(start, end, holidays), holidays)
+
+    @property
+    def days(self) -> np.ndarray:
+        """全部交易日（datetime64[D]，升序，含已延伸的部分）"""
+        return self._span.days
+
+    @property
+    def first(self) -> pd.Timestamp:
+        return pd.Timestamp(self.days[0])
+
+    @property
+    def last(self) -> pd.Timestamp:
+        return pd.Timestamp(self.days[-1])
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def _cover(self, lo: int, hi: int) -> _Span:
+        """保证查找表覆盖自然日 [lo, hi]，超出部分按工作日延伸"""
+        span = self._span
+        if lo >= span.start and hi <= span.end:
+            return span
+        with self._lock:
+            span = self._span
+            start, end = min(lo, span.start), max(hi, span.end)
+            head = _weekdays(np.datetime64(start, 'D'), np.datetime64(span.start - 1, 'D'), self._holidays)
+            tail = _weekdays(np.datetime64(span.end + 1, 'D'), np.datetime64(end, 'D'), self._holidays)
+            days = np.concatenate((head, span.days, tail))
+            self._span = span = _Span(days, start, end, span.offset + len(head))
+            logger.debug("交易日历按工作日延伸至 {} ~ {}", np.datetime64(start, 'D'), np.datetime64(end, 'D'))
+        return span
+
+    def _counts(self, day: int) -> tuple:
+        """(当日之前的交易日数, 截至当日含当日的交易日数)，均减去 offset 与序号对齐"""
+        span = self._cover(day, day)
+        k = day - span.start
+        before = int(span.before[k])
+        return before, before + int(span.is_trading[k])
+
+    def is_trading_day(self, value) -> bool:
+        day = to_day(value)
+        if day is None:
+            return False
+        span = self._cover(day, day)
+        return bool(span.is_trading[day - span.start])
+
+    def ordinal(self, value) -> Optional[int]:
+        """交易日序号（非交易日取其后第一个交易日的序号），无法解析时返回None"""
+        day = to_day(value)
+        if day is None:
+            return None
+        return self._counts(day)[0]
+
+    def ordinals(self, values) -> np.ndarray:
+        """整列日期的交易日序号（int64数组，无法解析的为 MISSING_ORDINAL）"""
+        days = to_days(values)
+        missing = np.isnat(days)
+        if missing.all():
+            return np.full(len(days), MISSING_ORDINAL, dtype=np.int64)
+        numbers = days.astype(np.int64)
+        valid = numbers[~missing]
+        span = self._cover(int(valid.min()), int(valid.max()))
+        offsets = np.where(missing, 0, numbers - span.start)
+        return np.where(missing, MISSING_ORDINAL, span.before[offsets]).astype(np.int64)
+
+    def day(self, ordinal: int) -> pd.Timestamp:
+        """序号对应的交易日"""
+        span = self._span
+        return pd.Timestamp(span.days[ordinal + span.offset])
+
+    def _day_or_none(self, ordinal: int) -> Optional[pd.Timestamp]:
+        span = self._span
+        index = ordinal + span.offset
+        return pd.Timestamp(span.days[index]) if 0 <= index < len(span.days) else None
+
+    def _margin(self, n: int) -> int:
+        """容纳n个延伸交易日所需的自然日数"""
+        return (abs(n) // 5 + 2) * 7 + len(self._holidays)
+
+    def next_day(self, value, n: int = 1) -> Optional[pd.Timestamp]:
+        """value 之后（不含当日）的第n个交易日，无法解析时返回None"""
+        day = to_day(value)
+        if day is None:
+            return None
+        self._cover(day, day + self._margin(n))
+        return self._day_or_none(self._counts(day)[1] + n - 1)
+
+    def prev_day(self, value, n: int = 1) -> Optional[pd.Timestamp]:
+        """value 之前（不含当日）的第n个交易日，无法解析时返回None"""
+        day = to_day(value)
+        if day is None:
+            return None
+        self._cover(day - self._margin(n), day)
+        return self._day_or_none(self._counts(day)[0] - n)
+
+    def days_between(self, start, end) -> int:
+        """(start, end] 区间内的交易日数；两者均为交易日时即序号之差，end 早于 start 时为负数"""
+        start_day, end_day = to_day(start), to_day(end)
+        if start_day is None or end_day is None:
+            raise ValueError(f"无法解析日期: {start} ~ {end}")
+        return self._counts(end_day)[1] - self._counts(start_day)[1]
+
+    def range(self, start, end) -> pd.DatetimeIndex:
+        """[start, end] 内的全部交易日"""
+        start_day, end_day = to_day(start), to_day(end)
+        span = self._cover(start_day, end_day)
+        lo = int(span.before[start_day - span.start]) + span.offset
+        k = end_day - span.start
+        hi = int(span.before[k]) + int(span.is_trading[k]) + span.offset
+        return pd.DatetimeIndex(span.days[lo:hi].astype('datetime64[ns]'))
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('\n'.join(str(day) for day in self.days) + '\n', encoding='utf-8')
+
+    @classmethod
+    def load(cls, path) -> 'TradingCalendar':
+        """读取交易日列表文件（每行一个日期）"""
+        lines = Path(path).read_text(encoding='utf-8').split()
+        return cls(line for line in lines if line[:1].isdigit())
+
+    @classmethod
+    def from_config(cls) -> 'TradingCalendar':
+        """
+        按 trading_calendar 配置构建日历
+
+        交易日列表文件存在时直接读取；否则从配置的来源获取（akshare失败时退回工作日日历），
+        获取成功后写入文件。已知交易日之后按工作日延伸 extend_years 年，以覆盖未来日期。
+        """
+        config = ConfigManager()
+        path = config.get('trading_calendar.path', 'data/calendar/trade_dates.csv')
+        source = config.get('trading_calendar.source', 'akshare')
+        start = config.get('trading_calendar.start', '1990-12-19')
+        holidays = config.get('trading_calendar.holidays') or []
+        extend_years = config.get('trading_calendar.extend_years', 5)
+
+        days = None
+        if path and Path(path).exists():
+            try:
+                days = cls.load(path).days
+            except (OSError, ValueError) as e:
+                logger.warning("读取交易日历失败，重新获取: {} ({})", path, e)
+        if days is None and source == 'akshare':
+            try:
+                days = _fetch_akshare()
+                if path:
+                    cls(days).save(path)
+            except Exception as e:
+                logger.warning("获取交易所交易日历失败，使用工作日日历（节假日按交易日处理）: {}", e)
+        if days is None:
+            days = _weekdays(start, pd.Timestamp.today(), holidays)
+
+        following = pd.Timestamp(days[-1]) + pd.Timedelta(days=1)
+        horizon = pd.Timestamp.today() + pd.DateOffset(years=extend_years)
+        return cls(np.concatenate((days, _weekdays(following, horizon, holidays))), holidays)
+
+
+def _weekdays(start, end, holidays: Iterable = ()) -> np.ndarray:
+    """[start, end] 内除休市日以外的周一至周五（end 早于 start 时为空）"""
+    days = np.arange(np.datetime64(normalize_date(start)), np.datetime64(normalize_date(end)) + 1)
+    days = days[np.is_busday(days)]
+    holidays = to_days(list(holidays))
+    if len(holidays):
+        days = days[~np.isin(days, holidays)]
+    return days
+
+
+def _fetch_akshare() -> np.ndarray:
+    """新浪财经的沪深交易日历（含历史和当年已公布的交易日）"""
+    try:
+        import akshare as ak
+    except ImportError as e:
+        raise ImportError("获取交易日历需要安装akshare: pip install akshare") from e
+    frame = ak.tool_trade_date_hist_sina()
+    return to_days(frame['trade_date'])
+
+
+_calendar: Optional[TradingCalendar] = None
+_calendar_lock = threading.Lock()
+
+
+def get_calendar() -> TradingCalendar:
+    """进程内共享的交易日历（首次使用时按配置构建）"""
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                _calendar = TradingCalendar.from_config()
+    return _calendar
+
+
+def set_calendar(calendar: Optional[TradingCalendar]):
+    """替换共享的交易日历（None表示下次使用时按配置重新构建）"""
+    global _calendar
+    with _calendar_lock:
+        _calendar = calendar
@@ -54,13 +54,79 @@ class ConfigManager:
         return {
             'data_source': {
                 'default': 'baostock',
+                'coalesce': True,
                 'tushare': {
                     'token': ''
                 },
                 'akshare': {
                     'timeout': 30
                 },
-                'baostock': {}
+                'baostock': {},
+                'synthetic': {
+                    'seed': 42,
+                    'universe': 100,
+                    'csv_dir': '',
+                    'epoch': '1990-12-19',
+                    'volatility': 0.02
+                },
+                'rate_limits': {
+                    'baostock': 20,
+                    'akshare': 5,
+                    'tushare': 3
+                }
+            },
+            'data_pool': {
+                'enabled': True,
+                'max_sessions': 4,
+                'idle_timeout': 600,
+                'health_check_interval': 60,
+                'acquire_timeout': 30,
+                'sessions': {
+                    'baostock': 1
+                }
+            },
+            'data_router': {
+                'enabled': True,
+                'sources': [],
+                'failure_threshold': 5,
+                'reset_timeout': 30,
+                'window': 200,
+                'min_samples': 5,
+                'hedge': False,
+                'hedge_delay_ms': None,
+                'hedge_workers': 4,
+                'explore_interval': 0
+            },
+            'data_bulk': {
+                'max_workers': 8,
+                'retries': 3,
+                'backoff': 0.5,
+                'concurrency': {
+                    'baostock': 1
+                }
+            },
+            'shared_data': {
+                'enabled': True,
+                'backend': 'shm',
+                'path': ''
+            },
+            'profiling': {
+                'enabled': False
+            },
+            'trading_calendar': {
+                'path': 'data/calendar/trade_dates.csv',
+                'source': 'akshare',
+                'holidays': [],
+                'start': '1990-12-19',
+                'extend_years': 5
+            },
+            'data_cache': {
+                'enabled': True,
+                'path': 'data/cache',
+                'max_size_mb': 2048,
+                'adjust': 'qfq',
+                'offline': False,
+                'empty_ttl': 3600
             },
             'trading': {
                 'initial_capital': 1000000,
@@ -68,6 +134,30 @@ class ConfigManager:
                 'slippage': 0.001,
                 'min_trade_amount': 100
             },
+            'backtest': {
+                'mode': 'event',
+                'periods_per_year': 252,
+                'risk_free_rate': 0.0
+            },
+            'result_store': {
+                'backend': 'sqlite',
+                'path': 'data/backtests.db',
+                'hot_size': 128,
+                'retention_days': 0,
+                'max_size': 1000
+            },
+            'jobs': {
+                'max_workers': None,
+                'max_pending': 100,
+                'max_history': 1000
+            },
+            'api': {
+                'compression': {
+                    'minimum_size': 1024,
+                    'gzip_level': 6,
+                    'brotli_quality': 5
+                }
+            },
             'risk_control': {
                 'max_position': 0.3,
                 'max_total_position': 0.95,
@@ -76,7 +166,9 @@ class ConfigManager:
             },
             'logging': {
                 'level': 'INFO',
-                'file': 'logs/trading.log'
+                'file': 'logs/trading.log',
+                'enqueue': True,
+                'buffer_size': 1000
             }
         }
     
@@ -91,6 +183,16 @@ class ConfigManager:
                 return default
         return value
     
+    def set(self, key: str, value: Any):
+        """运行时覆盖配置值（只影响当前进程，不写回配置文件）"""
+        keys = key.split('.')
+        target = self._config
+        for k in keys[:-1]:
+            if not isinstance(target.get(k), dict):
+                target[k] = {}
+            target = target[k]
+        target[keys[-1]] = value
+    
     def get_config(self) -> Dict:
         """获取完整配置"""
         return self._config.copy()
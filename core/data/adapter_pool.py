@@ -0,0 +1,292 @@
+"""
+适配器连接池 - 复用数据源会话
+"""
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+from core.data.data_adapter import DataAdapter
+from core.data.adapter_proxy import AdapterProxy
+from utils.logger import get_logger
+
+
+logger = get_logger('连接池')
+
+
+def is_healthy(adapter: DataAdapter) -> bool:
+    """适配器会话是否可用（检查初始化/连接标志，支持时调用 ping）"""
+    if not getattr(adapter, 'initialized', True) or not getattr(adapter, '_connected', True):
+        return False
+    ping = getattr(adapter, 'ping', None)
+    if callable(ping):
+        try:
+            return bool(ping())
+        except Exception:
+            return False
+    return True
+
+
+def is_broken(error: BaseException) -> bool:
+    """
+    调用异常是否说明会话已失效
+
+    只有连接/传输错误（ConnectionError、超时等 OSError，requests 的网络异常也是其子类）
+    和中断类异常（调用中途退出，会话状态未知）才丢弃会话；股票代码无效、结果为空等业务异常
+    与连接无关，会话照常归还。
+    """
+    return isinstance(error, (OSError, EOFError)) or not isinstance(error, Exception)
+
+
+def close_adapter(adapter: DataAdapter):
+    """关闭适配器会话（支持 close/logout 时调用）"""
+    for name in ('close', 'logout'):
+        method = getattr(adapter, name, None)
+        if callable(method):
+            try:
+                method()
+            except Exception as e:
+                logger.debug("关闭数据源会话失败: {}", e)
+            return
+
+
+class _Session:
+    __slots__ = ('adapter', 'last_used', 'last_checked')
+
+    def __init__(self, adapter: DataAdapter):
+        now = time.monotonic()
+        self.adapter = adapter
+        self.last_used = now
+        self.last_checked = now
+
+
+class AdapterPool:
+    """
+    数据源会话池
+
+    - 空闲会话按后进先出复用（最近用过的连接最可能仍然有效）
+    - 复用前若距上次检查超过 health_check_interval，先做健康检查，失效则丢弃并重新创建
+    - 空闲超过 idle_timeout 的会话被关闭；会话总数不超过 max_sessions，用满时等待归还
+    - 连接/传输出错的会话直接丢弃，下次使用时再重新连接；其他调用异常（如参数无效）不影响会话
+    """
+
+    def __init__(self, name: str, factory: Callable[[], DataAdapter], max_sessions: int = 4,
+                 idle_timeout: float = 600, health_check_interval: float = 60,
+                 acquire_timeout: float = 30):
+        self.name = name
+        self.factory = factory
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        # 元数据：适配器类型和最近一次连接的错误，供查看状态时使用，不必借出会话
+        self.adapter_class = factory if isinstance(factory, type) else None
+        self.last_error = None
+        self._failed_at = None
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._leased: Dict[int, _Session] = {}
+        self._size = 0
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _check_fork(self):
+        # 子进程不能共用父进程的连接，丢弃继承来的会话（不关闭，避免影响父进程）
+        if self._pid != os.getpid():
+            self._reset()
+
+    @property
+    def initialized(self) -> bool:
+        """最近一次连接是否成功（失败状态保留 health_check_interval 秒，之后允许重新连接）"""
+        failed = self._failed_at
+        return failed is None or time.monotonic() - failed >= self.health_check_interval
+
+    def _record(self, adapter: DataAdapter = None, error: str = None):
+        """记录新建会话或健康检查的结果"""
+        if adapter is not None:
+            self.adapter_class = type(adapter)
+            if error is None and not getattr(adapter, 'initialized', True):
+                error = getattr(adapter, 'error_message', None) or f"{self.name} 数据源未初始化"
+        self.last_error = error
+        self._failed_at = time.monotonic() if error is not None else None
+
+    def acquire(self) -> DataAdapter:
+        """借出一个会话（池满时最多等待 acquire_timeout 秒）"""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            session = None
+            expired = []
+            with self._cond:
+                self._check_fork()
+                while session is None:
+                    now = time.monotonic()
+                    while self._idle:
+                        candidate = self._idle.pop()
+                        if now - candidate.last_used > self.idle_timeout:
+                            expired.append(candidate)
+                            self._size -= 1
+                            continue
+                        session = candidate
+                        break
+                    if session is not None or self._size < self.max_sessions:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError(f"{self.name} 数据源连接池已满（{self.max_sessions}），等待超时")
+                    self._cond.wait(remaining)
+                if session is None:
+                    self._size += 1
+
+            for old in expired:
+                self.discarded += 1
+                close_adapter(old.adapter)
+
+            if session is None:
+                try:
+                    adapter = self.factory()
+                except BaseException as e:
+                    self._record(error=str(e) or type(e).__name__)
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                self.created += 1
+                self._record(adapter)
+                with self._cond:
+                    self._leased[id(adapter)] = _Session(adapter)
+                logger.debug("{} 新建会话，当前 {} 个", self.name, self._size)
+                return adapter
+
+            now = time.monotonic()
+            if now - session.last_checked >= self.health_check_interval:
+                session.last_checked = now
+                if not is_healthy(session.adapter):
+                    logger.info("{} 会话健康检查失败，重新连接", self.name)
+                    self._record(session.adapter, getattr(session.adapter, 'error_message', None)
+                                 or f"{self.name} 会话健康检查失败")
+                    with self._cond:
+                        self._size -= 1
+                        self.discarded += 1
+                        self._cond.notify()
+                    close_adapter(session.adapter)
+                    continue
+            self.reused += 1
+            with self._cond:
+                self._leased[id(session.adapter)] = session
+            return session.adapter
+
+    def release(self, adapter: DataAdapter, broken: bool = False):
+        """归还会话；broken=True 时关闭并丢弃"""
+        with self._cond:
+            session = self._leased.pop(id(adapter), None)
+            if session is None:
+                # 不是本池借出的会话（如fork前借出）
+                return
+            if broken:
+                self._size -= 1
+                self.discarded += 1
+            else:
+                session.last_used = time.monotonic()
+                self._idle.append(session)
+            self._cond.notify()
+        if broken:
+            close_adapter(adapter)
+
+    @contextmanager
+    def session(self):
+        """借出会话的上下文管理器，代码块抛出连接类异常（见 is_broken）时丢弃该会话"""
+        adapter = self.acquire()
+        try:
+            yield adapter
+        except BaseException as e:
+            self.release(adapter, broken=is_broken(e))
+            raise
+        else:
+            self.release(adapter)
+
+    def close(self):
+        """关闭所有空闲会话"""
+        with self._cond:
+            sessions = list(self._idle)
+            self._idle.clear()
+            self._size -= len(sessions)
+        for session in sessions:
+            close_adapter(session.adapter)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'max_sessions': self.max_sessions,
+                'open': self._size,
+                'idle': len(self._idle),
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded
+            }
+
+
+class PooledDataAdapter(AdapterProxy):
+    """
+    池化的数据适配器（代理模式）
+
+    不绑定固定会话：每次方法调用从连接池借出一个会话，调用结束后归还。
+    调用方可以长期持有本对象，连接由连接池统一复用和重连。
+    适配器类型、initialized、error_message 取自连接池元数据，查看状态不会借出会话或建立连接。
+    """
+
+    def __init__(self, pool: AdapterPool):
+        self._pool = pool
+        self._adapter = None
+
+    @property
+    def pool(self) -> AdapterPool:
+        return self._pool
+
+    @property
+    def source_key(self) -> AdapterPool:
+        # 同一连接池的会话访问同一数据源
+        return self._pool
+
+    @property
+    def adapter_class(self) -> type:
+        return self._pool.adapter_class or type(self)
+
+    @property
+    def initialized(self) -> bool:
+        return self._pool.initialized
+
+    @property
+    def error_message(self):
+        return self._pool.last_error
+
+    def _call(self, name: str, *args, **kwargs):
+        with self._pool.session() as adapter:
+            return getattr(adapter, name)(*args, **kwargs)
+
+    def get_stock_list(self):
+        return self._call('get_stock_list')
+
+    def get_daily_data(self, stock_code: str, start_date: str, end_date: str):
+        return self._call('get_daily_data', stock_code, start_date, end_date)
+
+    def get_realtime_data(self, stock_code: str):
+        return self._call('get_realtime_data', stock_code)
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('_pool', '_adapter'):
+            raise AttributeError(name)
+        if callable(getattr(self._pool.adapter_class, name, None)):
+            return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+        # 实例属性只能从会话上读取，按正常流程借出并归还
+        with self._pool.session() as adapter:
+            return getattr(adapter, name)
+
+    def __repr__(self) -> str:
+        return f"PooledDataAdapter({self._pool.name})"
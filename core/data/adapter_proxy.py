@@ -0,0 +1,71 @@
+"""
+适配器代理 - 装饰器模式包装数据适配器
+"""
+from typing import Hashable
+
+import pandas as pd
+from core.data.data_adapter import DataAdapter
+
+
+class AdapterProxy(DataAdapter):
+    """
+    适配器代理基类
+
+    包装另一个DataAdapter，子类只需重写关心的方法（如缓存、合并请求），
+    其余方法和属性（get_stock_name、initialized等）透传给被包装的适配器。
+    """
+
+    def __init__(self, adapter: DataAdapter):
+        self._adapter = adapter
+
+    @property
+    def inner(self) -> DataAdapter:
+        """被包装的适配器"""
+        return self._adapter
+
+    @property
+    def source_key(self) -> Hashable:
+        """实际访问的数据源的标识（请求合并按此区分数据源），默认为最内层的适配器对象"""
+        adapter = self._adapter
+        return adapter.source_key if isinstance(adapter, AdapterProxy) else adapter
+
+    @property
+    def adapter_class(self) -> type:
+        """实际数据源适配器的类型（不借出会话、不建立连接；离线缓存没有数据源时为最内层代理的类型）"""
+        adapter = self._adapter
+        if isinstance(adapter, AdapterProxy):
+            return adapter.adapter_class
+        return type(adapter) if adapter is not None else type(self)
+
+    def unwrap(self) -> DataAdapter:
+        """逐层解包，返回最内层的实际数据源适配器（离线缓存或连接池没有固定适配器时返回最内层代理）"""
+        proxy = self
+        while isinstance(proxy.inner, AdapterProxy):
+            proxy = proxy.inner
+        return proxy.inner if proxy.inner is not None else proxy
+
+    def get_stock_list(self):
+        return self._adapter.get_stock_list()
+
+    def get_daily_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+        return self._adapter.get_daily_data(stock_code, start_date, end_date)
+
+    def get_realtime_data(self, stock_code: str) -> pd.DataFrame:
+        return self._adapter.get_realtime_data(stock_code)
+
+    def get_daily_data_bulk(self, codes, start_date: str, end_date: str, **kwargs):
+        """批量下载多只股票的日线数据（参数见 core.data.bulk.get_daily_data_bulk）"""
+        from core.data.bulk import get_daily_data_bulk
+        return get_daily_data_bulk(self, codes, start_date, end_date, **kwargs)
+
+    def __getattr__(self, name):
+        if name == '_adapter':
+            raise AttributeError(name)
+        return getattr(self._adapter, name)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._adapter!r})"
+
+
+# 基类可能声明了更多抽象方法，代理统一通过 __getattr__ 透传，无需逐一实现
+AdapterProxy.__abstractmethods__ = frozenset()
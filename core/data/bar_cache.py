@@ -0,0 +1,393 @@
+"""
+本地日线缓存 - 内存映射的列式K线缓存
+"""
+import os
+import json
+import time
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config_manager import ConfigManager
+from core.data.data_adapter import DataAdapter
+from core.data.adapter_proxy import AdapterProxy
+from core.data.bulk import source_name
+from core.calendar.trading_calendar import to_day
+from utils.logger import get_logger
+from utils.metrics import REGISTRY, Counter
+
+
+logger = get_logger('日线缓存')
+
+# 缓存查询结果：hit=完全命中，partial=需补齐部分区间，miss=整个区间都需拉取，offline=离线只读缓存
+CACHE_REQUESTS = Counter('quant_data_cache_requests_total', '本地日线缓存查询次数', ('result',), REGISTRY)
+
+# 短于该天数的空缺口视为节假日/停牌，拉取结果为空也记为已覆盖，避免反复请求；
+# 更长的空缺口在第一根已缓存K线之前（上市前）时永久记为已覆盖，否则只在 data_cache.empty_ttl 内有效
+HOLIDAY_GAP_DAYS = 15
+
+
+def parse_day(value) -> int:
+    """日期（YYYYMMDD / YYYY-MM-DD / date）转换为整数日序号"""
+    day = to_day(value)
+    if day is None:
+        raise ValueError(f"无法解析日期: {value}")
+    return day
+
+
+def _format_day(ordinal: int, dashed: bool) -> str:
+    """整数日序号转换为与调用方一致的日期字符串"""
+    text = str(np.datetime64(int(ordinal), 'D'))
+    return text if dashed else text.replace('-', '')
+
+
+def _merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    """合并重叠或相邻的闭区间"""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _missing_ranges(ranges: List[List[int]], start: int, end: int) -> List[Tuple[int, int]]:
+    """[start, end] 中未被已覆盖区间包含的部分"""
+    gaps = []
+    cursor = start
+    for lo, hi in ranges:
+        if hi < cursor:
+            continue
+        if lo > end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo - 1))
+        cursor = max(cursor, hi + 1)
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class BarCache:
+    """
+    日线数据磁盘缓存
+
+    每个 (数据源, 复权类型, 股票代码) 一个按日期升序的NumPy结构化数组（.npy，读取时内存映射），
+    旁边的 .json 记录已覆盖的日期区间和列信息。不同数据源的复权方式和成交量单位可能不同，分目录存放。
+    读取时只向数据源补齐缺失的日期区间，合并去重后原子替换写回。
+    缓存目录下所有数据源的总大小超过上限时按最近访问时间淘汰。
+    """
+
+    def __init__(self, path: str = None, max_size_mb: float = None, adjust: str = None, source: str = None):
+        config = ConfigManager()
+        self.root = Path(path or config.get('data_cache.path', 'data/cache'))
+        self.max_bytes = int((max_size_mb or config.get('data_cache.max_size_mb', 2048)) * 1024 * 1024)
+        self.adjust = adjust or config.get('data_cache.adjust', 'qfq')
+        self.source = source or config.get('data_source.default', 'baostock')
+        self.directory = self.root / self.source / self.adjust
+        self._lock = threading.RLock()
+
+    def _paths(self, stock_code: str) -> Tuple[Path, Path]:
+        return self.directory / f"{stock_code}.npy", self.directory / f"{stock_code}.json"
+
+    def _load_meta(self, stock_code: str) -> Optional[Dict]:
+        _, meta_path = self._paths(stock_code)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, stock_code: str, meta: Dict):
+        _, meta_path = self._paths(stock_code)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = meta_path.with_suffix('.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, meta_path)
+
+    def coverage(self, stock_code: str) -> List[List[int]]:
+        """已缓存的日期区间（整数日序号闭区间，含未过期的空区间）"""
+        meta = self._load_meta(stock_code)
+        if not meta:
+            return []
+        now = time.time()
+        empty = [[lo, hi] for lo, hi, expires in meta.get('empty', ()) if expires > now]
+        return _merge_ranges(meta['ranges'] + empty) if empty else meta['ranges']
+
+    def first_day(self, stock_code: str) -> Optional[int]:
+        """第一根已缓存K线的日期（整数日序号），没有数据时返回None"""
+        data_path, _ = self._paths(stock_code)
+        try:
+            days = np.load(data_path, mmap_mode='r')['date']
+        except (OSError, ValueError):
+            return None
+        return int(days[0]) if len(days) else None
+
+    def mark_empty(self, stock_code: str, start: int, end: int, ttl: float = None):
+        """把数据源返回为空的 [start, end] 记为已覆盖；ttl 秒后过期，None 为永久"""
+        with self._lock:
+            meta = self._load_meta(stock_code) or {'ranges': [], 'columns': [], 'constants': {}}
+            if ttl is None:
+                meta['ranges'] = _merge_ranges(meta['ranges'] + [[int(start), int(end)]])
+            else:
+                now = time.time()
+                empty = [item for item in meta.get('empty', []) if item[2] > now]
+                meta['empty'] = empty + [[int(start), int(end), now + ttl]]
+            self._save_meta(stock_code, meta)
+
+    def missing(self, stock_code: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """需要向数据源补齐的日期区间"""
+        return _missing_ranges(self.coverage(stock_code), start, end)
+
+    def read(self, stock_code: str, start: int, end: int) -> pd.DataFrame:
+        """读取 [start, end] 区间的缓存数据"""
+        meta = self._load_meta(stock_code)
+        if not meta:
+            return pd.DataFrame()
+        data_path, meta_path = self._paths(stock_code)
+        try:
+            bars = np.load(data_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return pd.DataFrame()
+        days = bars['date']
+        lo = np.searchsorted(days, start, side='left')
+        hi = np.searchsorted(days, end, side='right')
+        # 更新访问时间，供LRU淘汰使用
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return self._to_frame(np.array(bars[lo:hi]), meta)
+
+    def write(self, stock_code: str, frame: pd.DataFrame, start: int, end: int):
+        """合并新拉取的数据并把 [start, end] 记为已覆盖"""
+        with self._lock:
+            meta = self._load_meta(stock_code) or {'ranges': [], 'columns': [], 'constants': {}}
+            data_path, meta_path = self._paths(stock_code)
+            data_path.parent.mkdir(parents=True, exist_ok=True)
+
+            if not frame.empty and 'date' in frame.columns:
+                new_bars, columns, constants = self._to_records(frame)
+                old_bars = None
+                if meta['columns'] and data_path.exists():
+                    old_bars = np.load(data_path)
+                    if old_bars.dtype != new_bars.dtype:
+                        # 数据源列结构变化时丢弃旧缓存，按新数据重建
+                        old_bars = None
+                        meta['ranges'] = []
+                if old_bars is not None and len(old_bars):
+                    # 新数据优先：先放新数据，去重时保留首次出现的记录
+                    combined = np.concatenate([new_bars, old_bars])
+                    _, first = np.unique(combined['date'], return_index=True)
+                    new_bars = combined[first]
+                self._atomic_save(data_path, new_bars)
+                meta['columns'] = columns
+                meta['constants'].update(constants)
+            elif not meta['columns']:
+                # 尚无任何数据，不记录空覆盖
+                return
+
+            meta['ranges'] = _merge_ranges(meta['ranges'] + [[int(start), int(end)]])
+            self._save_meta(stock_code, meta)
+            self.evict()
+
+    def evict(self):
+        """缓存目录总大小超过上限时，按最近访问时间淘汰最久未用的股票（不区分数据源）"""
+        with self._lock:
+            entries = []
+            total = 0
+            for data_path in self.root.rglob('*.npy'):
+                meta_path = data_path.with_suffix('.json')
+                try:
+                    size = data_path.stat().st_size + meta_path.stat().st_size
+                    accessed = meta_path.stat().st_mtime
+                except OSError:
+                    continue
+                entries.append((accessed, size, data_path, meta_path))
+                total += size
+            if total <= self.max_bytes:
+                return
+            for _, size, data_path, meta_path in sorted(entries, key=lambda e: e[0]):
+                for path in (meta_path, data_path):
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+                total -= size
+                logger.debug("淘汰缓存: {}", data_path.name)
+                if total <= self.max_bytes:
+                    break
+
+    def clear(self, stock_code: str = None):
+        """清除本数据源指定股票（或全部）缓存"""
+        with self._lock:
+            if stock_code is None:
+                paths = list(self.directory.glob('*.npy')) + list(self.directory.glob('*.json'))
+            else:
+                paths = list(self._paths(stock_code))
+            for path in paths:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def size(self) -> int:
+        """缓存目录（所有数据源）当前占用字节数"""
+        return sum(path.stat().st_size for path in self.root.rglob('*.*') if path.is_file())
+
+    @staticmethod
+    def _atomic_save(path: Path, bars: np.ndarray):
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.save(f, bars)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _to_records(frame: pd.DataFrame) -> Tuple[np.ndarray, List[List[str]], Dict]:
+        """DataFrame -> 按日期升序去重的结构化数组；单值的文本列（如股票代码）存入元数据"""
+        frame = frame.copy()
+        frame['date'] = pd.to_datetime(frame['date'], errors='coerce', format='mixed')
+        frame = frame.dropna(subset=['date'])
+        frame = frame.drop_duplicates('date', keep='last').sort_values('date')
+
+        fields = [('date', np.int64)]
+        columns = [['date', 'datetime64[ns]']]
+        constants = {}
+        for name in frame.columns:
+            if name == 'date':
+                continue
+            series = frame[name]
+            if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                dtype = series.dtype
+                if not (isinstance(dtype, np.dtype) and dtype.kind in 'iub'):
+                    dtype = np.dtype(np.float64)
+                fields.append((name, dtype))
+                columns.append([name, dtype.str])
+            elif series.nunique(dropna=False) <= 1:
+                value = None if series.empty else series.iloc[0]
+                if value is not None and not isinstance(value, str):
+                    continue
+                constants[name] = value
+                columns.append([name, 'constant'])
+            # 其他逐行变化的文本列不缓存
+
+        bars = np.empty(len(frame), dtype=fields)
+        bars['date'] = frame['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        for name, dtype in fields[1:]:
+            if dtype.kind == 'f':
+                bars[name] = frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                bars[name] = frame[name].to_numpy()
+        return bars, columns, constants
+
+    @staticmethod
+    def _to_frame(bars: np.ndarray, meta: Dict) -> pd.DataFrame:
+        frame = pd.DataFrame(index=range(len(bars)))
+        for name, dtype in meta['columns']:
+            if name == 'date':
+                frame['date'] = pd.to_datetime(bars['date'].astype('datetime64[D]'))
+            elif dtype == 'constant':
+                frame[name] = meta['constants'].get(name)
+            else:
+                frame[name] = bars[name]
+        return frame
+
+
+class CachedDataAdapter(AdapterProxy):
+    """
+    带本地缓存的数据适配器（代理模式）
+
+    对外保持DataAdapter接口不变，get_daily_data 先读本地缓存，只向数据源拉取缺失区间。
+    离线模式只读本地缓存；在线模式下补齐缺失区间失败时抛出数据源的异常，不返回不完整的缓存数据。
+    缓存按数据源分目录，source 默认取被包装适配器的类名（如 baostock）。
+    """
+
+    def __init__(self, adapter: Optional[DataAdapter], cache: BarCache = None, offline: bool = None,
+                 source: str = None):
+        super().__init__(adapter)
+        if cache is None:
+            if source is None and adapter is not None:
+                source = source_name(adapter)
+            cache = BarCache(source=source)
+        self.cache = cache
+        config = ConfigManager()
+        if offline is None:
+            offline = config.get('data_cache.offline', False)
+        self.offline = offline or adapter is None
+        self.empty_ttl = config.get('data_cache.empty_ttl', 3600)
+
+    @property
+    def initialized(self) -> bool:
+        # 离线模式只读缓存，不依赖数据源连接
+        return self.offline or getattr(self._adapter, 'initialized', True)
+
+    def get_daily_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+        start = parse_day(start_date)
+        end = parse_day(end_date)
+        dashed = '-' in str(start_date)
+
+        if self.offline:
+            CACHE_REQUESTS.labels('offline').inc()
+        else:
+            # 当天K线可能尚未收盘，只把昨天及以前记为已覆盖
+            settled = parse_day(date.today() - timedelta(days=1))
+            gaps = self.cache.missing(stock_code, start, end)
+            if not gaps:
+                CACHE_REQUESTS.labels('hit').inc()
+            elif gaps == [(start, end)]:
+                CACHE_REQUESTS.labels('miss').inc()
+            else:
+                CACHE_REQUESTS.labels('partial').inc()
+            for gap_start, gap_end in gaps:
+                frame = self._adapter.get_daily_data(
+                    stock_code, _format_day(gap_start, dashed), _format_day(gap_end, dashed)
+                )
+                if frame is None:
+                    continue
+                if frame.empty and gap_end - gap_start >= HOLIDAY_GAP_DAYS:
+                    first = self.cache.first_day(stock_code)
+                    if first is not None and gap_end < first:
+                        # 上市前没有数据，永久记为已覆盖
+                        self.cache.mark_empty(stock_code, gap_start, gap_end)
+                    elif gap_start <= settled and self.empty_ttl:
+                        # 长期停牌或上游故障都可能返回空，只在较短时间内不再重复拉取
+                        self.cache.mark_empty(stock_code, gap_start, min(gap_end, settled), ttl=self.empty_ttl)
+                    continue
+                if gap_start > settled:
+                    if not frame.empty:
+                        # 未收盘数据不入缓存，直接与缓存结果拼接返回
+                        cached = self.cache.read(stock_code, start, end)
+                        return self._concat(cached, frame)
+                    continue
+                self.cache.write(stock_code, frame, gap_start, min(gap_end, settled))
+                logger.debug("缓存补齐 {} {} ~ {}: {} 条", stock_code,
+                             _format_day(gap_start, True), _format_day(gap_end, True), len(frame))
+
+        return self.cache.read(stock_code, start, end)
+
+    @staticmethod
+    def _concat(cached: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+        if cached.empty:
+            return fresh.reset_index(drop=True)
+        fresh = fresh.copy()
+        fresh['date'] = pd.to_datetime(fresh['date'], errors='coerce', format='mixed')
+        merged = pd.concat([cached, fresh[cached.columns.intersection(fresh.columns)]], ignore_index=True)
+        return merged.drop_duplicates('date', keep='last').reset_index(drop=True)
+
+    def get_stock_list(self):
+        if self._adapter is None:
+            raise RuntimeError("离线模式下无法获取股票列表")
+        return self._adapter.get_stock_list()
+
+    def get_realtime_data(self, stock_code: str) -> pd.DataFrame:
+        if self._adapter is None:
+            raise RuntimeError("离线模式下无法获取实时数据")
+        return self._adapter.get_realtime_data(stock_code)
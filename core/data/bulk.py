@@ -0,0 +1,207 @@
+"""
+批量行情下载 - 有界线程池、按数据源限速、失败重试
+"""
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.config_manager import ConfigManager
+from core.data.data_adapter import DataAdapter
+from utils.logger import get_logger
+
+
+logger = get_logger('批量下载')
+
+# 压缩为float32的价格类列（成交量、成交额数值较大，保留float64）
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'pre_close', 'preclose', 'change', 'pct_chg', 'pctChg')
+
+
+class RateLimiter:
+    """令牌桶限速器（线程安全）"""
+
+    def __init__(self, rate: float, burst: int = None):
+        """
+        Args:
+            rate: 每秒允许的请求数，<=0 表示不限速
+            burst: 桶容量（允许的瞬时并发请求数），默认等于 max(rate, 1)
+        """
+        self.rate = float(rate or 0)
+        self.capacity = float(burst or max(self.rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌，不足时阻塞等待"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(source: str) -> RateLimiter:
+    """获取数据源共享的限速器（按 data_source.rate_limits.<source> 配置）"""
+    with _limiters_lock:
+        limiter = _limiters.get(source)
+        if limiter is None:
+            rate = ConfigManager().get(f'data_source.rate_limits.{source}', 0)
+            limiter = _limiters[source] = RateLimiter(rate)
+        return limiter
+
+
+def source_name(adapter: DataAdapter) -> str:
+    """数据源名称（去掉代理层后的适配器类名，如 baostock）"""
+    adapter_class = getattr(adapter, 'adapter_class', None) or type(adapter)
+    return adapter_class.__name__.replace('Adapter', '').lower()
+
+
+class BulkResult:
+    """批量下载结果"""
+
+    def __init__(self, data: pd.DataFrame, succeeded: List[str], failed: Dict[str, str],
+                 empty: List[str], elapsed: float):
+        self.data = data  # 长表：date, stock_code, 各行情列
+        self.succeeded = succeeded  # 成功获取数据的股票
+        self.failed = failed  # 重试后仍失败的股票 {stock_code: 错误信息}
+        self.empty = empty  # 数据源返回空数据的股票
+        self.elapsed = elapsed
+
+    def panel(self, column: str = 'close') -> pd.DataFrame:
+        """宽表：行=日期，列=股票代码"""
+        if self.data.empty:
+            return pd.DataFrame()
+        return self.data.pivot_table(index='date', columns='stock_code', values=column,
+                                     aggfunc='last', observed=True)
+
+    def report(self) -> Dict:
+        """下载结果汇总"""
+        return {
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failed),
+            'empty': len(self.empty),
+            'rows': len(self.data),
+            'elapsed': round(self.elapsed, 3),
+            'errors': dict(self.failed)
+        }
+
+    def __repr__(self) -> str:
+        return f"BulkResult({self.report()})"
+
+
+def compact_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """压缩长表的数据类型：股票代码转为category，价格列转为float32，整数列向下转型"""
+    frame = frame.copy()
+    if 'stock_code' in frame.columns:
+        frame['stock_code'] = frame['stock_code'].astype('category')
+    for name in frame.columns:
+        series = frame[name]
+        if name in PRICE_COLUMNS and pd.api.types.is_numeric_dtype(series):
+            frame[name] = series.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(series):
+            frame[name] = pd.to_numeric(series, downcast='integer')
+    return frame
+
+
+def get_daily_data_bulk(adapter: DataAdapter, codes: List[str], start_date: str, end_date: str,
+                        max_workers: int = None, rate_limit: float = None, retries: int = None,
+                        backoff: float = None, compact: bool = True,
+                        progress: Optional[Callable[[int, int], None]] = None) -> BulkResult:
+    """
+    批量下载多只股票的日线数据
+
+    Args:
+        adapter: 数据适配器
+        codes: 股票代码列表
+        start_date: 开始日期
+        end_date: 结束日期
+        max_workers: 并发线程数，默认读取 data_bulk.max_workers（按数据源的 data_bulk.concurrency 封顶）
+        rate_limit: 每秒请求数上限，默认使用该数据源共享的限速器
+        retries: 失败重试次数，默认读取 data_bulk.retries
+        backoff: 重试退避基数（秒），第n次重试前等待约 backoff * 2^(n-1)（带随机抖动）
+        compact: 是否压缩数据类型
+        progress: 进度回调 progress(已完成数, 总数)
+
+    Returns:
+        BulkResult，部分股票失败不会中断整体下载
+    """
+    config = ConfigManager()
+    source = source_name(adapter)
+    max_workers = max_workers or config.get('data_bulk.max_workers', 8)
+    concurrency = config.get(f'data_bulk.concurrency.{source}')
+    if concurrency:
+        max_workers = min(max_workers, concurrency)
+    retries = config.get('data_bulk.retries', 3) if retries is None else retries
+    backoff = config.get('data_bulk.backoff', 0.5) if backoff is None else backoff
+    limiter = RateLimiter(rate_limit) if rate_limit is not None else get_rate_limiter(source)
+
+    codes = list(dict.fromkeys(codes))
+    frames: Dict[str, pd.DataFrame] = {}
+    failed: Dict[str, str] = {}
+    empty: List[str] = []
+    done = [0]
+    lock = threading.Lock()
+
+    def fetch(code: str):
+        error = None
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+            limiter.acquire()
+            try:
+                frame = adapter.get_daily_data(code, start_date, end_date)
+                break
+            except Exception as e:
+                error = e
+                logger.debug("下载 {} 失败（第 {} 次）: {}", code, attempt + 1, e)
+        else:
+            frame = None
+        with lock:
+            if frame is None:
+                failed[code] = str(error)
+            elif frame.empty:
+                empty.append(code)
+            else:
+                frames[code] = frame
+            done[0] += 1
+            if progress is not None:
+                progress(done[0], len(codes))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(codes) or 1))) as executor:
+        list(executor.map(fetch, codes))
+    elapsed = time.perf_counter() - start
+
+    parts = []
+    succeeded = [code for code in codes if code in frames]
+    for code in succeeded:
+        frame = frames[code].copy()
+        frame['stock_code'] = code
+        if 'date' in frame.columns:
+            frame['date'] = pd.to_datetime(frame['date'], errors='coerce', format='mixed')
+        parts.append(frame)
+    data = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    if compact and not data.empty:
+        data = compact_frame(data)
+
+    if failed:
+        logger.warning("批量下载完成，{} 只股票失败: {}", len(failed), list(failed)[:10])
+    logger.info("批量下载 {} 只股票，成功 {}，空数据 {}，失败 {}，耗时 {:.1f}s",
+                len(codes), len(frames), len(empty), len(failed), elapsed)
+    return BulkResult(data, succeeded, failed, empty, elapsed)
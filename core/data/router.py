@@ -0,0 +1,383 @@
+"""
+数据源路由 - 按延迟选择数据源，熔断故障数据源，可选对冲请求
+"""
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from core.config_manager import ConfigManager
+from core.data.data_adapter import DataAdapter
+from core.data.adapter_proxy import AdapterProxy
+from utils.logger import get_logger
+from utils.metrics import REGISTRY, Counter, Histogram
+
+
+logger = get_logger('数据源路由')
+
+# 用于试探的调用：股票列表请求很重，不重复发给备用数据源
+_EXPLORE_METHODS = ('get_daily_data', 'get_realtime_data')
+
+def is_invalid_argument(error: BaseException) -> bool:
+    """
+    异常是否由请求参数引起（股票代码、日期格式无效等）
+
+    这类错误换数据源也不会成功，不计入数据源的熔断和成功率，也不触发故障转移。
+    上游返回无法解析的内容（JSON/编码错误）虽然也是 ValueError，仍算数据源故障。
+    """
+    return isinstance(error, (ValueError, TypeError)) and not isinstance(error, (json.JSONDecodeError, UnicodeError))
+
+
+DATA_SOURCE_REQUESTS = Counter('quant_data_source_requests_total', '数据源调用次数',
+                               ('source', 'method', 'outcome'), REGISTRY)
+DATA_SOURCE_SECONDS = Histogram('quant_data_source_request_seconds', '数据源调用耗时（秒）',
+                                ('source', 'method'), REGISTRY)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒内不再放行请求；
+    之后进入半开状态放行一次试探请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """是否可以尝试（不占用半开状态的试探名额）"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return self.state == self.CLOSED or not self._probing
+
+    def allow(self) -> bool:
+        """是否放行请求（半开状态下只放行一次试探请求）"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_ignored(self):
+        """调用结果不反映数据源健康（如参数无效）：不改变状态，只归还半开状态的试探名额"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class SourceStats:
+    """单个数据源最近 window 次调用的成功率和延迟分位数"""
+
+    def __init__(self, window: int = 200):
+        self._latencies = deque(maxlen=window)  # 成功调用的耗时（秒）
+        self._outcomes = deque(maxlen=window)  # 最近调用是否成功
+        self.calls = 0
+        self.errors = 0
+        self.last_call = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.calls += 1
+            self.last_call = time.monotonic()
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(latency)
+            else:
+                self.errors += 1
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._latencies:
+                return None
+            return float(np.percentile(np.fromiter(self._latencies, dtype=float), q))
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        with self._lock:
+            if not self._outcomes:
+                return None
+            return sum(self._outcomes) / len(self._outcomes)
+
+    def snapshot(self) -> Dict:
+        def ms(value):
+            return None if value is None else round(value * 1000, 1)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'success_rate': self.success_rate,
+            'p50_ms': ms(self.percentile(50)),
+            'p95_ms': ms(self.percentile(95)),
+            'p99_ms': ms(self.percentile(99))
+        }
+
+
+class DataSourceRouter(AdapterProxy):
+    """
+    数据源路由（代理模式）
+
+    每次调用（而不仅是创建适配器时）按数据源的健康状况和延迟选择数据源：
+    - 熔断打开的数据源被跳过；当前数据源失败时依次尝试下一个
+    - 参数无效引起的异常（见 is_invalid_argument）直接抛出，不切换数据源，也不计入统计和熔断
+    - 有足够样本的数据源按延迟中位数排序，样本不足的按配置顺序排在其后
+    - 开启对冲时，首选数据源超过对冲延迟仍未返回，则同时向下一个数据源发起请求，取先成功的结果
+    - 配置 explore_interval 后，样本不足或超过该间隔未被使用的数据源，在后台用当前的日线/实时行情请求
+      试探一次，使较快的备用数据源和熔断恢复的数据源能重新参与排序（试探结果丢弃）。
+      每个数据源每个间隔最多试探一次，未初始化（如缺少token）的数据源不试探
+    """
+
+    def __init__(self, adapters: Dict[str, Callable[[], DataAdapter]], hedge: bool = None,
+                 hedge_delay: float = None):
+        """
+        Args:
+            adapters: 数据源名称 -> 适配器构造函数（按优先顺序，首次使用时才创建）
+            hedge: 是否启用对冲请求，默认读取 data_router.hedge
+            hedge_delay: 对冲延迟（秒），默认读取 data_router.hedge_delay_ms，未配置时使用首选数据源的p95延迟
+        """
+        config = ConfigManager()
+        self.order = list(adapters)
+        self._builders = dict(adapters)
+        self._adapters: Dict[str, DataAdapter] = {}
+        self.breakers = {
+            name: CircuitBreaker(config.get('data_router.failure_threshold', 5),
+                                 config.get('data_router.reset_timeout', 30))
+            for name in self.order
+        }
+        self.stats = {name: SourceStats(config.get('data_router.window', 200)) for name in self.order}
+        self.min_samples = config.get('data_router.min_samples', 5)
+        self.hedge = config.get('data_router.hedge', False) if hedge is None else hedge
+        if hedge_delay is None:
+            delay_ms = config.get('data_router.hedge_delay_ms')
+            hedge_delay = delay_ms / 1000 if delay_ms else None
+        self.hedge_delay = hedge_delay
+        self.hedged = 0  # 发起对冲请求的次数
+        self.explore_interval = config.get('data_router.explore_interval', 0)
+        self.explored = 0  # 后台试探的次数
+        self._exploring = set()
+        self._probed: Dict[str, float] = {}  # 各数据源最近一次试探的时间
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=config.get('data_router.hedge_workers', 4),
+                                            thread_name_prefix='hedge')
+
+    def adapter(self, name: str) -> DataAdapter:
+        """获取（必要时创建）指定数据源的适配器"""
+        adapter = self._adapters.get(name)
+        if adapter is None:
+            with self._lock:
+                adapter = self._adapters.get(name)
+                if adapter is None:
+                    adapter = self._adapters[name] = self._builders[name]()
+        return adapter
+
+    def ranked(self) -> List[str]:
+        """当前可用的数据源（按优先级排序，熔断打开的不包含在内）"""
+        def key(item):
+            index, name = item
+            stats = self.stats[name]
+            if stats.samples >= self.min_samples:
+                return 0, stats.percentile(50), index
+            return 1, 0.0, index
+        candidates = sorted(enumerate(self.order), key=key)
+        return [name for _, name in candidates if self.breakers[name].available()]
+
+    @property
+    def _adapter(self) -> DataAdapter:
+        # get_stock_name等扩展方法/属性透传给当前首选数据源
+        ranked = self.ranked() or self.order
+        return self.adapter(ranked[0])
+
+    @property
+    def inner(self) -> DataAdapter:
+        return self._adapter
+
+    @property
+    def source_key(self) -> 'DataSourceRouter':
+        # 每次调用才选择数据源，经由同一路由的请求视为同一来源
+        return self
+
+    def _invoke(self, name: str, method: str, args: tuple):
+        """调用指定数据源并记录耗时和结果"""
+        start = time.perf_counter()
+        try:
+            adapter = self.adapter(name)
+            if not getattr(adapter, 'initialized', True):
+                raise ConnectionError(getattr(adapter, 'error_message', None) or f"{name}数据源未初始化")
+            result = getattr(adapter, method)(*args)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            if is_invalid_argument(e):
+                self.breakers[name].record_ignored()
+                DATA_SOURCE_REQUESTS.labels(name, method, 'invalid').inc()
+                raise
+            self.stats[name].record(elapsed, False)
+            self.breakers[name].record_failure()
+            DATA_SOURCE_REQUESTS.labels(name, method, 'error').inc()
+            DATA_SOURCE_SECONDS.labels(name, method).observe(elapsed)
+            raise
+        elapsed = time.perf_counter() - start
+        self.stats[name].record(elapsed, True)
+        self.breakers[name].record_success()
+        DATA_SOURCE_REQUESTS.labels(name, method, 'ok').inc()
+        DATA_SOURCE_SECONDS.labels(name, method).observe(elapsed)
+        return result
+
+    def _next(self, candidates: deque) -> Optional[str]:
+        """取出下一个熔断器放行的数据源"""
+        while candidates:
+            name = candidates.popleft()
+            if self.breakers[name].allow():
+                return name
+        return None
+
+    def _explore(self, primary: str, method: str, args: tuple):
+        """在后台试探统计信息缺失或过期的其他数据源"""
+        if not self.explore_interval or self.explore_interval < 0 or method not in _EXPLORE_METHODS:
+            return
+        now = time.monotonic()
+        for name in self.order:
+            stats = self.stats[name]
+            if name == primary or name in self._exploring or (
+                    stats.samples >= self.min_samples and now - stats.last_call < self.explore_interval) \
+                    or not self._probe_due(name, now):
+                continue
+            adapter = self._adapters.get(name)
+            if adapter is not None and not getattr(adapter, 'initialized', True):
+                continue
+            with self._lock:
+                if name in self._exploring or not self._probe_due(name, now) \
+                        or not self.breakers[name].allow():
+                    continue
+                self._exploring.add(name)
+                self._probed[name] = now
+            self.explored += 1
+            self._executor.submit(self._probe, name, method, args)
+
+    def _probe_due(self, name: str, now: float) -> bool:
+        last = self._probed.get(name)
+        return last is None or now - last >= self.explore_interval
+
+    def _probe(self, name: str, method: str, args: tuple):
+        try:
+            self._invoke(name, method, args)
+        except Exception as e:
+            logger.debug("试探数据源 {} 失败: {}", name, e)
+        finally:
+            with self._lock:
+                self._exploring.discard(name)
+
+    def _route(self, method: str, *args):
+        candidates = deque(self.ranked())
+        if candidates:
+            self._explore(candidates[0], method, args)
+        last_error = None
+        while True:
+            name = self._next(candidates)
+            if name is None:
+                break
+            delay = self._hedge_delay(name) if candidates else None
+            if delay is None:
+                try:
+                    return self._invoke(name, method, args)
+                except Exception as e:
+                    if is_invalid_argument(e):
+                        raise
+                    last_error = e
+                    logger.warning("数据源 {} 调用 {} 失败，尝试下一个: {}", name, method, e)
+                    continue
+
+            primary = self._executor.submit(self._invoke, name, method, args)
+            futures = {primary: name}
+            done, _ = wait([primary], timeout=delay)
+            if not done:
+                backup = self._next(candidates)
+                if backup is not None:
+                    self.hedged += 1
+                    logger.debug("数据源 {} 超过 {:.0f}ms 未返回，对冲请求 {}", name, delay * 1000, backup)
+                    futures[self._executor.submit(self._invoke, backup, method, args)] = backup
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        # 较慢的请求继续在后台完成，只用于更新统计
+                        return future.result()
+                    last_error = future.exception()
+                    if is_invalid_argument(last_error):
+                        raise last_error
+                    logger.warning("数据源 {} 调用 {} 失败: {}", futures[future], method, last_error)
+
+        if last_error is None:
+            raise ConnectionError("所有数据源均已熔断，请稍后再试")
+        raise ConnectionError(f"所有数据源调用失败: {last_error}") from last_error
+
+    def _hedge_delay(self, name: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if self.stats[name].samples >= self.min_samples:
+            return self.stats[name].percentile(95)
+        return None
+
+    def get_stock_list(self):
+        return self._route('get_stock_list')
+
+    def get_daily_data(self, stock_code: str, start_date: str, end_date: str):
+        return self._route('get_daily_data', stock_code, start_date, end_date)
+
+    def get_realtime_data(self, stock_code: str):
+        return self._route('get_realtime_data', stock_code)
+
+    def snapshot(self) -> Dict:
+        """各数据源的路由统计"""
+        return {
+            'order': self.ranked(),
+            'hedge': self.hedge,
+            'hedged': self.hedged,
+            'explored': self.explored,
+            'sources': {
+                name: dict(self.stats[name].snapshot(), circuit=self.breakers[name].state)
+                for name in self.order
+            }
+        }
+
+    def __repr__(self) -> str:
+        return f"DataSourceRouter({self.order})"
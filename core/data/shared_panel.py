@@ -0,0 +1,363 @@
+"""
+共享行情面板 - 多只股票的日线数据在主进程中只加载一次，工作进程按股票/日期区间零拷贝读取
+"""
+import os
+import sys
+import uuid
+import tempfile
+import threading
+import weakref
+from collections import namedtuple
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from core.config_manager import ConfigManager
+from core.calendar.trading_calendar import ensure_datetime, to_day
+from utils.logger import get_logger
+
+
+logger = get_logger('共享行情')
+
+BACKENDS = ('shm', 'mmap')
+
+_ALIGN = 64  # 每列起始地址按缓存行对齐
+_PREFIX = 'quant_panel_'
+
+# 面板句柄：工作进程据此映射同一块内存（只含元数据，可低成本pickle）
+# columns: ((列名, dtype字符串, 字节偏移), ...)，offsets: 各股票在行序列中的起始行（长度为股票数+1）
+PanelHandle = namedtuple('PanelHandle', ['name', 'backend', 'size', 'rows', 'columns', 'codes', 'offsets'])
+
+
+def _release(segment, backend: str, name: str, owner: bool):
+    """解除映射；创建者同时删除共享内存段/映射文件（weakref.finalize 在回收或进程退出时调用）"""
+    if backend == 'shm':
+        try:
+            segment.close()
+        except BufferError:
+            # 仍有视图引用时无法解除映射，unlink后内存在最后一个映射释放时回收
+            pass
+        if owner:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+    else:
+        try:
+            segment._mmap.close()
+        except (AttributeError, BufferError, ValueError):
+            pass
+        if owner:
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+
+def _open_shm(name: str, size: int = 0, create: bool = False):
+    from multiprocessing import shared_memory
+    if create:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    if sys.version_info >= (3, 13):
+        # 只读挂载的进程不登记到resource_tracker，避免其退出时删除创建者的内存段
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _mmap_dir() -> Path:
+    path = ConfigManager().get('shared_data.path') or tempfile.gettempdir()
+    return Path(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_stale(directory: Union[str, Path] = None) -> int:
+    """
+    删除创建进程已不存在的映射文件，返回删除的文件数
+
+    共享内存段在创建进程异常退出后由 multiprocessing 的 resource_tracker 回收；
+    映射文件没有这样的守护进程，文件名中记录了创建进程号，创建新面板前清理一次。
+    """
+    directory = Path(directory) if directory is not None else _mmap_dir()
+    removed = 0
+    for path in directory.glob(f'{_PREFIX}*.bin'):
+        try:
+            pid = int(path.stem[len(_PREFIX):].split('_')[0])
+        except ValueError:
+            continue
+        if pid != os.getpid() and not _pid_alive(pid):
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+    if removed:
+        logger.info("清理残留的共享行情文件 {} 个: {}", removed, directory)
+    return removed
+
+
+class SharedPanel:
+    """
+    共享行情面板
+
+    多只股票的长表按 (股票代码, 日期) 排序后逐列连续存放在一块共享内存
+    （multiprocessing.shared_memory，或 backend='mmap' 时为内存映射文件）中：
+    - 主进程 create 一次写入数据，把 handle（只含列布局和股票行偏移）传给工作进程
+    - 工作进程 attach 映射同一块内存，columns/frame 按股票和日期区间返回只读的NumPy视图，
+      不复制、不反序列化，所有进程共用一份物理内存
+    - 日期列存为 datetime64[ns]，数值列保留原始dtype（如 compact_frame 压缩后的float32），
+      非数值列（股票代码以外）不放入面板
+
+    清理：创建者 close（或离开with块、对象回收、进程正常退出）时删除内存段。工作进程只挂载不拥有，
+    崩溃不会泄漏；创建进程异常退出时，共享内存段由 resource_tracker 回收，
+    映射文件在下次创建面板时由 sweep_stale 清理。
+    """
+
+    _attached: Dict[str, 'SharedPanel'] = {}  # 本进程已挂载的面板（按名称复用）
+    _attached_lock = threading.Lock()
+
+    def __init__(self, handle: PanelHandle, segment, owner: bool):
+        self.handle = handle
+        self.owner = owner
+        buffer = segment.buf if handle.backend == 'shm' else segment
+        self._arrays: Dict[str, np.ndarray] = {}
+        for name, dtype, offset in handle.columns:
+            array = np.ndarray((handle.rows,), dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+            array.flags.writeable = False
+            self._arrays[name] = array
+        self._index = {
+            code: (handle.offsets[k], handle.offsets[k + 1]) for k, code in enumerate(handle.codes)
+        }
+        self._finalizer = weakref.finalize(self, _release, segment, handle.backend, handle.name, owner)
+
+    @classmethod
+    def create(cls, data: Union[pd.DataFrame, Dict[str, pd.DataFrame]], columns: Sequence[str] = None,
+               backend: str = None) -> 'SharedPanel':
+        """
+        把行情写入新的共享内存面板
+
+        Args:
+            data: 含 stock_code 列的长表，或 {股票代码: DataFrame}
+            columns: 放入面板的列，默认为全部股票都有的日期/数值列
+            backend: 'shm'=共享内存，'mmap'=内存映射文件，默认读取 shared_data.backend
+        """
+        backend = backend or ConfigManager().get('shared_data.backend', 'shm')
+        if backend not in BACKENDS:
+            raise ValueError(f"不支持的共享行情后端: {backend}")
+
+        frames = _split(data)
+        if not frames:
+            raise ValueError("数据为空，无法创建共享行情面板")
+        layout = _layout(frames, columns)
+        codes = tuple(frames)
+        lengths = [len(frame) for frame in frames.values()]
+        offsets = tuple(int(x) for x in np.concatenate(([0], np.cumsum(lengths))))
+        rows = offsets[-1]
+
+        column_offsets = []
+        size = 0
+        for name, dtype in layout:
+            size = -(-size // _ALIGN) * _ALIGN
+            column_offsets.append((name, dtype.str, size))
+            size += dtype.itemsize * rows
+        size = max(size, 1)
+
+        token = f"{_PREFIX}{os.getpid()}_{uuid.uuid4().hex[:12]}"
+        if backend == 'shm':
+            segment = _open_shm(token, size, create=True)
+            name = segment.name
+            buffer = segment.buf
+        else:
+            directory = _mmap_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            sweep_stale(directory)
+            name = str(directory / f"{token}.bin")
+            segment = np.memmap(name, dtype=np.uint8, mode='w+', shape=(size,))
+            buffer = segment
+
+        try:
+            for (column, dtype), (_, _, offset) in zip(layout, column_offsets):
+                target = np.ndarray((rows,), dtype=dtype, buffer=buffer, offset=offset)
+                for frame, start, end in zip(frames.values(), offsets[:-1], offsets[1:]):
+                    target[start:end] = frame[column].to_numpy(dtype=dtype)
+                del target
+            if backend == 'mmap':
+                segment.flush()
+        except BaseException:
+            _release(segment, backend, name, True)
+            raise
+
+        handle = PanelHandle(name, backend, size, rows, tuple(column_offsets), codes, offsets)
+        logger.info("创建共享行情面板: {} 只股票，{} 行，{} 列，{:.1f} MB ({})",
+                    len(codes), rows, len(layout), size / 1024 / 1024, backend)
+        return cls(handle, segment, owner=True)
+
+    @classmethod
+    def attach(cls, handle: Union[PanelHandle, 'SharedPanel']) -> 'SharedPanel':
+        """按句柄挂载已有面板（同一进程内重复挂载返回同一对象）"""
+        if isinstance(handle, SharedPanel):
+            return handle
+        with cls._attached_lock:
+            panel = cls._attached.get(handle.name)
+            if panel is None:
+                if handle.backend == 'shm':
+                    segment = _open_shm(handle.name)
+                else:
+                    segment = np.memmap(handle.name, dtype=np.uint8, mode='r', shape=(handle.size,))
+                panel = cls._attached[handle.name] = cls(handle, segment, owner=False)
+            return panel
+
+    @property
+    def codes(self) -> List[str]:
+        return list(self.handle.codes)
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._arrays)
+
+    @property
+    def nbytes(self) -> int:
+        return self.handle.size
+
+    def __len__(self) -> int:
+        return self.handle.rows
+
+    def __contains__(self, stock_code: str) -> bool:
+        return stock_code in self._index
+
+    def _rows(self, stock_code: str, start_date=None, end_date=None) -> slice:
+        """股票在 [start_date, end_date] 内的行区间"""
+        if stock_code not in self._index:
+            raise KeyError(f"共享行情面板中没有该股票: {stock_code}")
+        lo, hi = self._index[stock_code]
+        if start_date is None and end_date is None:
+            return slice(lo, hi)
+        if 'date' not in self._arrays:
+            raise ValueError("共享行情面板没有date列，无法按日期切片")
+        dates = self._arrays['date'][lo:hi]
+        first, last = 0, hi - lo
+        if start_date is not None:
+            first = int(np.searchsorted(dates, _bound(start_date, 0), 'left'))
+        if end_date is not None:
+            last = int(np.searchsorted(dates, _bound(end_date, 1), 'left'))
+        return slice(lo + first, lo + max(first, last))
+
+    def columns(self, stock_code: str, start_date=None, end_date=None,
+                columns: Sequence[str] = None) -> Dict[str, np.ndarray]:
+        """{列名: 只读视图}，日期区间两端均包含"""
+        rows = self._rows(stock_code, start_date, end_date)
+        names = columns or self._arrays
+        return {name: self._arrays[name][rows] for name in names}
+
+    def frame(self, stock_code: str, start_date=None, end_date=None,
+              columns: Sequence[str] = None) -> pd.DataFrame:
+        """
+        单只股票的DataFrame，各列直接引用共享内存（只读）
+
+        可以新增列，原地修改已有列的值会抛出 ValueError，需要修改时先 copy()。
+        """
+        frame = pd.DataFrame(self.columns(stock_code, start_date, end_date, columns), copy=False)
+        frame['stock_code'] = stock_code
+        return frame
+
+    def frames(self, start_date=None, end_date=None) -> Dict[str, pd.DataFrame]:
+        """全部股票的 {股票代码: DataFrame}"""
+        return {code: self.frame(code, start_date, end_date) for code in self.handle.codes}
+
+    def close(self):
+        """解除映射；创建者同时删除共享内存（之后本对象的视图不可再使用）"""
+        with SharedPanel._attached_lock:
+            if SharedPanel._attached.get(self.handle.name) is self:
+                del SharedPanel._attached[self.handle.name]
+        self._arrays = {}
+        self._finalizer()
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def __enter__(self) -> 'SharedPanel':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getstate__(self):
+        raise TypeError("SharedPanel 不能直接pickle，请传递 panel.handle 并在工作进程中 SharedPanel.attach")
+
+    def __repr__(self) -> str:
+        return (f"SharedPanel({len(self.handle.codes)} codes, {self.handle.rows} rows, "
+                f"{self.nbytes / 1024 / 1024:.1f} MB, {self.handle.backend})")
+
+
+def _bound(value, shift: int) -> np.datetime64:
+    """日期区间端点（shift=1 时为次日零点，用于包含结束日）"""
+    day = to_day(value)
+    if day is None:
+        raise ValueError(f"无法解析日期: {value}")
+    return np.datetime64(day + shift, 'D').astype('datetime64[ns]')
+
+
+def _split(data: Union[pd.DataFrame, Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    """拆分为 {股票代码: 按日期升序的DataFrame}，跳过空表"""
+    if isinstance(data, pd.DataFrame):
+        if 'stock_code' not in data.columns:
+            raise ValueError("长表必须包含 stock_code 列")
+        groups = data.groupby('stock_code', sort=False, observed=True)
+        data = {str(code): frame for code, frame in groups}
+    frames = {}
+    for code, frame in data.items():
+        if frame is None or frame.empty:
+            continue
+        if 'date' in frame.columns:
+            if not pd.api.types.is_datetime64_any_dtype(frame['date']):
+                frame = ensure_datetime(frame.copy())
+            if not frame['date'].is_monotonic_increasing:
+                frame = frame.sort_values('date', kind='stable')
+        frames[str(code)] = frame
+    return frames
+
+
+def _layout(frames: Dict[str, pd.DataFrame], columns: Optional[Sequence[str]]) -> List[tuple]:
+    """[(列名, dtype)]：日期列为datetime64[ns]，数值列取各股票dtype的公共类型"""
+    schemas = [dict(frame.dtypes) for frame in frames.values()]
+    if columns is None:
+        columns = [name for name in schemas[0] if name != 'stock_code' and all(name in schema for schema in schemas)]
+    layout = []
+    dropped = []
+    for name in columns:
+        dtypes = [schema[name] for schema in schemas]
+        if name == 'date' or all(pd.api.types.is_datetime64_any_dtype(dtype) for dtype in dtypes):
+            layout.append((name, np.dtype('datetime64[ns]')))
+        elif all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+            layout.append((name, np.result_type(*(d if isinstance(d, np.dtype) else np.float64 for d in dtypes))))
+        else:
+            dropped.append(name)
+    if dropped:
+        logger.warning("共享行情面板只保存日期和数值列，已丢弃 {} 列: {}", len(dropped), ', '.join(dropped))
+    return layout
+
+
+def share_frames(data: Dict[str, pd.DataFrame]) -> Optional[SharedPanel]:
+    """
+    按 shared_data.enabled 把进程池要用的行情写入共享面板
+
+    未启用或创建失败（如 /dev/shm 空间不足）时返回None，调用方退回到把数据pickle给每个工作进程。
+    """
+    if not ConfigManager().get('shared_data.enabled', True):
+        return None
+    try:
+        return SharedPanel.create(data)
+    except (OSError, ValueError) as e:
+        logger.warning("创建共享行情面板失败，改为向每个工作进程复制数据: {}", e)
+        return None
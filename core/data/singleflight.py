@@ -0,0 +1,148 @@
+"""
+请求合并（singleflight）- 并发的相同/重叠数据请求共享一次上游调用
+"""
+import threading
+from typing import Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.data.data_adapter import DataAdapter
+from core.data.adapter_proxy import AdapterProxy
+from core.data.bar_cache import parse_day
+from utils.logger import get_logger
+
+
+logger = get_logger('请求合并')
+
+
+class _Call:
+    """一次进行中的上游调用"""
+
+    __slots__ = ('start', 'end', 'event', 'result', 'error', 'waiters')
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    请求合并组
+
+    同一key下，若已有进行中的调用覆盖了请求区间 [start, end]，则等待并共享其结果，
+    否则由当前线程发起调用。调用结束后立即移除，不缓存结果。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, List[_Call]] = {}
+        self.leaders = 0  # 实际发起的上游调用数
+        self.shared = 0  # 共享进行中调用的请求数
+
+    def do(self, key: Hashable, fn: Callable, start=None, end=None):
+        """
+        执行（或加入）一次调用
+
+        Returns:
+            (调用对象（结果在 result 中）, 是否共享了其他线程发起的调用)
+        """
+        with self._lock:
+            call = None
+            for candidate in self._calls.get(key, ()):
+                if self._covers(candidate, start, end) and (
+                        call is None or self._width(candidate) < self._width(call)):
+                    call = candidate
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call(start, end)
+                self._calls.setdefault(key, []).append(call)
+                self.leaders += 1
+                leader = True
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    calls = self._calls[key]
+                    calls.remove(call)
+                    if not calls:
+                        del self._calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call, not leader
+
+    @staticmethod
+    def _covers(call: _Call, start, end) -> bool:
+        if call.start is None or start is None:
+            return call.start == start and call.end == end
+        return call.start <= start and end <= call.end
+
+    @staticmethod
+    def _width(call: _Call):
+        return 0 if call.start is None else call.end - call.start
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = sum(len(calls) for calls in self._calls.values())
+        return {'leaders': self.leaders, 'shared': self.shared, 'in_flight': in_flight}
+
+
+# 所有适配器实例共享的合并组：key 包含数据源标识（source_key），不同请求各自创建的适配器栈
+# 只要访问同一路由/连接池就能合并，不同数据源的请求互不合并
+_default_group = SingleFlight()
+
+
+class CoalescingDataAdapter(AdapterProxy):
+    """
+    请求合并的数据适配器（代理模式）
+
+    并发请求同一数据源、同一股票的日线数据时，若已有进行中的请求覆盖了所需日期区间，
+    直接等待该请求并从结果中切出所需区间，不再单独访问数据源。
+    每个调用方拿到的都是独立的DataFrame副本，可以放心修改。
+    """
+
+    def __init__(self, adapter: DataAdapter, group: SingleFlight = None):
+        super().__init__(adapter)
+        self.group = group or _default_group
+        self._source = adapter.source_key if isinstance(adapter, AdapterProxy) else adapter
+
+    def get_daily_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+        try:
+            start, end = parse_day(start_date), parse_day(end_date)
+        except (ValueError, TypeError):
+            # 无法解析的日期只合并完全相同的请求
+            start, end = None, None
+            key = (self._source, stock_code, str(start_date), str(end_date))
+        else:
+            key = (self._source, stock_code)
+
+        call, shared = self.group.do(
+            key,
+            lambda: self._adapter.get_daily_data(stock_code, start_date, end_date),
+            start, end
+        )
+        frame = call.result
+        if frame is None:
+            return frame
+        if shared and start is not None and (call.start, call.end) != (start, end) \
+                and not frame.empty and 'date' in frame.columns:
+            logger.debug("合并请求 {} {} ~ {}", stock_code, start_date, end_date)
+            days = pd.to_datetime(frame['date'], errors='coerce', format='mixed') \
+                .to_numpy(dtype='datetime64[D]').astype(np.int64)
+            return frame[(days >= start) & (days <= end)].reset_index(drop=True)
+        return frame.copy()
@@ -0,0 +1,132 @@
+"""
+模拟数据适配器 - 离线生成可复现的行情（也可读取本地CSV），用于基准测试和无网络环境
+"""
+import zlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.config_manager import ConfigManager
+from core.data.data_adapter import DataAdapter
+
+
+class SyntheticAdapter(DataAdapter):
+    """
+    模拟数据适配器
+
+    - 每只股票的行情由 (seed, 股票代码) 决定，从 epoch 起按交易日（工作日）生成，
+      同一日期的行情与请求的日期区间无关，多次请求、分段请求结果一致
+    - 对数价格为围绕 10 元均值回归的AR(1)过程，序列再长价格也不会漂移到0或无穷大
+    - 配置了 csv_dir 且存在 <股票代码>.csv 时，直接读取该文件（至少包含 date, close 列）
+    """
+
+    PHI = 0.998  # 对数价格的自回归系数
+    MAX_CACHED = 256  # 缓存已生成行情的股票数
+
+    def __init__(self, seed: int = None, universe: int = None, csv_dir: str = None,
+                 epoch: str = None, volatility: float = None):
+        """
+        Args:
+            seed: 随机种子，默认读取 data_source.synthetic.seed
+            universe: 股票池大小，默认读取 data_source.synthetic.universe
+            csv_dir: CSV行情目录，默认读取 data_source.synthetic.csv_dir（为空则全部模拟生成）
+            epoch: 模拟行情的起始日期，默认读取 data_source.synthetic.epoch
+            volatility: 日收益率标准差，默认读取 data_source.synthetic.volatility
+        """
+        config = ConfigManager()
+        self.seed = config.get('data_source.synthetic.seed', 42) if seed is None else seed
+        self.universe = universe or config.get('data_source.synthetic.universe', 100)
+        csv_dir = config.get('data_source.synthetic.csv_dir', '') if csv_dir is None else csv_dir
+        self.csv_dir = Path(csv_dir) if csv_dir else None
+        self.epoch = pd.Timestamp(epoch or config.get('data_source.synthetic.epoch', '1990-12-19'))
+        self.volatility = volatility or config.get('data_source.synthetic.volatility', 0.02)
+        self.initialized = True
+        self.error_message = None
+        self._frames: 'OrderedDict[str, tuple]' = OrderedDict()  # 股票代码 -> (生成截止日期, 行情)
+        self._lock = threading.Lock()
+
+    def get_stock_list(self) -> List[str]:
+        if self.csv_dir is not None and self.csv_dir.is_dir():
+            codes = sorted(path.stem for path in self.csv_dir.glob('*.csv'))
+            if codes:
+                return codes
+        return [f"{600000 + i:06d}" for i in range(self.universe)]
+
+    def get_daily_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        frame = self._read_csv(stock_code)
+        if frame is None:
+            frame = self._generated(stock_code, end)
+        mask = (frame['date'] >= start) & (frame['date'] <= end)
+        return frame[mask].reset_index(drop=True)
+
+    def get_realtime_data(self, stock_code: str) -> pd.DataFrame:
+        frame = self._read_csv(stock_code)
+        if frame is None:
+            frame = self.generate(stock_code, pd.Timestamp.now().normalize())
+        return frame.tail(1).reset_index(drop=True)
+
+    def get_stock_name(self, stock_code: str) -> Optional[str]:
+        return f"模拟{stock_code}"
+
+    def _generated(self, stock_code: str, end: pd.Timestamp) -> pd.DataFrame:
+        """已生成的行情覆盖 end 时直接复用，否则重新生成（结果与直接生成一致）"""
+        with self._lock:
+            cached = self._frames.get(stock_code)
+            if cached is not None:
+                self._frames.move_to_end(stock_code)
+        if cached is not None and cached[0] >= end:
+            return cached[1]
+        frame = self.generate(stock_code, end)
+        with self._lock:
+            self._frames[stock_code] = (end, frame)
+            while len(self._frames) > self.MAX_CACHED:
+                self._frames.popitem(last=False)
+        return frame
+
+    def generate(self, stock_code: str, end: pd.Timestamp) -> pd.DataFrame:
+        """生成从 epoch 到 end 的完整日线（OHLCV）"""
+        days = np.arange(self.epoch.to_datetime64().astype('datetime64[D]'),
+                         np.datetime64(end.date(), 'D') + 1)
+        dates = days[np.is_busday(days)]
+        n = len(dates)
+        key = zlib.crc32(str(stock_code).encode())
+        # 各列使用独立的随机数流，保证每个日期的行情只由其位置决定，与 end 无关
+        streams = [np.random.default_rng([self.seed, key, i]) for i in range(5)]
+        returns = streams[0].normal(0, self.volatility, n)
+        gaps = streams[1].normal(0, self.volatility / 4, n)
+        upper = np.abs(streams[2].normal(0, self.volatility / 2, n))
+        lower = np.abs(streams[3].normal(0, self.volatility / 2, n))
+        volume = np.round(streams[4].lognormal(13, 0.5, n), -2)
+
+        # x[t] = PHI * x[t-1] + returns[t]，用ewm(adjust=False)的递推实现
+        log_price = pd.Series(np.concatenate(([0.0], returns / (1 - self.PHI)))) \
+            .ewm(alpha=1 - self.PHI, adjust=False).mean().to_numpy()[1:]
+        close = 10 * np.exp(log_price)
+        pre_close = np.concatenate(([10.0], close[:-1]))
+        open_ = pre_close * (1 + gaps)
+        high = np.maximum(open_, close) * (1 + upper)
+        low = np.minimum(open_, close) * (1 - lower)
+        return pd.DataFrame({
+            'date': dates.astype('datetime64[ns]'),
+            'open': open_.round(2),
+            'high': high.round(2),
+            'low': low.round(2),
+            'close': close.round(2),
+            'volume': volume,
+            'amount': (volume * close).round(2)
+        })
+
+    def _read_csv(self, stock_code: str) -> Optional[pd.DataFrame]:
+        if self.csv_dir is None:
+            return None
+        path = self.csv_dir / f"{stock_code}.csv"
+        if not path.exists():
+            return None
+        frame = pd.read_csv(path, dtype={'stock_code': str})
+        frame['date'] = pd.to_datetime(frame['date'], format='mixed')
+        return frame.sort_values('date').reset_index(drop=True)
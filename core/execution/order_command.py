@@ -2,10 +2,15 @@
 订单命令 - 命令模式
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from datetime import datetime
 from enum import Enum
 
+from utils.logger import get_logger
+
+
+logger = get_logger('订单执行')
+
 
 class OrderType(Enum):
     """订单类型"""
@@ -24,7 +29,10 @@ class OrderStatus(Enum):
 class OrderCommand(ABC):
     """订单命令基类（命令模式）"""
     
-    def __init__(self, stock_code: str, shares: int, order_type: OrderType = OrderType.MARKET):
+    action = None  # buy / sell
+    
+    def __init__(self, stock_code: str, shares: int, order_type: OrderType = OrderType.MARKET,
+                 price_source: Optional[Callable[[str], Optional[float]]] = None):
         self.stock_code = stock_code
         self.shares = shares
         self.order_type = order_type
@@ -32,6 +40,8 @@ class OrderCommand(ABC):
         self.created_at = datetime.now()
         self.executed_at = None
         self.price = None
+        # 成交价来源 price_source(stock_code)，未指定时查询数据源实时行情（模拟盘可传入最新K线价格）
+        self.price_source = price_source
     
     @abstractmethod
     def execute(self) -> bool:
@@ -43,10 +53,46 @@ class OrderCommand(ABC):
         """撤销订单"""
         pass
     
+    def _market_price(self) -> Optional[float]:
+        """当前市场价格，无行情时返回None"""
+        if self.price_source is not None:
+            return self.price_source(self.stock_code)
+        
+        # 这里应该调用实际的交易接口
+        # 示例：模拟执行
+        from core.factory.data_factory import DataFactory
+        
+        adapter = DataFactory.create_adapter()
+        data = adapter.get_realtime_data(self.stock_code)
+        return None if data.empty else data.iloc[0]['close']
+    
+    def _fill(self, side: str) -> bool:
+        """按市场价格成交，无行情时按限价成交，都没有则拒绝"""
+        if self.status != OrderStatus.PENDING:
+            return False
+        
+        try:
+            price = self._market_price()
+            if price is None:
+                # 如果没有实时数据，使用限价
+                price = getattr(self, 'limit_price', None)
+            if price:
+                self.price = price
+                self.status = OrderStatus.FILLED
+                self.executed_at = datetime.now()
+                return True
+            self.status = OrderStatus.REJECTED
+            return False
+        except Exception as e:
+            logger.error("执行{}订单失败: {}", side, e)
+            self.status = OrderStatus.REJECTED
+            return False
+    
     def to_dict(self) -> Dict:
         """转换为字典"""
         return {
             'stock_code': self.stock_code,
+            'action': self.action,
             'shares': self.shares,
             'order_type': self.order_type.value,
             'status': self.status.value,
@@ -59,43 +105,17 @@ class OrderCommand(ABC):
 class BuyOrder(OrderCommand):
     """买入订单"""
     
-    def __init__(self, stock_code: str, shares: int, price: Optional[float] = None):
+    action = 'buy'
+    
+    def __init__(self, stock_code: str, shares: int, price: Optional[float] = None,
+                 price_source: Optional[Callable[[str], Optional[float]]] = None):
         order_type = OrderType.LIMIT if price else OrderType.MARKET
-        super().__init__(stock_code, shares, order_type)
+        super().__init__(stock_code, shares, order_type, price_source)
         self.limit_price = price
     
     def execute(self) -> bool:
         """执行买入订单"""
-        if self.status != OrderStatus.PENDING:
-            return False
-        
-        # 这里应该调用实际的交易接口
-        # 示例：模拟执行
-        from core.factory.data_factory import DataFactory
-        
-        try:
-            adapter = DataFactory.create_adapter()
-            data = adapter.get_realtime_data(self.stock_code)
-            
-            if not data.empty:
-                self.price = data.iloc[0]['close']
-                self.status = OrderStatus.FILLED
-                self.executed_at = datetime.now()
-                return True
-            else:
-                # 如果没有实时数据，使用限价
-                if self.limit_price:
-                    self.price = self.limit_price
-                    self.status = OrderStatus.FILLED
-                    self.executed_at = datetime.now()
-                    return True
-                else:
-                    self.status = OrderStatus.REJECTED
-                    return False
-        except Exception as e:
-            print(f"执行买入订单失败: {e}")
-            self.status = OrderStatus.REJECTED
-            return False
+        return self._fill('买入')
     
     def cancel(self) -> bool:
         """撤销买入订单"""
@@ -108,41 +128,17 @@ class BuyOrder(OrderCommand):
 class SellOrder(OrderCommand):
     """卖出订单"""
     
-    def __init__(self, stock_code: str, shares: int, price: Optional[float] = None):
+    action = 'sell'
+    
+    def __init__(self, stock_code: str, shares: int, price: Optional[float] = None,
+                 price_source: Optional[Callable[[str], Optional[float]]] = None):
         order_type = OrderType.LIMIT if price else OrderType.MARKET
-        super().__init__(stock_code, shares, order_type)
+        super().__init__(stock_code, shares, order_type, price_source)
         self.limit_price = price
     
     def execute(self) -> bool:
         """执行卖出订单"""
-        if self.status != OrderStatus.PENDING:
-            return False
-        
-        # 这里应该调用实际的交易接口
-        from core.factory.data_factory import DataFactory
-        
-        try:
-            adapter = DataFactory.create_adapter()
-            data = adapter.get_realtime_data(self.stock_code)
-            
-            if not data.empty:
-                self.price = data.iloc[0]['close']
-                self.status = OrderStatus.FILLED
-                self.executed_at = datetime.now()
-                return True
-            else:
-                if self.limit_price:
-                    self.price = self.limit_price
-                    self.status = OrderStatus.FILLED
-                    self.executed_at = datetime.now()
-                    return True
-                else:
-                    self.status = OrderStatus.REJECTED
-                    return False
-        except Exception as e:
-            print(f"执行卖出订单失败: {e}")
-            self.status = OrderStatus.REJECTED
-            return False
+        return self._fill('卖出')
     
     def cancel(self) -> bool:
         """撤销卖出订单"""
@@ -1,11 +1,24 @@
 """
 数据源工厂 - 工厂模式
 """
+import threading
+from typing import Dict, List
 from core.data.data_adapter import DataAdapter
 from core.data.tushare_adapter import TushareAdapter
 from core.data.akshare_adapter import AKShareAdapter
 from core.data.baostock_adapter import BaoStockAdapter
+from core.data.adapter_proxy import AdapterProxy
+from core.data.adapter_pool import AdapterPool, PooledDataAdapter, is_healthy
+from core.data.bar_cache import CachedDataAdapter
+from core.data.singleflight import CoalescingDataAdapter
+from core.data.router import DataSourceRouter
+from core.data.bulk import get_daily_data_bulk
+from core.data.shared_panel import SharedPanel
 from core.config_manager import ConfigManager
+from utils.logger import get_logger
+
+
+logger = get_logger('数据工厂')
 
 
 class DataFactory:
@@ -17,18 +30,163 @@ class DataFactory:
         'baostock': BaoStockAdapter
     }
     
+    _pools: Dict[str, AdapterPool] = {}
+    _pools_lock = threading.Lock()
+    _router: DataSourceRouter = None
+    
     @staticmethod
-    def create_adapter(source_type: str = None, fallback: bool = True) -> DataAdapter:
+    def create_adapter(source_type: str = None, fallback: bool = True, cached: bool = None,
+                       coalesce: bool = None, pooled: bool = None, routed: bool = None) -> DataAdapter:
         """
         创建数据适配器
         
         Args:
             source_type: 数据源类型 ('tushare' 或 'akshare')
             fallback: 如果指定数据源失败，是否回退到其他数据源
+            cached: 是否包装本地日线缓存，默认读取 data_cache.enabled
+            coalesce: 是否合并并发的重叠请求，默认读取 data_source.coalesce
+            pooled: 是否从连接池复用数据源会话，默认读取 data_pool.enabled
+            routed: 是否按延迟和熔断状态在数据源间路由每次调用，默认读取 data_router.enabled
+                    （仅在未指定 source_type 且允许回退时生效）
         
         Returns:
             DataAdapter实例
         """
+        config = ConfigManager()
+        if cached is None:
+            cached = config.get('data_cache.enabled', False)
+        if coalesce is None:
+            coalesce = config.get('data_source.coalesce', True)
+        if pooled is None:
+            pooled = config.get('data_pool.enabled', True)
+        if routed is None:
+            routed = config.get('data_router.enabled', True)
+        build = DataFactory._pooled_adapter if pooled else DataFactory._create_adapter
+        if routed and source_type is None and fallback:
+            # 路由时本地缓存包装在各数据源上（按数据源分目录），不同数据源的数据不混存
+            adapter = DataFactory.get_router(pooled, cached)
+        elif cached:
+            try:
+                adapter = build(source_type, fallback)
+            except Exception:
+                if not config.get('data_cache.offline', False):
+                    raise
+                # 离线模式下数据源不可用时仍可读取本地缓存
+                adapter = None
+            adapter = CachedDataAdapter(adapter, source=None if adapter is not None else source_type)
+        else:
+            adapter = build(source_type, fallback)
+        
+        if coalesce:
+            # 合并层放在最外层，并发的缓存未命中也只会触发一次上游调用
+            adapter = CoalescingDataAdapter(adapter)
+        return adapter
+    
+    @staticmethod
+    def get_pool(source_type: str) -> AdapterPool:
+        """获取数据源的连接池（按需创建）"""
+        if source_type not in DataFactory._adapters:
+            raise ValueError(f"不支持的数据源类型: {source_type}")
+        with DataFactory._pools_lock:
+            pool = DataFactory._pools.get(source_type)
+            if pool is None:
+                config = ConfigManager()
+                adapter_class = DataFactory._adapters[source_type]
+                pool = DataFactory._pools[source_type] = AdapterPool(
+                    source_type,
+                    adapter_class,
+                    max_sessions=config.get(f'data_pool.sessions.{source_type}')
+                    or config.get('data_pool.max_sessions', 4),
+                    idle_timeout=config.get('data_pool.idle_timeout', 600),
+                    health_check_interval=config.get('data_pool.health_check_interval', 60),
+                    acquire_timeout=config.get('data_pool.acquire_timeout', 30)
+                )
+            return pool
+    
+    @staticmethod
+    def _pooled_adapter(source_type: str = None, fallback: bool = True) -> DataAdapter:
+        """从连接池获取数据适配器（首次使用时建立会话并检查连接状态）"""
+        if source_type is None:
+            source_type = ConfigManager().get('data_source.default', 'baostock')
+        sources = [source_type]
+        if fallback:
+            sources += [s for s in ('baostock', 'akshare', 'tushare')
+                        if s != source_type and s in DataFactory._adapters]
+        
+        last_error = None
+        for source in sources:
+            pool = DataFactory.get_pool(source)
+            try:
+                adapter = pool.acquire()
+            except Exception as e:
+                last_error = e
+                if not fallback:
+                    raise
+                logger.warning("创建{}适配器失败: {}", source, e)
+                continue
+            healthy = is_healthy(adapter)
+            pool.release(adapter, broken=not healthy and fallback)
+            if healthy or not fallback:
+                if source != source_type:
+                    logger.info("自动回退到{}数据源", source)
+                return PooledDataAdapter(pool)
+            last_error = getattr(adapter, 'error_message', None) or f"{source}适配器初始化失败"
+            logger.warning("{}适配器初始化失败，尝试回退到其他数据源", source)
+        raise Exception(f"所有数据源初始化失败。最后错误: {last_error}")
+    
+    @staticmethod
+    def get_router(pooled: bool = True, cached: bool = False) -> DataSourceRouter:
+        """
+        获取进程内共享的数据源路由（按需创建，统计信息在所有请求间累积）
+
+        pooled/cached 只在首次创建时生效：各数据源是否使用连接池、是否在数据源前包装本地缓存
+        """
+        with DataFactory._pools_lock:
+            router = DataFactory._router
+            if router is None:
+                config = ConfigManager()
+                default = config.get('data_source.default', 'baostock')
+                sources = config.get('data_router.sources') or \
+                    [default] + [s for s in DataFactory._adapters if s != default]
+                builders = {}
+                for source in sources:
+                    if source not in DataFactory._adapters:
+                        raise ValueError(f"不支持的数据源类型: {source}")
+                    builders[source] = lambda s=source: DataFactory._source_adapter(s, pooled, cached)
+                router = DataFactory._router = DataSourceRouter(builders)
+            return router
+    
+    @staticmethod
+    def _source_adapter(source: str, pooled: bool, cached: bool) -> DataAdapter:
+        """路由中单个数据源的适配器"""
+        if pooled:
+            adapter = PooledDataAdapter(DataFactory.get_pool(source))
+        else:
+            adapter = DataFactory._create_adapter(source, fallback=False)
+        return CachedDataAdapter(adapter, source=source) if cached else adapter
+    
+    @staticmethod
+    def router_stats() -> Dict:
+        """数据源路由和连接池的统计信息"""
+        with DataFactory._pools_lock:
+            router = DataFactory._router
+            pools = dict(DataFactory._pools)
+        return {
+            'router': router.snapshot() if router is not None else None,
+            'pools': {name: pool.stats() for name, pool in pools.items()}
+        }
+    
+    @staticmethod
+    def close_pools():
+        """关闭所有连接池的空闲会话"""
+        with DataFactory._pools_lock:
+            pools = list(DataFactory._pools.values())
+        for pool in pools:
+            pool.close()
+    
+    @staticmethod
+    def _create_adapter(source_type: str = None, fallback: bool = True) -> DataAdapter:
+        """创建未包装缓存的数据适配器"""
         if source_type is None:
             config = ConfigManager()
             source_type = config.get('data_source.default', 'baostock')  # 默认使用baostock
@@ -50,7 +208,7 @@ class DataFactory:
                         if fallback_source in DataFactory._adapters:
                             print(f"[警告] {source_type}适配器初始化失败，尝试回退到{fallback_source}")
                             try:
-                                return DataFactory.create_adapter(fallback_source, fallback=False)
+                                return DataFactory._create_adapter(fallback_source, fallback=False)
                             except:
                                 continue
                     raise Exception(f"{source_type}适配器初始化失败，且所有备用数据源也失败")
@@ -66,7 +224,7 @@ class DataFactory:
                         if fallback_source in DataFactory._adapters:
                             print(f"[警告] BaoStock连接失败，尝试回退到{fallback_source}")
                             try:
-                                return DataFactory.create_adapter(fallback_source, fallback=False)
+                                return DataFactory._create_adapter(fallback_source, fallback=False)
                             except:
                                 continue
                     raise Exception("BaoStock连接失败，且所有备用数据源也失败")
@@ -82,17 +240,62 @@ class DataFactory:
                         print(f"[警告] 创建{source_type}适配器失败: {e}")
                         print(f"[信息] 自动回退到{fallback_source}数据源")
                         try:
-                            return DataFactory.create_adapter(fallback_source, fallback=False)
+                            return DataFactory._create_adapter(fallback_source, fallback=False)
                         except Exception as fallback_error:
                             continue
                 raise Exception(f"所有数据源初始化失败。最后错误: {e}")
             else:
                 raise
     
+    @staticmethod
+    def create_shared_panel(codes: List[str], start_date: str, end_date: str, columns: List[str] = None,
+                            backend: str = None, adapter: DataAdapter = None, **bulk_options) -> SharedPanel:
+        """
+        批量下载多只股票的日线并写入共享行情面板（供多进程回测零拷贝读取）
+        
+        Args:
+            codes: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+            columns: 放入面板的列，默认为全部日期/数值列
+            backend: 'shm' 或 'mmap'，默认读取 shared_data.backend
+            adapter: 数据适配器，默认 create_adapter()
+            bulk_options: 传给 get_daily_data_bulk 的其他参数（max_workers、retries 等）
+        
+        Returns:
+            SharedPanel（调用者负责 close，或使用 with 语句）
+        """
+        result = get_daily_data_bulk(adapter or DataFactory.create_adapter(), codes, start_date, end_date,
+                                     **bulk_options)
+        if result.failed:
+            logger.warning("共享行情面板缺少 {} 只股票: {}", len(result.failed), ', '.join(result.failed))
+        return SharedPanel.create(result.data, columns=columns, backend=backend)
+    
+    @staticmethod
+    def unwrap(adapter: DataAdapter) -> DataAdapter:
+        """去掉缓存、请求合并等代理层，返回实际的数据源适配器"""
+        if isinstance(adapter, AdapterProxy):
+            return adapter.unwrap()
+        return adapter
+    
+    @staticmethod
+    def adapter_class(adapter: DataAdapter) -> type:
+        """实际数据源适配器的类型（池化适配器取自连接池元数据，不借出会话）"""
+        if isinstance(adapter, AdapterProxy):
+            return adapter.adapter_class
+        return type(adapter)
+    
     @staticmethod
     def register_adapter(source_type: str, adapter_class: type):
         """注册新的数据适配器"""
         if not issubclass(adapter_class, DataAdapter):
             raise TypeError("适配器必须继承自DataAdapter")
         DataFactory._adapters[source_type] = adapter_class
+        # 替换实现后丢弃旧实现的连接池
+        with DataFactory._pools_lock:
+            pool = DataFactory._pools.pop(source_type, None)
+            # 路由持有各数据源的适配器，注册新实现后重新创建
+            DataFactory._router = None
+        if pool is not None:
+            pool.close()
 
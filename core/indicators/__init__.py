@@ -0,0 +1,30 @@
+"""
+技术指标模块
+"""
+from .streaming import (
+    Indicator,
+    RingBuffer,
+    SMA,
+    EMA,
+    RollingStd,
+    RSI,
+    MACD,
+    ATR,
+    Bollinger,
+    MACDValue,
+    BandValue
+)
+
+__all__ = [
+    'Indicator',
+    'RingBuffer',
+    'SMA',
+    'EMA',
+    'RollingStd',
+    'RSI',
+    'MACD',
+    'ATR',
+    'Bollinger',
+    'MACDValue',
+    'BandValue'
+]
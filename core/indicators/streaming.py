@@ -0,0 +1,510 @@
+"""
+流式技术指标 - 每根新K线O(1)增量更新，整段数据用pandas整列计算
+
+两种方式的结果一致：增量更新逐步复现pandas对应算法（rolling的补偿求和/Welford方差、
+ewm的递推权重），整段计算直接调用pandas。实盘/模拟盘逐根喂入K线与回测批量计算得到相同的指标值。
+"""
+import math
+import sys
+from collections import namedtuple
+from typing import Iterable, Mapping, Union
+
+import pandas as pd
+
+
+NAN = float('nan')
+# pandas 判定方差增量更新病态的阈值：平方和缩小到原来的 eps*1e3 以下时重算窗口
+_INV_COND_TOL = sys.float_info.epsilon * 1e3
+
+MACDValue = namedtuple('MACDValue', ['macd', 'signal', 'hist'])
+BandValue = namedtuple('BandValue', ['mid', 'upper', 'lower'])
+
+
+class RingBuffer:
+    """固定容量的环形缓冲区，写满后新值覆盖最旧的值"""
+
+    __slots__ = ('_data', '_pos', '_size')
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"缓冲区容量必须为正数: {capacity}")
+        self._data = [NAN] * capacity
+        self._pos = 0
+        self._size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    @property
+    def full(self) -> bool:
+        return self._size == len(self._data)
+
+    def push(self, value: float) -> float:
+        """写入新值，返回被覆盖的最旧值（未写满时返回NaN）"""
+        evicted = self._data[self._pos] if self.full else NAN
+        self._data[self._pos] = value
+        self._pos = (self._pos + 1) % len(self._data)
+        if self._size < len(self._data):
+            self._size += 1
+        return evicted
+
+    def clear(self):
+        self._data = [NAN] * len(self._data)
+        self._pos = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        """从旧到新遍历"""
+        start = self._pos if self.full else 0
+        for k in range(self._size):
+            yield self._data[(start + k) % len(self._data)]
+
+
+class _WindowMean:
+    """滑动窗口均值，与 pandas rolling().mean() 相同的补偿求和（Kahan）算法"""
+
+    __slots__ = ('nobs', 'sum', 'comp_add', 'comp_remove', 'neg', 'same', 'prev')
+
+    def __init__(self):
+        self.nobs = 0
+        self.sum = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.neg = 0  # 窗口内负数个数（结果符号修正）
+        self.same = 0  # 末尾连续相同值的个数
+        self.prev = None
+
+    def add(self, value: float):
+        if value != value:
+            return
+        if self.prev is None:
+            self.prev = value
+        self.nobs += 1
+        y = value - self.comp_add
+        t = self.sum + y
+        self.comp_add = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, value) < 0:
+            self.neg += 1
+        self.same = self.same + 1 if value == self.prev else 1
+        self.prev = value
+
+    def remove(self, value: float):
+        if value != value:
+            return
+        self.nobs -= 1
+        y = -value - self.comp_remove
+        t = self.sum + y
+        self.comp_remove = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, value) < 0:
+            self.neg -= 1
+
+    def value(self, min_periods: int) -> float:
+        nobs = self.nobs
+        if nobs < min_periods or nobs <= 0:
+            return NAN
+        if self.same >= nobs:
+            return self.prev
+        result = self.sum / nobs
+        if self.neg == 0 and result < 0:
+            return 0.0
+        if self.neg == nobs and result > 0:
+            return 0.0
+        return result
+
+
+class _WindowVar:
+    """
+    滑动窗口方差，与 pandas 3.x rolling().var() 相同的补偿Welford算法
+
+    增删一个值后平方和相对变化超过条件数阈值（可能发生灾难性抵消）时，按窗口内的值从头重新累加，
+    与pandas的重算条件一致。常数窗口不做特殊处理，结果与pandas一样可能是极小的非零值。
+    """
+
+    __slots__ = ('nobs', 'mean', 'ssqdm', 'comp_add', 'comp_remove', 'unstable')
+
+    def __init__(self):
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.unstable = False
+
+    def add(self, value: float):
+        if value != value:
+            return
+        prev_ssqdm = self.ssqdm
+        self.nobs += 1
+        prev_mean = self.mean - self.comp_add
+        y = value - self.comp_add
+        t = y - self.mean
+        self.comp_add = t + self.mean - y
+        self.mean += t / self.nobs
+        self.ssqdm += (value - prev_mean) * (value - self.mean)
+        if prev_ssqdm * _INV_COND_TOL > self.ssqdm:
+            self.unstable = True
+
+    def remove(self, value: float):
+        if value != value:
+            return
+        prev_ssqdm = self.ssqdm
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean - self.comp_remove
+            y = value - self.comp_remove
+            t = y - self.mean
+            self.comp_remove = t + self.mean - y
+            self.mean -= t / self.nobs
+            self.ssqdm -= (value - prev_mean) * (value - self.mean)
+            if prev_ssqdm * _INV_COND_TOL > self.ssqdm:
+                self.unstable = True
+        else:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+            self.unstable = False
+
+    def slide(self, evicted: float, value: float, window: RingBuffer):
+        """窗口移出 evicted、加入 value（window 为加入后的窗口）；数值不稳定或窗口长度为1时重算"""
+        self.remove(evicted)
+        self.add(value)
+        if self.unstable or window.capacity == 1:
+            self.recompute(window)
+
+    def recompute(self, values: Iterable[float]):
+        self.nobs = 0
+        self.mean = self.ssqdm = self.comp_add = self.comp_remove = 0.0
+        for value in values:
+            self.add(value)
+        self.unstable = False
+
+    def value(self, min_periods: int, ddof: int) -> float:
+        nobs = self.nobs
+        if nobs < max(min_periods, 1) or nobs <= ddof:
+            return NAN
+        return self.ssqdm / (nobs - ddof)
+
+
+class _Ewm:
+    """指数加权均值递推，与 pandas ewm(adjust=False).mean() 相同（缺失值参与衰减，ignore_na=False）"""
+
+    __slots__ = ('alpha', 'min_periods', 'weighted', 'old_wt', 'nobs')
+
+    def __init__(self, alpha: float, min_periods: int = 0):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        observed = value == value
+        self.nobs += observed
+        weighted = self.weighted
+        if weighted == weighted:
+            self.old_wt *= 1 - self.alpha
+            if observed:
+                if weighted != value:
+                    weighted = self.old_wt * weighted + self.alpha * value
+                    weighted /= self.old_wt + self.alpha
+                self.old_wt = 1.0
+        elif observed:
+            weighted = value
+        self.weighted = weighted
+        return weighted if self.nobs >= max(self.min_periods, 1) else NAN
+
+
+def _span_alpha(span: float) -> float:
+    if span < 1:
+        raise ValueError(f"span必须不小于1: {span}")
+    return 2.0 / (span + 1.0)
+
+
+def _std(var: float) -> float:
+    """与pandas rolling().std() 一致：方差为负（舍入误差）时取0"""
+    return 0.0 if var < 0 else math.sqrt(var)
+
+
+class Indicator:
+    """
+    流式指标基类
+
+    - update(...)：喂入一根新K线的值，O(1)更新内部状态并返回当前指标值（数据不足时为NaN）
+    - update_bar(bar)：从K线字典/Series中取所需字段后调用update
+    - batch(data)：对整段数据（DataFrame取source列，或直接传Series）用pandas整列计算
+    - stream(data)：从头逐根喂入整段数据，结果与batch一致，结束后状态可继续接收实时K线
+    多输出指标（MACD、布林带）的update返回namedtuple，batch/stream返回DataFrame。
+    """
+
+    fields = None  # 多输出指标的字段名
+
+    def __init__(self, source: str = 'close'):
+        self.source = source
+        self.value = NAN
+        self.count = 0
+        self.reset()
+
+    def reset(self):
+        """清空状态（重新开始喂入）"""
+        self.value = NAN if self.fields is None else None
+        self.count = 0
+        self._reset()
+
+    def _reset(self):
+        pass
+
+    @property
+    def ready(self) -> bool:
+        """是否已有有效值（预热期结束）"""
+        value = self.value
+        if value is None:
+            return False
+        if isinstance(value, tuple):
+            value = value[0]
+        return value == value
+
+    def update(self, value: float):
+        raise NotImplementedError
+
+    def update_bar(self, bar: Mapping):
+        return self.update(float(bar[self.source]))
+
+    def batch(self, data: Union[pd.DataFrame, pd.Series]) -> Union[pd.Series, pd.DataFrame]:
+        raise NotImplementedError
+
+    def stream(self, data: Union[pd.DataFrame, pd.Series]) -> Union[pd.Series, pd.DataFrame]:
+        self.reset()
+        if isinstance(data, pd.Series):
+            values = [self.update(float(value)) for value in data.to_numpy(dtype=float)]
+        else:
+            values = [self.update_bar(bar) for bar in self._rows(data)]
+        if self.fields is None:
+            return pd.Series(values, index=data.index, dtype=float)
+        return pd.DataFrame(values, index=data.index, columns=list(self.fields), dtype=float)
+
+    def _rows(self, data: pd.DataFrame) -> Iterable[Mapping]:
+        """逐行取出update_bar所需的字段"""
+        return ({self.source: value} for value in data[self.source].to_numpy(dtype=float))
+
+    def _series(self, data: Union[pd.DataFrame, pd.Series]) -> pd.Series:
+        series = data if isinstance(data, pd.Series) else data[self.source]
+        return series.astype(float)
+
+    def _set(self, value):
+        self.value = value
+        self.count += 1
+        return value
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.value})"
+
+
+class SMA(Indicator):
+    """简单移动平均，等价于 rolling(window).mean()"""
+
+    def __init__(self, window: int, source: str = 'close', min_periods: int = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        super().__init__(source)
+
+    def _reset(self):
+        self._buffer = RingBuffer(self.window)
+        self._mean = _WindowMean()
+
+    def update(self, value: float) -> float:
+        evicted = self._buffer.push(value)
+        if evicted == evicted:
+            self._mean.remove(evicted)
+        self._mean.add(value)
+        return self._set(self._mean.value(self.min_periods))
+
+    def batch(self, data) -> pd.Series:
+        return self._series(data).rolling(window=self.window, min_periods=self.min_periods).mean()
+
+
+class RollingStd(Indicator):
+    """滚动标准差，等价于 rolling(window).std(ddof)"""
+
+    def __init__(self, window: int, source: str = 'close', ddof: int = 1, min_periods: int = None):
+        self.window = window
+        self.ddof = ddof
+        self.min_periods = window if min_periods is None else min_periods
+        super().__init__(source)
+
+    def _reset(self):
+        self._buffer = RingBuffer(self.window)
+        self._var = _WindowVar()
+
+    def update(self, value: float) -> float:
+        evicted = self._buffer.push(value)
+        self._var.slide(evicted, value, self._buffer)
+        return self._set(_std(self._var.value(self.min_periods, self.ddof)))
+
+    def batch(self, data) -> pd.Series:
+        return self._series(data).rolling(window=self.window, min_periods=self.min_periods).std(ddof=self.ddof)
+
+
+class EMA(Indicator):
+    """指数移动平均，等价于 ewm(span=span, adjust=False).mean()"""
+
+    def __init__(self, span: int, source: str = 'close', min_periods: int = 0):
+        self.span = span
+        self.min_periods = min_periods
+        super().__init__(source)
+
+    def _reset(self):
+        self._ewm = _Ewm(_span_alpha(self.span), self.min_periods)
+
+    def update(self, value: float) -> float:
+        return self._set(self._ewm.update(value))
+
+    def batch(self, data) -> pd.Series:
+        return self._series(data).ewm(span=self.span, adjust=False, min_periods=self.min_periods).mean()
+
+
+class RSI(Indicator):
+    """
+    相对强弱指标（Wilder平滑）
+
+    涨跌幅分别按 alpha=1/window 做指数平滑（adjust=False，至少window个涨跌幅后才有值），
+    RSI = 100 - 100 / (1 + 平均涨幅 / 平均跌幅)。
+    """
+
+    def __init__(self, window: int = 14, source: str = 'close'):
+        self.window = window
+        super().__init__(source)
+
+    def _reset(self):
+        self._prev = NAN
+        self._gain = _Ewm(1.0 / self.window, self.window)
+        self._loss = _Ewm(1.0 / self.window, self.window)
+
+    def update(self, value: float) -> float:
+        delta = value - self._prev if self.count else NAN
+        self._prev = value
+        gain = self._gain.update(max(delta, 0.0) if delta == delta else NAN)
+        loss = self._loss.update(max(-delta, 0.0) if delta == delta else NAN)
+        return self._set(_rsi(gain, loss))
+
+    def batch(self, data) -> pd.Series:
+        delta = self._series(data).diff()
+        gain = delta.clip(lower=0).ewm(alpha=1.0 / self.window, adjust=False, min_periods=self.window).mean()
+        loss = (-delta).clip(lower=0).ewm(alpha=1.0 / self.window, adjust=False, min_periods=self.window).mean()
+        return 100 - 100 / (1 + gain / loss)
+
+
+def _rsi(gain: float, loss: float) -> float:
+    """与pandas除法语义一致：x/0 为 ±inf，0/0 为 NaN"""
+    if gain != gain or loss != loss:
+        return NAN
+    if loss == 0:
+        if gain == 0:
+            return NAN
+        return 100.0 - 100.0 / (1.0 + math.copysign(math.inf, gain))
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class MACD(Indicator):
+    """
+    MACD：macd = EMA(fast) - EMA(slow)，signal = EMA(macd, signal)，hist = macd - signal
+    （EMA均为 adjust=False）
+    """
+
+    fields = MACDValue._fields
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, source: str = 'close'):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        super().__init__(source)
+
+    def _reset(self):
+        self._fast = _Ewm(_span_alpha(self.fast))
+        self._slow = _Ewm(_span_alpha(self.slow))
+        self._signal = _Ewm(_span_alpha(self.signal))
+
+    def update(self, value: float) -> MACDValue:
+        macd = self._fast.update(value) - self._slow.update(value)
+        signal = self._signal.update(macd)
+        return self._set(MACDValue(macd, signal, macd - signal))
+
+    def batch(self, data) -> pd.DataFrame:
+        series = self._series(data)
+        macd = series.ewm(span=self.fast, adjust=False).mean() - series.ewm(span=self.slow, adjust=False).mean()
+        signal = macd.ewm(span=self.signal, adjust=False).mean()
+        return pd.DataFrame({'macd': macd, 'signal': signal, 'hist': macd - signal})
+
+
+class ATR(Indicator):
+    """
+    平均真实波幅（Wilder平滑）
+
+    真实波幅 TR = max(最高-最低, |最高-昨收|, |最低-昨收|)，首根K线为 最高-最低；
+    ATR 为 TR 按 alpha=1/window 的指数平滑（adjust=False，至少window根K线后才有值）。
+    """
+
+    def __init__(self, window: int = 14):
+        self.window = window
+        super().__init__('close')
+
+    def _reset(self):
+        self._prev_close = NAN
+        self._ewm = _Ewm(1.0 / self.window, self.window)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        prev = self._prev_close
+        ranges = [r for r in (high - low, abs(high - prev), abs(low - prev)) if r == r]
+        self._prev_close = close
+        return self._set(self._ewm.update(max(ranges) if ranges else NAN))
+
+    def update_bar(self, bar: Mapping) -> float:
+        return self.update(float(bar['high']), float(bar['low']), float(bar['close']))
+
+    def _rows(self, data: pd.DataFrame) -> Iterable[Mapping]:
+        high, low, close = (data[column].to_numpy(dtype=float) for column in ('high', 'low', 'close'))
+        return ({'high': h, 'low': l, 'close': c} for h, l, c in zip(high, low, close))
+
+    def batch(self, data: pd.DataFrame) -> pd.Series:
+        high, low, close = (data[column].astype(float) for column in ('high', 'low', 'close'))
+        prev_close = close.shift(1)
+        true_range = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+        return true_range.ewm(alpha=1.0 / self.window, adjust=False, min_periods=self.window).mean()
+
+
+class Bollinger(Indicator):
+    """布林带：mid = SMA(window)，upper/lower = mid ± k × rolling std(ddof)"""
+
+    fields = BandValue._fields
+
+    def __init__(self, window: int = 20, k: float = 2.0, source: str = 'close', ddof: int = 0):
+        self.window = window
+        self.k = k
+        self.ddof = ddof
+        super().__init__(source)
+
+    def _reset(self):
+        self._buffer = RingBuffer(self.window)
+        self._mean = _WindowMean()
+        self._var = _WindowVar()
+
+    def update(self, value: float) -> BandValue:
+        evicted = self._buffer.push(value)
+        if evicted == evicted:
+            self._mean.remove(evicted)
+        self._mean.add(value)
+        self._var.slide(evicted, value, self._buffer)
+        mid = self._mean.value(self.window)
+        width = self.k * _std(self._var.value(self.window, self.ddof))
+        return self._set(BandValue(mid, mid + width, mid - width))
+
+    def batch(self, data) -> pd.DataFrame:
+        series = self._series(data)
+        rolling = series.rolling(window=self.window)
+        mid = rolling.mean()
+        width = self.k * rolling.std(ddof=self.ddof)
+        return pd.DataFrame({'mid': mid, 'upper': mid + width, 'lower': mid - width})
@@ -50,6 +50,13 @@ class MarketDataSubject(Subject):
         }
         self.notify('price_update', data)
     
+    def update_bar(self, stock_code: str, bar: Dict):
+        """推送一根完成的K线（date/open/high/low/close/volume）"""
+        data = dict(bar)
+        data['stock_code'] = stock_code
+        data['timestamp'] = datetime.now()
+        self.notify('bar_update', data)
+    
     def update_trade(self, trade_info: Dict):
         """更新交易信息"""
         trade_info['timestamp'] = datetime.now()
@@ -2,6 +2,12 @@
 策略模块
 """
 from .base_strategy import BaseStrategy
+from .lot_ledger import LotLedger
+from .fill_buffer import FillBuffer
+from .run_state import RunState
+from .profiler import StrategyProfiler, PhaseMetrics, phase_metrics, add_phase_hook, remove_phase_hook
+from .live_runner import LiveStrategyRunner
 
-__all__ = ['BaseStrategy']
+__all__ = ['BaseStrategy', 'LotLedger', 'FillBuffer', 'RunState', 'StrategyProfiler', 'PhaseMetrics',
+           'phase_metrics', 'add_phase_hook', 'remove_phase_hook', 'LiveStrategyRunner']
 
@@ -1,10 +1,21 @@
 """
 策略基类 - 策略模式和模板方法模式
 """
+import copy
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 from datetime import datetime, date, timedelta
+import numpy as np
 import pandas as pd
+from core.strategy.lot_ledger import LotLedger
+from core.strategy.fill_buffer import FillBuffer
+from core.strategy.run_state import RunState
+from core.strategy.profiler import StrategyProfiler
+from core.calendar.trading_calendar import MISSING_ORDINAL, get_calendar, to_date, to_days
+from core.indicators.streaming import Indicator
+from utils.logger import get_logger
+
+logger = get_logger('策略')
 
 
 class BaseStrategy(ABC):
@@ -13,34 +24,114 @@ class BaseStrategy(ABC):
     def __init__(self, name: str, params: Optional[Dict] = None):
         self.name = name
         self.params = params or {}
-        self.positions = {}  # 持仓 {stock_code: shares}
-        self.position_dates = {}  # 持仓买入日期 {stock_code: {shares: date}} - 用于T+1限制
-        self.cash = 0
-        self.total_value = 0
-        self.trade_history = []  # 交易历史
+        self.state = RunState()  # 单次运行的可变状态（资金、持仓、成交记录）
+    
+    def spawn(self) -> 'BaseStrategy':
+        """
+        派生一个共享策略定义、拥有独立运行状态的实例
+        
+        只做浅拷贝（参数等定义对象共享），不重新导入也不复制数据，
+        可安全地在多个线程/进程中并行回测同一策略。
+        子类如有额外的运行期可变属性，应重写本方法一并重置。
+        """
+        clone = copy.copy(self)
+        clone.state = RunState()
+        return clone
+    
+    def reset_state(self, cash: float = 0, profile: bool = None):
+        """
+        开始新的一次运行：丢弃上次运行的持仓和成交记录
+        
+        Args:
+            profile: 是否记录各阶段的性能剖析，默认读取 profiling.enabled
+        """
+        if profile is None:
+            from core.config_manager import ConfigManager
+            profile = ConfigManager().get('profiling.enabled', False)
+        self.state = RunState(cash, StrategyProfiler() if profile else None)
+    
+    # 运行状态属性（委托给 self.state，保持原有访问方式）
+    
+    @property
+    def cash(self) -> float:
+        return self.state.cash
+    
+    @cash.setter
+    def cash(self, value: float):
+        self.state.cash = value
+    
+    @property
+    def total_value(self) -> float:
+        return self.state.total_value
+    
+    @total_value.setter
+    def total_value(self, value: float):
+        self.state.total_value = value
+    
+    @property
+    def positions(self) -> Dict[str, int]:
+        return self.state.positions
+    
+    @positions.setter
+    def positions(self, value: Dict[str, int]):
+        self.state.positions = value
     
-    def run(self, data: pd.DataFrame) -> Dict:
+    @property
+    def position_dates(self) -> Dict[str, LotLedger]:
+        return self.state.position_dates
+    
+    @position_dates.setter
+    def position_dates(self, value: Dict[str, LotLedger]):
+        self.state.position_dates = value
+    
+    @property
+    def trade_history(self) -> List[Dict]:
+        return self.state.trade_history
+    
+    @trade_history.setter
+    def trade_history(self, value: List[Dict]):
+        self.state.trade_history = value
+    
+    @property
+    def profiler(self) -> Optional[StrategyProfiler]:
+        return self.state.profiler
+    
+    @property
+    def fills(self) -> Optional[FillBuffer]:
+        return self.state.fills
+    
+    @fills.setter
+    def fills(self, value: Optional[FillBuffer]):
+        self.state.fills = value
+    
+    def run(self, data: pd.DataFrame, processed_data: Optional[pd.DataFrame] = None) -> Dict:
         """
         运行策略（模板方法模式）
         定义了策略执行的固定流程
+        
+        Args:
+            data: 历史数据
+            processed_data: 已预处理的数据（如复用的指标缓存），提供时跳过预处理
         """
         # 1. 初始化
-        self.on_init()
+        self._phase('on_init', self.on_init)
         
         # 2. 数据预处理
-        processed_data = self.preprocess_data(data)
+        if processed_data is None:
+            processed_data = self._phase('preprocess_data', self.preprocess_data, data)
         
         # 3. 生成信号
-        signals = self.generate_signals(processed_data)
+        signals = self._phase('generate_signals', self.generate_signals, processed_data)
         
         # 4. 执行交易
-        trades = self.execute_trades(signals)
+        self.fills = None
+        trades = self._phase('execute_trades', self.execute_trades, signals)
         
         # 5. 风险控制
-        self.risk_control()
+        self._phase('risk_control', self.risk_control)
         
         # 6. 记录结果
-        result = self.on_finish()
+        result = self._phase('on_finish', self.on_finish)
         
         return {
             'signals': signals,
@@ -48,6 +139,13 @@ class BaseStrategy(ABC):
             'result': result
         }
     
+    def _phase(self, phase: str, func, *args, **kwargs):
+        """执行一个运行阶段，启用剖析时记录耗时等统计"""
+        profiler = self.state.profiler
+        if profiler is None:
+            return func(*args, **kwargs)
+        return profiler.measure(type(self).__name__, phase, func, *args, **kwargs)
+    
     def on_init(self):
         """初始化（子类可重写）"""
         pass
@@ -65,51 +163,178 @@ class BaseStrategy(ABC):
         """
         pass
     
+    def create_indicators(self) -> Dict[str, Indicator]:
+        """
+        策略使用的技术指标 {列名: 指标}（子类可重写）
+        
+        同一组指标既可在 preprocess_data 中用 add_indicators 整列计算（回测），
+        也可用 update_indicators 逐根K线增量更新（实盘/模拟盘），两种方式结果一致。
+        """
+        return {}
+    
+    def add_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+        """整列计算 create_indicators 声明的指标并写入data（多输出指标的列名为 列名_字段），返回data"""
+        for name, indicator in self.create_indicators().items():
+            result = indicator.batch(data)
+            if isinstance(result, pd.DataFrame):
+                for field in result.columns:
+                    data[f"{name}_{field}"] = result[field]
+            else:
+                data[name] = result
+        return data
+    
+    def update_indicators(self, bar: Mapping) -> Dict[str, float]:
+        """
+        用一根新K线增量更新指标，返回 {列名: 当前值}（列名与 add_indicators 相同）
+        
+        指标状态按股票代码保存在本次运行的 RunState 中，reset_state 后重新预热。
+        """
+        indicators = self.state.indicators.get(bar.get('stock_code'))
+        if indicators is None:
+            indicators = self.state.indicators[bar.get('stock_code')] = self.create_indicators()
+        values = {}
+        for name, indicator in indicators.items():
+            value = indicator.update_bar(bar)
+            if isinstance(value, tuple):
+                values.update((f"{name}_{field}", item) for field, item in zip(value._fields, value))
+            else:
+                values[name] = value
+        return values
+    
+    # 逐K线（事件驱动）接口：由 LiveStrategyRunner 在实盘/模拟盘中调用
+    
+    def context(self, stock_code: str) -> Dict:
+        """单只股票在K线之间保留的状态（随 reset_state 清空）"""
+        context = self.state.context.get(stock_code)
+        if context is None:
+            context = self.state.context[stock_code] = {}
+        return context
+    
+    def on_bar(self, bar: Mapping) -> int:
+        """
+        收到一根完成的K线（子类可重写）
+        
+        返回信号：1=买入，-1=卖出，0=持有。只应使用增量状态（update_indicators、context），
+        不回看完整历史，每根K线的决策耗时不随历史长度增长。默认只更新指标。
+        """
+        self.update_indicators(bar)
+        return 0
+    
+    def on_tick(self, tick: Mapping) -> int:
+        """收到一笔实时价格（stock_code/price/volume/timestamp，子类可重写），返回信号，默认持有"""
+        return 0
+    
     def execute_trades(self, signals: pd.DataFrame) -> List[Dict]:
-        """执行交易（子类可重写以自定义交易逻辑）"""
+        """
+        执行交易（子类可重写以自定义交易逻辑）
+        
+        一次性取出信号列为数组，日期在撮合前统一解析，只遍历有买卖信号的行。
+        成交记录（字典）写入 trade_history，同时把成交行位置和已解析的日期等写入列式副本 self.fills
+        """
         trades = []
+        self.fills = FillBuffer(len(signals))
         
         if signals.empty:
-            print("[信息] 没有交易信号")
+            logger.info("没有交易信号")
             return trades
         
-        for idx, row in signals.iterrows():
+        columns = self._signal_columns(signals)
+        signal = columns['signal']
+        codes = columns['stock_code']
+        prices = columns['price']
+        shares = columns['shares']
+        stamps = columns['date']
+        days = columns['day']
+        ordinals = columns['ordinal']
+        
+        for i in np.flatnonzero((signal == 1) | (signal == -1)):
             # 获取股票代码
-            stock_code = row.get('stock_code')
+            stock_code = codes[i]
             if not stock_code:
-                print(f"[警告] 信号行缺少股票代码，跳过: {idx}")
+                logger.warning("信号行缺少股票代码，跳过: {}", signals.index[i])
                 continue
             
             # 获取价格（优先使用close，其次使用price）
-            price = row.get('close') or row.get('price', 0)
+            price = prices[i]
             if price == 0:
-                print(f"[警告] 信号行价格无效，跳过: {idx}")
+                logger.warning("信号行价格无效，跳过: {}", signals.index[i])
                 continue
             
             # 获取交易日期（用于T+1限制检查）
-            trade_date = row.get('date')
+            trade_date = stamps[i]
             if trade_date is None:
-                # 如果没有date列，尝试从index获取
-                if hasattr(idx, 'date'):
-                    trade_date = idx.date
-                elif isinstance(idx, pd.Timestamp):
-                    trade_date = idx
-                else:
-                    # 如果还是没有，使用当前日期（回测中应该总是有日期）
-                    print(f"[警告] 信号行缺少交易日期，无法检查T+1限制: {idx}")
+                logger.warning("信号行缺少交易日期，无法检查T+1限制: {}", signals.index[i])
             
-            if row['signal'] == 1:  # 买入信号
-                trade = self._buy(stock_code, price, row.get('shares', 0), trade_date)
-                if trade:
-                    trades.append(trade)
-            elif row['signal'] == -1:  # 卖出信号
-                trade = self._sell(stock_code, price, row.get('shares', 0), trade_date)
-                if trade:
-                    trades.append(trade)
+            if signal[i] == 1:  # 买入信号
+                trade = self._buy(stock_code, price, shares[i], trade_date, ordinals[i])
+                side = 1
+            else:  # 卖出信号
+                trade = self._sell(stock_code, price, shares[i], trade_date, ordinals[i])
+                side = -1
+            if trade:
+                trades.append(trade)
+                self.fills.append(i, side, trade['price'], trade['shares'], trade['amount'], days[i], stock_code)
         
         return trades
     
-    def _buy(self, stock_code: str, price: float, shares: int = 0, trade_date = None) -> Optional[Dict]:
+    @staticmethod
+    def _signal_columns(signals: pd.DataFrame) -> Dict:
+        """
+        将信号DataFrame转换为类型化的列数组
+        
+        日期统一解析一次：date 为 Timestamp（缺失为None），day 为 datetime64[D]，
+        ordinal 为交易日序号（用于T+1检查，缺失为None）
+        """
+        n = len(signals)
+        signal = signals['signal'].to_numpy()
+        
+        if 'stock_code' in signals.columns:
+            codes = signals['stock_code'].tolist()
+        else:
+            codes = [None] * n
+        
+        # 优先使用close，close缺失或为0时使用price
+        close = signals['close'].to_numpy(dtype=float, na_value=0.0) if 'close' in signals.columns else np.zeros(n)
+        fallback = signals['price'].to_numpy(dtype=float, na_value=0.0) if 'price' in signals.columns else np.zeros(n)
+        prices = np.where(close != 0, close, fallback).tolist()
+        
+        if 'shares' in signals.columns:
+            shares = signals['shares'].fillna(0).astype(np.int64).tolist()
+        else:
+            shares = [0] * n
+        
+        # 日期：优先使用date列，其次使用时间索引（已是datetime64的列不重新解析）
+        if 'date' in signals.columns:
+            stamps = signals['date']
+            if not pd.api.types.is_datetime64_any_dtype(stamps):
+                stamps = pd.to_datetime(stamps, errors='coerce', format='mixed')
+        elif isinstance(signals.index, pd.DatetimeIndex):
+            stamps = pd.Series(signals.index, index=signals.index)
+        else:
+            stamps = pd.Series(pd.NaT, index=signals.index, dtype='datetime64[ns]')
+        day = to_days(stamps)
+        ordinal = get_calendar().ordinals(day)
+        stamps = [None if pd.isna(stamp) else stamp for stamp in stamps.tolist()]
+        ordinal = [None if k == MISSING_ORDINAL else k for k in ordinal.tolist()]
+        
+        return {
+            'signal': signal,
+            'stock_code': codes,
+            'price': prices,
+            'shares': shares,
+            'date': stamps,
+            'day': day,
+            'ordinal': ordinal
+        }
+    
+    def _trade_ordinal(self, trade_date, ordinal: Optional[int]) -> Optional[int]:
+        """交易日序号：已换算的直接使用，否则由交易日历换算（无法解析时为None）"""
+        if ordinal is None and trade_date is not None:
+            ordinal = get_calendar().ordinal(trade_date)
+        return ordinal
+    
+    def _buy(self, stock_code: str, price: float, shares: int = 0, trade_date = None,
+             ordinal: Optional[int] = None) -> Optional[Dict]:
         """
         买入
         
@@ -118,22 +343,23 @@ class BaseStrategy(ABC):
             price: 买入价格
             shares: 买入股数（0表示全仓买入）
             trade_date: 交易日期（用于T+1限制）
+            ordinal: 交易日序号（execute_trades已整列换算，省去逐笔解析日期）
         """
         if price <= 0:
-            print(f"[策略] 买入失败: 价格无效 {price}")
+            logger.info("买入失败: 价格无效 {}", price)
             return None
         
         if shares == 0:
             # A股按手交易（100股为1手）
             available_shares = int(self.cash / price / 100) * 100
             if available_shares < 100:
-                print(f"[策略] 买入失败: 资金不足，需要至少 {price * 100:.2f} 元")
+                logger.info("买入失败: 资金不足，需要至少 {:.2f} 元", price * 100)
                 return None
             shares = available_shares
         
         cost = price * shares
         if cost > self.cash:
-            print(f"[策略] 买入失败: 资金不足，需要 {cost:.2f} 元，当前资金 {self.cash:.2f} 元")
+            logger.info("买入失败: 资金不足，需要 {:.2f} 元，当前资金 {:.2f} 元", cost, self.cash)
             return None
         
         self.cash -= cost
@@ -142,30 +368,19 @@ class BaseStrategy(ABC):
         else:
             self.positions[stock_code] = shares
         
-        # 记录买入日期（用于T+1限制）
-        # 使用FIFO（先进先出）原则，记录每批买入的日期
+        # 记录买入批次（用于T+1限制），同日买入合并为一个批次
         if stock_code not in self.position_dates:
-            self.position_dates[stock_code] = []
+            self.position_dates[stock_code] = LotLedger()
         
-        # 将买入日期添加到队列中（每100股为一批，记录日期）
-        # 简化处理：记录总股数和最早买入日期
-        if trade_date is not None:
-            # 转换为可比较的日期格式
-            if isinstance(trade_date, pd.Timestamp):
-                trade_date = trade_date.date()
-            elif isinstance(trade_date, str):
-                from datetime import datetime
-                trade_date = datetime.strptime(trade_date, '%Y-%m-%d').date()
-            
-            # 记录这批股票的买入日期
-            for _ in range(shares // 100):  # 每100股记录一次
-                self.position_dates[stock_code].append(trade_date)
-        else:
+        # 批次按交易日序号记录
+        ordinal = self._trade_ordinal(trade_date, ordinal)
+        if ordinal is None:
             # 如果没有日期，使用当前日期（回测中应该总是有日期）
-            from datetime import date
-            today = date.today()
-            for _ in range(shares // 100):
-                self.position_dates[stock_code].append(today)
+            ordinal = get_calendar().ordinal(date.today())
+        self.position_dates[stock_code].add(ordinal, shares)
+        if isinstance(trade_date, (pd.Timestamp, str)):
+            # 成交记录的时间统一为date
+            trade_date = to_date(trade_date) or trade_date
         
         trade = {
             'time': trade_date if trade_date else datetime.now(),
@@ -176,10 +391,11 @@ class BaseStrategy(ABC):
             'amount': cost
         }
         self.trade_history.append(trade)
-        print(f"[策略] 买入: {stock_code} {shares}股 @ {price:.2f}元，金额: {cost:.2f}元，日期: {trade_date}")
+        logger.info("买入: {} {}股 @ {:.2f}元，金额: {:.2f}元，日期: {}", stock_code, shares, price, cost, trade_date)
         return trade
     
-    def _sell(self, stock_code: str, price: float, shares: int = 0, trade_date = None) -> Optional[Dict]:
+    def _sell(self, stock_code: str, price: float, shares: int = 0, trade_date = None,
+              ordinal: Optional[int] = None) -> Optional[Dict]:
         """
         卖出（考虑A股T+1限制）
         
@@ -188,57 +404,37 @@ class BaseStrategy(ABC):
             price: 卖出价格
             shares: 卖出股数（0表示全部卖出）
             trade_date: 交易日期（用于T+1限制检查）
+            ordinal: 交易日序号（execute_trades已整列换算，省去逐笔解析日期）
         """
         if stock_code not in self.positions or self.positions[stock_code] == 0:
-            print(f"[策略] 卖出失败: 无持仓 {stock_code}")
+            logger.info("卖出失败: 无持仓 {}", stock_code)
             return None
         
         if price <= 0:
-            print(f"[策略] 卖出失败: 价格无效 {price}")
+            logger.info("卖出失败: 价格无效 {}", price)
             return None
         
         # 检查T+1限制（A股：当日买入的股票，当日不能卖出）
         if trade_date is not None:
-            # 转换为可比较的日期格式
-            sell_date_obj = None
-            if isinstance(trade_date, pd.Timestamp):
-                sell_date_obj = trade_date.date()
-            elif isinstance(trade_date, datetime):
-                sell_date_obj = trade_date.date()
-            elif isinstance(trade_date, date):
-                sell_date_obj = trade_date
-            elif isinstance(trade_date, str):
-                # 尝试多种日期格式
-                for fmt in ['%Y-%m-%d', '%Y/%m/%d', '%Y%m%d']:
-                    try:
-                        sell_date_obj = datetime.strptime(trade_date, fmt).date()
-                        break
-                    except ValueError:
-                        continue
-                if sell_date_obj is None:
-                    print(f"[警告] 无法解析卖出日期格式: {trade_date}")
-                    sell_date_obj = date.today()
+            # 换算为交易日序号（与买入批次可比较）
+            sell_ordinal = self._trade_ordinal(trade_date, ordinal)
+            if sell_ordinal is None:
+                logger.warning("无法解析卖出日期格式: {}", trade_date)
+                sell_ordinal = get_calendar().ordinal(date.today())
             
             # 检查是否有当日买入的股票（T+1限制）
-            if stock_code in self.position_dates and self.position_dates[stock_code]:
-                # 计算可以卖出的股票数量（买入日期早于卖出日期的股票）
-                # T+1限制：买入日期必须 < 卖出日期（至少间隔1个交易日）
-                available_shares = 0
-                available_buy_dates = []
-                
-                for buy_date in self.position_dates[stock_code]:
-                    # 检查买入日期是否早于卖出日期（至少间隔1天）
-                    if buy_date < sell_date_obj:
-                        available_shares += 100  # 每批100股
-                        available_buy_dates.append(buy_date)
+            ledger = self.position_dates.get(stock_code)
+            if ledger:
+                # 可以卖出的股票数量（买入交易日早于卖出交易日，至少间隔1个交易日）
+                available_shares = ledger.sellable(sell_ordinal)
                 
                 if available_shares == 0:
                     # 检查是否所有持仓都是当日买入
-                    earliest_buy_date = min(self.position_dates[stock_code])
-                    if earliest_buy_date >= sell_date_obj:
-                        print(f"[策略] 卖出失败: T+1限制 - {stock_code} 在 {sell_date_obj} 买入，当日不能卖出")
+                    earliest_buy_ordinal = ledger.earliest()
+                    if earliest_buy_ordinal >= sell_ordinal:
+                        logger.info("卖出失败: T+1限制 - {} 在 {} 买入，当日不能卖出", stock_code, to_date(trade_date) or trade_date)
                     else:
-                        print(f"[策略] 卖出失败: T+1限制 - {stock_code} 所有持仓都不满足T+1限制")
+                        logger.info("卖出失败: T+1限制 - {} 所有持仓都不满足T+1限制", stock_code)
                     return None
                 
                 # 如果请求卖出的数量超过可卖出数量，限制为可卖出数量
@@ -247,24 +443,17 @@ class BaseStrategy(ABC):
                 else:
                     shares = min(shares, available_shares, self.positions[stock_code])
                 
-                # 更新买入日期记录（只移除可卖出的部分）
-                # 按FIFO原则，先移除最早的可卖出记录
-                shares_to_remove = shares
-                for buy_date in available_buy_dates:
-                    if shares_to_remove <= 0:
-                        break
-                    if buy_date in self.position_dates[stock_code]:
-                        self.position_dates[stock_code].remove(buy_date)
-                        shares_to_remove -= 100
+                # 按FIFO原则从最早的批次扣减
+                ledger.consume(shares)
         else:
             # 如果没有日期信息，使用原有逻辑（但会打印警告）
-            print(f"[警告] 卖出时缺少交易日期，无法检查T+1限制: {stock_code}")
+            logger.warning("卖出时缺少交易日期，无法检查T+1限制: {}", stock_code)
             if shares == 0:
                 shares = self.positions[stock_code]
         
         shares = min(shares, self.positions[stock_code])
         if shares == 0:
-            print(f"[策略] 卖出失败: 可卖出数量为0")
+            logger.info("卖出失败: 可卖出数量为0")
             return None
         
         amount = price * shares
@@ -273,13 +462,9 @@ class BaseStrategy(ABC):
         self.cash += amount
         self.positions[stock_code] -= shares
         
-        # 如果T+1检查时没有更新日期记录，在这里更新（向后兼容）
+        # 如果T+1检查时没有更新批次记录，在这里按FIFO原则扣减（向后兼容）
         if trade_date is None and stock_code in self.position_dates:
-            # 按FIFO原则移除（先买入的先卖出）
-            shares_to_remove = shares
-            while shares_to_remove > 0 and self.position_dates[stock_code]:
-                self.position_dates[stock_code].pop(0)  # 移除最早的买入记录
-                shares_to_remove -= 100  # 每批100股
+            self.position_dates[stock_code].consume(shares)
         
         if self.positions[stock_code] == 0:
             del self.positions[stock_code]
@@ -295,7 +480,7 @@ class BaseStrategy(ABC):
             'amount': amount
         }
         self.trade_history.append(trade)
-        print(f"[策略] 卖出: {stock_code} {shares}股 @ {price:.2f}元，金额: {amount:.2f}元，日期: {trade_date}")
+        logger.info("卖出: {} {}股 @ {:.2f}元，金额: {:.2f}元，日期: {}", stock_code, shares, price, amount, trade_date)
         return trade
     
     def risk_control(self):
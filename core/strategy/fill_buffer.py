@@ -0,0 +1,69 @@
+"""
+成交缓冲区 - 预分配的列式成交记录
+"""
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+
+class FillBuffer:
+    """
+    列式成交缓冲区
+
+    按信号数预分配各列数组，成交时按位置写入。成交字典（trade_history）仍是对外的成交记录，
+    本缓冲区是其列式副本，供回测引擎重建逐日资产时直接按列计算，不必再逐笔读取字典和解析日期。
+    """
+
+    def __init__(self, capacity: int):
+        capacity = max(int(capacity), 0)
+        self.bar = np.empty(capacity, dtype=np.int64)  # 信号行位置
+        self.side = np.empty(capacity, dtype=np.int8)  # 1=买入，-1=卖出
+        self.price = np.empty(capacity, dtype=np.float64)
+        self.shares = np.empty(capacity, dtype=np.int64)
+        self.amount = np.empty(capacity, dtype=np.float64)
+        self.day = np.empty(capacity, dtype='datetime64[D]')  # 成交日期
+        self.stock_code = np.empty(capacity, dtype=object)
+        self.size = 0
+
+    def append(self, bar: int, side: int, price: float, shares: int, amount: float,
+               day: np.datetime64, stock_code: str):
+        """写入一笔成交"""
+        i = self.size
+        if i >= len(self.bar):
+            self._grow()
+        self.bar[i] = bar
+        self.side[i] = side
+        self.price[i] = price
+        self.shares[i] = shares
+        self.amount[i] = amount
+        self.day[i] = day
+        self.stock_code[i] = stock_code
+        self.size = i + 1
+
+    def _grow(self):
+        capacity = max(len(self.bar) * 2, 16)
+        for name in ('bar', 'side', 'price', 'shares', 'amount', 'day', 'stock_code'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """已写入部分的各列视图"""
+        n = self.size
+        return {
+            'bar': self.bar[:n],
+            'side': self.side[:n],
+            'price': self.price[:n],
+            'shares': self.shares[:n],
+            'amount': self.amount[:n],
+            'day': self.day[:n],
+            'stock_code': self.stock_code[:n]
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """转换为DataFrame"""
+        return pd.DataFrame(self.columns())
+
+    def __len__(self) -> int:
+        return self.size
@@ -0,0 +1,167 @@
+"""
+事件驱动策略运行器 - 将行情主题的K线/实时价格推送给策略，信号经 OrderInvoker 转为订单执行
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Mapping, Optional
+
+from core.execution.order_command import BuyOrder, OrderCommand, OrderInvoker, SellOrder
+from core.observer.observer import MarketDataSubject, Observer
+from core.strategy.base_strategy import BaseStrategy
+from utils.logger import get_logger
+from utils.metrics import REGISTRY, Counter, Histogram
+
+
+logger = get_logger('策略运行器')
+
+DECISION_SECONDS = Histogram('quant_strategy_decision_seconds', '逐K线/逐笔行情的策略决策与下单耗时（秒）',
+                             ('strategy', 'event'), REGISTRY,
+                             buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+ORDERS = Counter('quant_strategy_orders_total', '策略提交的订单数', ('strategy', 'action', 'status'), REGISTRY)
+
+
+class LiveStrategyRunner(Observer):
+    """
+    实盘/模拟盘策略运行器（观察者）
+
+    挂到 MarketDataSubject 上：bar_update 事件调用 strategy.on_bar，price_update 事件调用 strategy.on_tick。
+    策略返回的信号直接生成 BuyOrder/SellOrder 交给 OrderInvoker 执行，成交后按成交价更新策略的
+    资金、持仓和T+1批次，并通过 update_trade 通知其他观察者。
+
+    - paper=True（模拟盘）：订单按该股票最近一次K线收盘价/实时价格成交，不访问数据源
+    - paper=False：订单按 BuyOrder/SellOrder 的默认方式查询实时行情成交
+    每次决策只处理当前事件和策略的增量状态，耗时与已运行的K线数量无关，按策略和事件类型记录在
+    quant_strategy_decision_seconds 中。回调在锁内串行执行，行情可来自多个线程。
+    """
+
+    def __init__(self, strategy: BaseStrategy, subject: Optional[MarketDataSubject] = None,
+                 invoker: Optional[OrderInvoker] = None, paper: bool = True):
+        self.strategy = strategy
+        self.subject = subject
+        self.invoker = invoker or OrderInvoker()
+        self.paper = paper
+        self._prices: Dict[str, float] = {}  # 最近价格 {stock_code: price}
+        self._lock = threading.RLock()  # 成交通知的观察者可能在回调内再推送行情
+        self._decision = {
+            'bar': DECISION_SECONDS.labels(type(strategy).__name__, 'bar'),
+            'tick': DECISION_SECONDS.labels(type(strategy).__name__, 'tick')
+        }
+
+    def start(self, cash: float, profile: bool = False):
+        """开始运行：重置策略状态，调用 on_init 并订阅行情"""
+        self.strategy.reset_state(cash, profile)
+        self.strategy.on_init()
+        if self.subject is not None:
+            self.subject.attach(self)
+
+    def stop(self) -> Dict:
+        """停止运行：取消订阅，返回 on_finish 的结果"""
+        if self.subject is not None:
+            self.subject.detach(self)
+        with self._lock:
+            return self.strategy.on_finish()
+
+    def update(self, event_type: str, data: Dict):
+        """接收行情主题的通知"""
+        if event_type == 'bar_update':
+            self.on_bar(data)
+        elif event_type == 'price_update':
+            self.on_tick(data)
+
+    def on_bar(self, bar: Mapping) -> Optional[Dict]:
+        """处理一根K线，返回成交记录（无成交时为None）"""
+        start = time.perf_counter()
+        with self._lock:
+            price = float(bar['close'])
+            self._prices[bar['stock_code']] = price
+            signal = self.strategy.on_bar(bar)
+            trade = self._act(signal, bar['stock_code'], price, bar.get('date') or bar.get('timestamp'),
+                              bar.get('shares', 0))
+        self._decision['bar'].observe(time.perf_counter() - start)
+        return trade
+
+    def on_tick(self, tick: Mapping) -> Optional[Dict]:
+        """处理一笔实时价格，返回成交记录（无成交时为None）"""
+        start = time.perf_counter()
+        with self._lock:
+            price = float(tick['price'])
+            self._prices[tick['stock_code']] = price
+            signal = self.strategy.on_tick(tick)
+            trade = self._act(signal, tick['stock_code'], price, tick.get('timestamp') or datetime.now(),
+                              tick.get('shares', 0))
+        self._decision['tick'].observe(time.perf_counter() - start)
+        return trade
+
+    def _act(self, signal: int, stock_code: str, price: float, trade_date, shares: int = 0) -> Optional[Dict]:
+        """信号 -> 订单 -> 成交后更新策略状态"""
+        if signal == 1:
+            shares = self._buy_shares(price, shares)
+            if shares == 0:
+                return None
+            order = BuyOrder(stock_code, shares, price, self._price_source())
+        elif signal == -1:
+            shares = self._sell_shares(stock_code, shares, trade_date)
+            if shares == 0:
+                return None
+            order = SellOrder(stock_code, shares, price, self._price_source())
+        else:
+            return None
+
+        filled = self.invoker.execute_order(order)
+        ORDERS.labels(type(self.strategy).__name__, order.action, order.status.value).inc()
+        if not filled:
+            logger.warning("订单未成交: {} {} {}股，状态: {}", order.action, stock_code, shares, order.status.value)
+            return None
+        return self._record(order, trade_date)
+
+    def _price_source(self):
+        return self._prices.get if self.paper else None
+
+    def _buy_shares(self, price: float, shares: int) -> int:
+        """买入股数：未指定时按可用资金全仓（整手）"""
+        if price <= 0:
+            return 0
+        if shares <= 0:
+            shares = int(self.strategy.cash / price / 100) * 100
+        return shares if shares * price <= self.strategy.cash else 0
+
+    def _sell_shares(self, stock_code: str, shares: int, trade_date) -> int:
+        """卖出股数：不超过持仓和满足T+1的可卖数量，未指定时全部可卖"""
+        held = self.strategy.positions.get(stock_code, 0)
+        ledger = self.strategy.position_dates.get(stock_code)
+        if ledger is not None:
+            ordinal = self.strategy._trade_ordinal(trade_date, None)
+            if ordinal is not None:
+                held = min(held, ledger.sellable(ordinal))
+        return held if shares <= 0 else min(shares, held)
+
+    def _record(self, order: OrderCommand, trade_date) -> Optional[Dict]:
+        """按成交价和成交数量更新策略的资金、持仓和T+1批次"""
+        if order.action == 'buy':
+            trade = self.strategy._buy(order.stock_code, float(order.price), order.shares, trade_date)
+        else:
+            trade = self.strategy._sell(order.stock_code, float(order.price), order.shares, trade_date)
+        if trade is None:
+            logger.error("订单已成交但策略账户未能记账: {}", order.to_dict())
+            return None
+        if self.subject is not None:
+            self.subject.update_trade(dict(trade))
+        return trade
+
+    @property
+    def orders(self) -> list:
+        """订单历史"""
+        return self.invoker.get_order_history()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'strategy': self.strategy.name,
+                'paper': self.paper,
+                'cash': self.strategy.cash,
+                'positions': dict(self.strategy.positions),
+                'orders': len(self.invoker.order_history),
+                'trades': len(self.strategy.trade_history)
+            }
+
@@ -0,0 +1,123 @@
+"""
+持仓批次账本 - 用于T+1限制的FIFO持仓记录
+"""
+from bisect import bisect_left
+from typing import Any, List, Optional, Tuple
+
+
+class LotLedger:
+    """
+    持仓批次账本（FIFO）
+
+    以 (买入日期, 股数) 为单位记录持仓批次，同一日期的买入合并为一个批次。
+    内部维护批次日期列表和累计股数前缀和，查询“截至某日可卖出股数”
+    只需一次二分查找，O(log n)；按FIFO卖出时只移动队首指针，均摊O(1)。
+
+    日期可以是任意可比较的值（date对象、交易日序号等），但同一账本内需保持类型一致。
+    """
+
+    __slots__ = ('_dates', '_cum', '_head', '_consumed')
+
+    def __init__(self):
+        self._dates: List[Any] = []  # 各批次买入日期（升序）
+        self._cum: List[int] = []  # 截至各批次的累计买入股数
+        self._head = 0  # 第一个未完全卖出的批次
+        self._consumed = 0  # 已卖出的累计股数
+
+    def add(self, buy_date, shares: int):
+        """记录一笔买入"""
+        if shares <= 0:
+            return
+        dates = self._dates
+        if dates and len(dates) > self._head and dates[-1] == buy_date:
+            # 同日买入合并到最后一个批次
+            self._cum[-1] += shares
+        elif not dates or len(dates) == self._head or dates[-1] < buy_date:
+            dates.append(buy_date)
+            self._cum.append((self._cum[-1] if self._cum else self._consumed) + shares)
+        else:
+            # 乱序买入（极少见）：按日期插入后重建前缀和
+            lots = self.lots()
+            lots.append((buy_date, shares))
+            self._rebuild(lots)
+
+    def sellable(self, as_of=None) -> int:
+        """截至 as_of（不含当日）可卖出的股数；as_of为None时返回全部持仓"""
+        if as_of is None:
+            return self.total
+        k = bisect_left(self._dates, as_of, self._head)
+        if k == self._head:
+            return 0
+        return self._cum[k - 1] - self._consumed
+
+    def consume(self, shares: int) -> int:
+        """按FIFO卖出指定股数，返回实际卖出的股数"""
+        shares = min(shares, self.total)
+        if shares <= 0:
+            return 0
+        self._consumed += shares
+        cum = self._cum
+        head = self._head
+        while head < len(cum) and cum[head] <= self._consumed:
+            head += 1
+        self._head = head
+        if head == len(cum):
+            self.clear()
+        elif head > 32 and head * 2 > len(cum):
+            # 压缩已卖完的批次，保持内存与持仓批次数成正比
+            del self._dates[:head]
+            del self._cum[:head]
+            self._head = 0
+        return shares
+
+    def earliest(self) -> Optional[Any]:
+        """最早一个未卖出批次的买入日期"""
+        if self._head < len(self._dates):
+            return self._dates[self._head]
+        return None
+
+    @property
+    def total(self) -> int:
+        """当前持仓总股数"""
+        if not self._cum:
+            return 0
+        return self._cum[-1] - self._consumed
+
+    def lots(self) -> List[Tuple[Any, int]]:
+        """未卖出的批次 [(买入日期, 股数), ...]"""
+        result = []
+        prev = self._consumed
+        for i in range(self._head, len(self._dates)):
+            result.append((self._dates[i], self._cum[i] - prev))
+            prev = self._cum[i]
+        return result
+
+    def clear(self):
+        """清空账本"""
+        self._dates = []
+        self._cum = []
+        self._head = 0
+        self._consumed = 0
+
+    def _rebuild(self, lots: List[Tuple[Any, int]]):
+        merged: List[List] = []
+        for buy_date, shares in sorted(lots, key=lambda lot: lot[0]):
+            if merged and merged[-1][0] == buy_date:
+                merged[-1][1] += shares
+            else:
+                merged.append([buy_date, shares])
+        self.clear()
+        total = 0
+        for buy_date, shares in merged:
+            total += shares
+            self._dates.append(buy_date)
+            self._cum.append(total)
+
+    def __len__(self) -> int:
+        return len(self._dates) - self._head
+
+    def __bool__(self) -> bool:
+        return self.total > 0
+
+    def __repr__(self) -> str:
+        return f"LotLedger({self.lots()})"
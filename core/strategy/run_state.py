@@ -0,0 +1,35 @@
+"""
+单次运行状态 - 策略在一次回测中的可变状态
+"""
+from typing import Any, Dict, List, Optional
+
+from core.strategy.lot_ledger import LotLedger
+from core.strategy.fill_buffer import FillBuffer
+from core.strategy.profiler import StrategyProfiler
+from core.indicators.streaming import Indicator
+
+
+class RunState:
+    """
+    单次运行状态
+
+    与策略定义（名称、参数、指标逻辑）分离，只保存一次回测中会被修改的资金、持仓和成交记录。
+    每次运行使用独立的 RunState，同一策略的多次回测互不影响。
+    """
+
+    __slots__ = ('cash', 'total_value', 'positions', 'position_dates', 'trade_history', 'fills', 'profiler', 'indicators', 'context')
+
+    def __init__(self, cash: float = 0, profiler: Optional[StrategyProfiler] = None):
+        self.cash = cash
+        self.total_value = cash
+        self.positions: Dict[str, int] = {}  # 持仓 {stock_code: shares}
+        self.position_dates: Dict[str, LotLedger] = {}  # 持仓批次账本 - 用于T+1限制
+        self.trade_history: List[Dict] = []  # 交易历史
+        self.fills: Optional[FillBuffer] = None  # 最近一次execute_trades的列式成交记录
+        self.profiler = profiler  # 分阶段剖析器，未启用时为None
+        self.indicators: Dict[str, Dict[str, Indicator]] = {}  # 逐K线模式的指标状态 {stock_code: {列名: 指标}}
+        self.context: Dict[str, Dict[str, Any]] = {}  # 逐K线模式下策略在K线之间保留的状态 {stock_code: {...}}
+
+    def __repr__(self) -> str:
+        return (f"RunState(cash={self.cash:.2f}, positions={self.positions}, "
+                f"trades={len(self.trade_history)})")
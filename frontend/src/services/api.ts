@@ -8,8 +8,12 @@ import type {
   StrategyResponse,
   BacktestRequest,
   BacktestResponse,
+  JobResponse,
+  BacktestListQuery,
+  BacktestListResponse,
   StockDataRequest,
   StockDataResponse,
+  StockDataColumns,
 } from '../types/api'
 
 // API基础URL
@@ -74,6 +78,12 @@ export const strategyAPI = {
 export const backtestAPI = {
   run: (data: BacktestRequest): Promise<BacktestResponse> => api.post('/backtest/run', data),
   get: (id: string): Promise<BacktestResponse> => api.get(`/backtest/${id}`),
+  submitJob: (data: BacktestRequest): Promise<JobResponse> => api.post('/backtest/jobs', data),
+  getJob: (id: string): Promise<JobResponse> => api.get(`/backtest/jobs/${id}`),
+  listJobs: (): Promise<JobResponse[]> => api.get('/backtest/jobs'),
+  cancelJob: (id: string): Promise<JobResponse> => api.post(`/backtest/jobs/${id}/cancel`),
+  list: (params?: BacktestListQuery): Promise<BacktestListResponse> => api.get('/backtests', { params }),
+  remove: (id: string): Promise<void> => api.delete(`/backtests/${id}`),
 }
 
 // 策略类型相关API
@@ -94,6 +104,9 @@ export const dataAPI = {
   getStocks: (): Promise<string[]> => api.get('/data/stocks'),
   getDailyData: (data: StockDataRequest): Promise<StockDataResponse> =>
     api.post('/data/daily', data),
+  // 列式日线数据（GET，浏览器自动解压并用ETag做条件请求，适合图表加载长历史）
+  getDailyColumns: (stockCode: string, startDate: string, endDate: string): Promise<StockDataColumns> =>
+    api.get(`/data/daily/${stockCode}`, { params: { start_date: startDate, end_date: endDate } }),
 }
 
 export default api
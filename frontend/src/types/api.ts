@@ -48,10 +48,57 @@ export interface BacktestMetrics {
   buy_hold_return: number
   excess_return: number
   max_drawdown: number
+  annual_return?: number  // 年化收益率
+  volatility?: number  // 年化波动率
+  sharpe_ratio?: number  // 夏普比率
   total_trades: number
   win_rate: number
 }
 
+export interface BacktestSummary {
+  id: string
+  strategy_name: string
+  stock_code: string
+  stock_name?: string
+  start_date: string
+  end_date: string
+  initial_capital: number
+  final_cash: number
+  final_value?: number
+  total_trades: number
+  metrics: BacktestMetrics
+  created_at: string
+}
+
+export interface BacktestListResponse {
+  total: number
+  page: number
+  page_size: number
+  items: BacktestSummary[]
+}
+
+export interface BacktestListQuery {
+  strategy_name?: string
+  stock_code?: string
+  start_date?: string
+  end_date?: string
+  page?: number
+  page_size?: number
+}
+
+export type JobStatus = 'pending' | 'running' | 'completed' | 'failed' | 'cancelled'
+
+export interface JobResponse {
+  id: string
+  status: JobStatus
+  strategy_id: string
+  stock_code: string
+  backtest_id?: string | null  // 完成后的回测结果ID
+  error?: string | null
+  submitted_at: string
+  finished_at?: string | null
+}
+
 export interface BacktestResponse {
   id: string
   strategy_name: string
@@ -78,10 +125,13 @@ export interface BacktestResponse {
   }
 }
 
+export type DataFormat = 'rows' | 'columnar' | 'msgpack' | 'arrow'
+
 export interface StockDataRequest {
   stock_code: string
   start_date: string
   end_date: string
+  format?: DataFormat
 }
 
 export interface StockDataPoint {
@@ -98,3 +148,16 @@ export interface StockDataResponse {
   data: StockDataPoint[]
 }
 
+export interface StockDataColumns {
+  stock_code: string
+  count: number
+  columns: {
+    date: string[]
+    open: number[]
+    high: number[]
+    low: number[]
+    close: number[]
+    volume: number[]
+  }
+}
+
@@ -8,10 +8,13 @@ from core.factory.strategy_factory import StrategyFactory
 from core.config_manager import ConfigManager
 from strategies.moving_average_strategy import MovingAverageStrategy
 from backtest.backtest_engine import BacktestEngine
+from utils.logger import setup_logging
+from core.calendar.trading_calendar import get_calendar
 
 
 def main():
     """主函数"""
+    setup_logging()
     print("=" * 50)
     print("A股量化交易系统")
     print("=" * 50)
@@ -20,6 +23,10 @@ def main():
     config = ConfigManager()
     print("✓ 配置加载完成")
     
+    # 交易日历只在启动时加载一次（可能需要联网）
+    get_calendar()
+    print("✓ 交易日历加载完成")
+    
     # 2. 创建数据适配器（工厂模式）
     data_adapter = DataFactory.create_adapter()
     print(f"✓ 数据源: {config.get('data_source.default', 'tushare')}")
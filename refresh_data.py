@@ -0,0 +1,51 @@
+"""
+行情数据刷新脚本 - 批量下载全市场日线数据（写入本地日线缓存）
+
+用法：
+    python refresh_data.py                      # 刷新全部股票最近一年的数据
+    python refresh_data.py --days 3650 --workers 16
+    python refresh_data.py --codes 000001 600000 --source akshare
+"""
+import sys
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from core.factory.data_factory import DataFactory
+from core.data.bulk import get_daily_data_bulk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量刷新日线数据")
+    parser.add_argument('--source', default=None, help="数据源，默认读取 data_source.default")
+    parser.add_argument('--codes', nargs='+', default=None, help="股票代码，默认全部股票")
+    parser.add_argument('--days', type=int, default=365, help="刷新最近多少天的数据")
+    parser.add_argument('--workers', type=int, default=None, help="并发线程数")
+    args = parser.parse_args()
+
+    adapter = DataFactory.create_adapter(args.source)
+    codes = args.codes or adapter.get_stock_list()
+    end_date = datetime.now().strftime('%Y%m%d')
+    start_date = (datetime.now() - timedelta(days=args.days)).strftime('%Y%m%d')
+    print(f"刷新 {len(codes)} 只股票: {start_date} ~ {end_date}")
+
+    def progress(done: int, total: int):
+        if done % 100 == 0 or done == total:
+            print(f"  进度: {done}/{total}")
+
+    result = get_daily_data_bulk(adapter, codes, start_date, end_date,
+                                 max_workers=args.workers, progress=progress)
+    report = result.report()
+    print(f"✓ 成功 {report['succeeded']}，空数据 {report['empty']}，失败 {report['failed']}，"
+          f"共 {report['rows']} 条，耗时 {report['elapsed']:.1f}s")
+    for code, error in list(result.failed.items())[:20]:
+        print(f"  ✗ {code}: {error}")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
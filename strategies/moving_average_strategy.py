@@ -1,8 +1,14 @@
 """
 移动平均策略示例
 """
+import math
+import numpy as np
 import pandas as pd
 from core.strategy.base_strategy import BaseStrategy
+from core.indicators import SMA
+from utils.logger import get_logger
+
+logger = get_logger('移动平均策略')
 
 
 class MovingAverageStrategy(BaseStrategy):
@@ -14,15 +20,16 @@ class MovingAverageStrategy(BaseStrategy):
         self.short_window = params.get('short_window', 5) if params else 5
         self.long_window = params.get('long_window', 20) if params else 20
     
+    def create_indicators(self) -> dict:
+        """短期和长期移动平均线"""
+        return {
+            'ma_short': SMA(self.short_window),
+            'ma_long': SMA(self.long_window)
+        }
+    
     def preprocess_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """数据预处理：计算移动平均线"""
-        df = data.copy()
-        
-        # 计算短期和长期移动平均线
-        df['ma_short'] = df['close'].rolling(window=self.short_window).mean()
-        df['ma_long'] = df['close'].rolling(window=self.long_window).mean()
-        
-        return df
+        return self.add_indicators(data.copy())
     
     def generate_signals(self, data: pd.DataFrame) -> pd.DataFrame:
         """生成交易信号"""
@@ -31,29 +38,22 @@ class MovingAverageStrategy(BaseStrategy):
         
         # 检查数据量是否足够计算长期均线
         if len(df) < self.long_window:
-            print(f"[警告] 数据量不足：只有 {len(df)} 天数据，需要至少 {self.long_window} 天才能计算长期均线")
+            logger.warning("数据量不足：只有 {} 天数据，需要至少 {} 天才能计算长期均线", len(df), self.long_window)
             return pd.DataFrame()
         
         # 金叉：短期均线上穿长期均线，买入信号
         # 死叉：短期均线下穿长期均线，卖出信号
-        for i in range(1, len(df)):
-            # 检查是否有NaN值（均线计算需要足够的数据）
-            if pd.isna(df.iloc[i]['ma_short']) or pd.isna(df.iloc[i]['ma_long']):
-                continue
-            if pd.isna(df.iloc[i-1]['ma_short']) or pd.isna(df.iloc[i-1]['ma_long']):
-                continue
-            
-            prev_short = df.iloc[i-1]['ma_short']
-            prev_long = df.iloc[i-1]['ma_long']
-            curr_short = df.iloc[i]['ma_short']
-            curr_long = df.iloc[i]['ma_long']
-            
-            # 金叉：买入信号
-            if prev_short <= prev_long and curr_short > curr_long:
-                df.iloc[i, df.columns.get_loc('signal')] = 1
-            # 死叉：卖出信号
-            elif prev_short >= prev_long and curr_short < curr_long:
-                df.iloc[i, df.columns.get_loc('signal')] = -1
+        # 整列比较：当前K线与前一根K线的均线均不能为NaN（均线计算需要足够的数据）
+        curr_short = df['ma_short'].to_numpy(dtype=float)
+        curr_long = df['ma_long'].to_numpy(dtype=float)
+        prev_short = np.roll(curr_short, 1)
+        prev_long = np.roll(curr_long, 1)
+        valid = ~(np.isnan(curr_short) | np.isnan(curr_long) | np.isnan(prev_short) | np.isnan(prev_long))
+        valid[:1] = False  # 第一根K线没有前值
+        
+        golden_cross = valid & (prev_short <= prev_long) & (curr_short > curr_long)
+        death_cross = valid & ~golden_cross & (prev_short >= prev_long) & (curr_short < curr_long)
+        df['signal'] = np.where(golden_cross, 1, np.where(death_cross, -1, 0))
         
         # 只返回有信号的记录，但保留所有必要信息
         signals = df[df['signal'] != 0].copy()
@@ -66,13 +66,28 @@ class MovingAverageStrategy(BaseStrategy):
             # 确保有股票代码
             if 'stock_code' not in signals.columns and 'stock_code' in df.columns:
                 # 从原始数据获取股票代码
-                stock_code = df['stock_code'].iloc[0] if 'stock_code' in df.columns else None
+                stock_code = df['stock_code'].iloc[0]
                 if stock_code:
                     signals['stock_code'] = stock_code
             # 确保有日期信息（用于T+1限制检查）
             if 'date' not in signals.columns and 'date' in df.columns:
-                # 从原始数据获取日期
-                signals['date'] = signals.index.map(lambda idx: df.loc[idx, 'date'] if idx in df.index else None)
+                # 从原始数据按索引对齐日期
+                signals['date'] = df.loc[signals.index, 'date']
         
         return signals
-
+    
+    def on_bar(self, bar) -> int:
+        """逐K线判断金叉死叉，与 generate_signals 的整列判断结果一致"""
+        values = self.update_indicators(bar)
+        curr_short, curr_long = values['ma_short'], values['ma_long']
+        context = self.context(bar.get('stock_code'))
+        prev = context.get('ma')
+        context['ma'] = (curr_short, curr_long)
+        if prev is None or any(math.isnan(v) for v in (curr_short, curr_long, *prev)):
+            return 0
+        prev_short, prev_long = prev
+        if prev_short <= prev_long and curr_short > curr_long:
+            return 1
+        if prev_short >= prev_long and curr_short < curr_long:
+            return -1
+        return 0
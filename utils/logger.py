@@ -0,0 +1,136 @@
+"""
+日志管理 - 基于loguru的分级、异步、可按回测收集的日志
+"""
+import sys
+import uuid
+import heapq
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import List
+
+from loguru import logger
+
+from core.config_manager import ConfigManager
+
+
+_lock = threading.Lock()
+_configured = False
+_handler_ids: List[int] = []
+
+
+def setup_logging(level: str = None, enqueue: bool = None, log_file: str = None, force: bool = False):
+    """
+    配置全局日志（只执行一次，force=True时重新配置）
+
+    - 级别低于 level 的日志在loguru内部直接丢弃，不会格式化消息
+    - enqueue=True 时控制台/文件输出经队列由后台线程批量写出，不阻塞调用方
+
+    Args:
+        level: 日志级别，默认读取 logging.level
+        enqueue: 是否异步写出，默认读取 logging.enqueue
+        log_file: 日志文件，默认读取 logging.file（为空则不写文件）
+    """
+    global _configured
+    with _lock:
+        if _configured and not force:
+            return
+        config = ConfigManager()
+        level = (level or config.get('logging.level', 'INFO')).upper()
+        if enqueue is None:
+            enqueue = config.get('logging.enqueue', True)
+        if log_file is None:
+            log_file = config.get('logging.file')
+
+        for handler_id in _handler_ids:
+            try:
+                logger.remove(handler_id)
+            except ValueError:
+                pass
+        _handler_ids.clear()
+        if not _configured:
+            # 移除loguru默认的同步stderr输出
+            logger.remove()
+
+        fmt = "{time:YYYY-MM-DD HH:mm:ss} | {level: <7} | {extra[component]} | {message}"
+        _handler_ids.append(logger.add(sys.stderr, level=level, format=fmt, enqueue=enqueue))
+        if log_file:
+            _handler_ids.append(logger.add(
+                log_file, level=level, format=fmt, enqueue=enqueue,
+                rotation='20 MB', retention=5, encoding='utf-8'
+            ))
+        logger.configure(extra={'component': '-', 'run_id': None})
+        _configured = True
+
+
+def get_logger(component: str):
+    """
+    获取绑定组件名的日志记录器
+
+    只绑定组件名，不修改全局日志配置：输出目标由入口程序（backend/main.py、main.py、
+    进程池的 worker 初始化函数）调用 setup_logging 配置，作为库导入时沿用宿主程序的loguru配置。
+    """
+    return logger.bind(component=component)
+
+
+class RunLogBuffer:
+    """
+    单次回测的内存环形日志缓冲区
+
+    只收集绑定了同一 run_id 的日志，超过容量时丢弃最早的记录。
+    绑定了 pinned=True 的记录（如服务层的关键步骤）单独保存，不会被淘汰。
+    """
+
+    def __init__(self, maxlen: int = None, level: str = 'INFO'):
+        config = ConfigManager()
+        self.run_id = uuid.uuid4().hex
+        self.level = level
+        self.records = deque(maxlen=maxlen or config.get('logging.buffer_size', 1000))
+        self.pinned = []
+        self._seq = itertools.count()
+        self._handler_id = None
+
+    def _sink(self, message):
+        record = message.record
+        line = f"[{record['time']:%Y-%m-%d %H:%M:%S}] [{record['level'].name}] {record['message']}"
+        if record['extra'].get('pinned'):
+            self.pinned.append((next(self._seq), line))
+        else:
+            self.records.append((next(self._seq), line))
+
+    def _filter(self, record) -> bool:
+        return record['extra'].get('run_id') == self.run_id
+
+    def start(self):
+        # 内存追加本身很快，直接同步写入，保证回测结束时日志已完整
+        self._handler_id = logger.add(self._sink, level=self.level, filter=self._filter,
+                                      format="{message}", enqueue=False)
+
+    def stop(self):
+        if self._handler_id is not None:
+            logger.remove(self._handler_id)
+            self._handler_id = None
+
+    def get_logs(self) -> List[str]:
+        """获取已收集的日志（按产生顺序）"""
+        return [line for _, line in heapq.merge(self.pinned, list(self.records))]
+
+
+@contextmanager
+def capture_run_logs(maxlen: int = None, level: str = 'INFO'):
+    """
+    收集代码块内产生的日志（按线程/协程上下文隔离）
+
+    用法：
+        with capture_run_logs() as run_logs:
+            engine.run(data)
+        logs = run_logs.get_logs()
+    """
+    buffer = RunLogBuffer(maxlen, level)
+    buffer.start()
+    try:
+        with logger.contextualize(run_id=buffer.run_id):
+            yield buffer
+    finally:
+        buffer.stop()
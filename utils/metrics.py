@@ -0,0 +1,267 @@
+"""
+指标统计 - 线程安全的计数器/仪表/直方图和Prometheus文本格式导出
+"""
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 默认耗时分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 数据大小分桶（字节）
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return repr(float(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Value:
+    """计数器/仪表的单个取值"""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class _HistogramValue:
+    """单个直方图：每个桶记录落入该桶的次数（累计计数在导出时计算），另记录总和与总次数"""
+
+    __slots__ = ('buckets', '_counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf 桶
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        with self._lock:
+            counts = list(self._counts)
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metric:
+    """
+    指标基类
+
+    labelnames 为空时直接调用 inc/set/observe；否则先通过 labels(...) 取得对应标签组合的取值。
+    指定 registry 时注册到该注册表，由 /metrics 导出。
+    """
+
+    TYPE = 'untyped'
+
+    def __init__(self, name: str = '', documentation: str = '', labelnames: Sequence[str] = (),
+                 registry: 'Registry' = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values, **kwargs):
+        """取得（必要时创建）标签组合对应的取值"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {values}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        """导出的样本 (名称, 标签, 值)"""
+        for values, child in self.children():
+            yield self.name, dict(zip(self.labelnames, values)), child.value
+
+
+class Counter(Metric):
+    """单调递增计数器"""
+
+    TYPE = 'counter'
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    """可增可减的仪表；set_function 设置后在导出时调用函数取值"""
+
+    TYPE = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self.labels().inc(-amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            yield self.name, {}, float(self._function())
+            return
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    """固定分桶直方图"""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str = '', documentation: str = '', labelnames: Sequence[str] = (),
+                 registry: 'Registry' = None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    @contextmanager
+    def time(self, *labels):
+        """记录代码块的耗时（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.labels(*labels).observe(time.perf_counter() - start)
+
+    def snapshot(self, *labels) -> Dict:
+        """单个标签组合的统计（JSON友好）"""
+        child = self.labels(*labels)
+        with child._lock:
+            count, total = child.count, child.sum
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else None,
+            'buckets': {_format_value(bound): value for bound, value in child.cumulative()}
+        }
+
+    def samples(self):
+        for values, child in self.children():
+            labels = dict(zip(self.labelnames, values))
+            for bound, count in child.cumulative():
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(bound)), count
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, child.count
+
+
+class Registry:
+    """
+    指标注册表
+
+    除注册的指标外，还可以注册采集函数：导出时调用，返回临时构造的指标（用于连接池等已有统计）。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Metric]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Metric]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def collect(self) -> List[Metric]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                metrics.extend(collector())
+            except Exception:
+                # 采集失败不影响其他指标的导出
+                continue
+        return metrics
+
+    def render(self) -> str:
+        """导出为Prometheus文本格式（0.0.4）"""
+        lines = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# 全局注册表
+REGISTRY = Registry()